@@ -1,10 +1,11 @@
 import os
 import csv
-import math
 import shutil
 import time
+import logging
 from pathlib import Path
 import platform
+from functools import wraps
 import pandas as pd
 from io import StringIO
 from flask import Flask, render_template, request, send_file, jsonify, session, make_response
@@ -14,6 +15,20 @@ from pdf_processor import PDFProcessor
 from data_processor import DataProcessor
 from csv_exporter import CSVExporter
 from config import OUTPUT_CSV_NAME  # e.g. "combined_data.csv"
+from config import ASYNC_UPLOADS
+from config import SINGLE_WRITER_EXPORT
+from output_schema import get_output_schema
+from utils import configure_logging, FileUtils, PopplerUtils
+from result_cache import ResultCache
+from ocr import get_ocr_status
+from job_queue import JobQueue, read_job, is_active, FAILED
+from upload_stream import save_stream, save_base64, save_form_base64, UploadTooLarge
+from upload_stream import MAX_UPLOAD_BYTES, MAX_FORM_FIELD_BYTES, FORM_MIMETYPES
+from batch_processor import BatchProcessor, BatchError, OUTPUT_COMBINED, OUTPUT_ZIP, BATCH_ZIP_NAME
+from csv_merger import build_match_key, merge_additional_fields, derive_cube_columns, sort_by_cancel_date
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
@@ -30,7 +45,11 @@ CORS(app,
      max_age=86400)  # Cache preflight for 24 hours
 
 app.config['UPLOAD_FOLDER'] = os.path.dirname(os.path.abspath(__file__))
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# Request bodies may carry the PDF base64-encoded (a third larger) plus the JSON/form around it
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES * 4 // 3 + 1024 * 1024
+# Form fields Werkzeug parses are held in memory, so they stay small; /upload-attachment
+# reads its form from the stream and decodes the base64 field to disk (save_form_base64)
+app.config['MAX_FORM_MEMORY_SIZE'] = MAX_FORM_FIELD_BYTES
 
 # Auto-detect HTTPS environment
 is_production = os.environ.get('RENDER') or os.environ.get('RAILWAY') or os.environ.get('HEROKU')
@@ -76,37 +95,275 @@ if os.environ.get('RENDER') and platform.system() != 'Windows':
 def allowed_file(filename, allowed_set):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_set
 
-def process_pdf():
-    """Process the PDF file through our pipeline."""
-    try:
-        # Initialize processors
-        pdf_processor = PDFProcessor()
-        data_processor = DataProcessor()
-        csv_exporter = CSVExporter()
-        
-        # Process through pipeline
-        if not pdf_processor.process_first_pdf():
-            return False, "Failed to process PDF"
-            
-        if not data_processor.process_all_files():
-            return False, "Failed to process text files"
-            
-        if not csv_exporter.combine_to_csv():
-            return False, "Failed to create CSV file"
-            
-        return True, "Processing completed successfully"
-        
-    except Exception as e:
-        return False, str(e)
+def upload_too_large_response(error=None):
+    """413 with the configured limit, for oversized bodies and oversized decoded files."""
+    return jsonify({
+        'error': 'File too large',
+        'details': str(error) if isinstance(error, UploadTooLarge) else
+                   f'Request exceeds {app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)} MB',
+        'max_upload_mb': MAX_UPLOAD_BYTES // (1024 * 1024)
+    }), 413
+
+@app.before_request
+def reject_oversized_requests():
+    """Answer 413 from the declared Content-Length before any of the body is read."""
+    max_length = app.config['MAX_CONTENT_LENGTH']
+    if max_length and request.content_length and request.content_length > max_length:
+        return upload_too_large_response()
+
+@app.errorhandler(413)
+def request_too_large(error):
+    # Bodies without a Content-Length are cut off while they are read
+    return upload_too_large_response(error)
+
+# Error responses for each stage of the PDF pipeline
+PIPELINE_ERRORS = {
+    'pdf': ('PDF processing failed', 'Could not extract text from PDF. Check server logs for more details.'),
+    'text': ('Text processing failed', 'Could not process extracted text files. Check server logs for more details.'),
+    'csv': ('CSV creation failed', 'Could not create final CSV file. Check server logs for more details.'),
+}
+
+# Combined CSVs of PDFs we have already processed, keyed by content hash and salted
+# with the settings that shape the output (result_cache.result_cache_salt)
+result_cache = ResultCache()
+
+def process_pdf(processor, job=None, result=None):
+    """Process every PDF in the session through our pipeline.
+
+    Page text of all the session's PDFs is streamed from the PDF extractor straight
+    into one DataProcessor pass, so no numbered TXT files are written or read back.
+    A set of PDFs whose bytes were processed before is answered from the result
+    cache instead. When run as a
+    background job, stage and page progress are reported to the job.
+
+    PDFs that could not be read, or only in part, are added to the result payload as
+    result['document_errors'] ({pdf name: error}); such an output is never cached, nor
+    is one where OCR failed on a scanned page. When pages went through OCR, its page
+    counts and time are added as result['ocr'], apart from the text extraction.
+
+    Returns (success, failed_stage) where failed_stage is a PIPELINE_ERRORS key.
+    """
+    combined_csv_path = os.path.join(processor.session_dir, OUTPUT_CSV_NAME)
+    cache_key = None
+    pdf_paths = [os.path.join(processor.session_dir, pdf_file)
+                 for pdf_file in sorted(FileUtils.get_pdf_files(processor.session_dir))]
+    if result_cache.enabled and pdf_paths:
+        cache_key = result_cache.key_for(*pdf_paths)
+        if result_cache.fetch(cache_key, combined_csv_path):
+            if job is not None:
+                job.stage('cache')
+            for pdf_path in pdf_paths:
+                os.remove(pdf_path)
+            return True, None
+
+    # Success is judged by the combined CSV existing, so one left by an earlier
+    # upload must not pass for this run's output
+    if os.path.exists(combined_csv_path):
+        os.remove(combined_csv_path)
+
+    logger.info("🔄 Initializing PDF processor...")
+    pdf_processor = PDFProcessor(session_dir=processor.session_dir)
+
+    logger.info("🔄 Processing %d PDF(s)...", len(pdf_paths))
+    pages = pdf_processor.iter_session_pages()
+    if job is not None:
+        job.stage('pdf')
+        pages = report_page_progress(pages, pdf_processor, job)
+    pages_processed = processor.process_pages(pages, combined=SINGLE_WRITER_EXPORT)
+    document_errors = pdf_processor.document_errors
+    if document_errors:
+        logger.warning("⚠️ %d of %d PDFs could not be read completely: %s",
+                       len(document_errors), len(pdf_paths), document_errors)
+        if result is not None:
+            result['document_errors'] = dict(document_errors)
+    ocr_stats = pdf_processor.ocr_stats
+    if ocr_stats['pages']:
+        logger.info("🔍 OCR: %d of %d scanned pages recovered, %d failed, %.2fs (%.2fs page time)",
+                    ocr_stats['recovered'], ocr_stats['pages'], ocr_stats['failed'], ocr_stats['seconds'],
+                    ocr_stats['page_seconds'])
+        if result is not None:
+            result['ocr'] = dict(ocr_stats, seconds=round(ocr_stats['seconds'], 3),
+                                 page_seconds=round(ocr_stats['page_seconds'], 3))
+    if pdf_processor.extraction_error:
+        logger.error("❌ PDF processing failed - check logs for details")
+        return False, 'pdf'
+
+    if not pages_processed:
+        logger.error("❌ Text processing failed - check logs for details")
+        return False, 'text'
+
+    if SINGLE_WRITER_EXPORT:
+        # The data processor already wrote the combined CSV
+        if not os.path.exists(combined_csv_path):
+            logger.error("❌ CSV creation failed - no invoices found")
+            return False, 'csv'
+    else:
+        # Create exporter with the same session directory
+        logger.info("🔄 Creating final CSV...")
+        if job is not None:
+            job.stage('csv')
+        exporter = CSVExporter(session_dir=processor.session_dir)
+        if not exporter.combine_to_csv():
+            logger.error("❌ CSV creation failed - check logs for details")
+            return False, 'csv'
+
+    # Output missing a document's rows, or a scanned page's, is not the answer for these PDFs
+    if cache_key and not document_errors and not ocr_stats['failed']:
+        result_cache.store(cache_key, combined_csv_path)
+    return True, None
+
+def report_page_progress(pages, pdf_processor, job):
+    """Pass pages through while reporting each one to the job."""
+    for pages_done, page in enumerate(pages, 1):
+        job.page(pages_done, pdf_processor.page_count)
+        yield page
+
+def pipeline_error_response(processor, stage, result=None):
+    """Build the JSON error response for a failed pipeline stage.
+
+    The document errors and OCR stats process_pdf recorded in result are passed on.
+    """
+    error, details = PIPELINE_ERRORS[stage]
+    response = {
+        'error': error,
+        'details': details,
+        'session_id': processor.session_id
+    }
+    for key in ('document_errors', 'ocr'):
+        if result and key in result:
+            response[key] = result[key]
+    return jsonify(response), 500
+
+# Background processing for PDF uploads
+job_queue = JobQueue()
+
+def wants_async():
+    """Queue the upload (202 + polling) when ?_async=1, or by default with ASYNC_UPLOADS."""
+    value = request.args.get('_async')
+    if value is None:
+        return ASYNC_UPLOADS
+    return value.lower() in ('1', 'true', 'yes')
+
+def session_query(processor):
+    """Query string that routes follow-up requests to the same external session."""
+    if request.args.get('_sid') or request.args.get('session_id'):
+        return f"?_sid={processor.session_id}"
+    return ""
+
+def active_job_response(processor):
+    """409 response when the session is still processing a queued upload, else None."""
+    job = read_job(processor.session_dir)
+    if not is_active(job):
+        return None
+    return jsonify({
+        'error': 'A PDF is still being processed in this session',
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': f"/jobs/{job['job_id']}{session_query(processor)}",
+        'session_id': processor.session_id
+    }), 409
+
+def session_busy_response(processor):
+    """409 for an upload to a session with an active job, or one another request is reserving."""
+    return active_job_response(processor) or (jsonify({
+        'error': 'Another upload to this session is in progress',
+        'session_id': processor.session_id
+    }), 409)
+
+def reserves_session(view):
+    """Run an upload route as view(processor, job) with its session reserved.
+
+    The session is reserved (JobQueue.reserve) before the route touches any of its
+    files, so two uploads never clean or fill one session at the same time. The
+    reservation is released when the route returns without queueing the job.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        processor = get_or_create_session()
+        job = job_queue.reserve(processor.session_dir, processor.session_id)
+        if job is None:
+            return session_busy_response(processor)
+        try:
+            return view(processor, job, *args, **kwargs)
+        finally:
+            job_queue.release(job)
+    return wrapper
+
+def queue_pdf_job(processor, job, filename, result):
+    """Run process_pdf in the background on the reserved job and answer 202 with the job id.
+
+    result is the payload a synchronous upload would have returned; it is stored
+    on the job once processing succeeds.
+    """
+    query = session_query(processor)
+    # Stored with the result, where /jobs/<job_id> reads it back
+    result = dict(result, download_url=f'/download-bol{query}')
+
+    def run(job):
+        success, failed_stage = process_pdf(processor, job=job, result=result)
+        for key in ('document_errors', 'ocr'):
+            if key in result:
+                # Saved with the job's next update, whichever way it ends
+                job.state[key] = result[key]
+        if not success:
+            error, details = PIPELINE_ERRORS[failed_stage]
+            job.fail(error, details)
+        return result
+
+    job.state['filename'] = filename
+    job_queue.start(job, run)
+
+    return jsonify({
+        'message': 'PDF accepted for processing',
+        'filename': filename,
+        'job_id': job.job_id,
+        'status': job.state['status'],
+        'status_url': f'/jobs/{job.job_id}{query}',
+        'download_url': f'/download-bol{query}',
+        'session_id': processor.session_id
+    }), 202
+
+def process_batch_document(data_processor):
+    """Run the PDF pipeline for one document of a batch. Returns (success, message).
+
+    A document that could only be read in part is reported as failed, so none of
+    its rows reach the batch output.
+    """
+    result = {}
+    success, failed_stage = process_pdf(data_processor, result=result)
+    if not success:
+        return False, PIPELINE_ERRORS[failed_stage][0]
+    if result.get('document_errors'):
+        return False, "; ".join(result['document_errors'].values())
+    return True, None
+
+def clear_session_outputs(processor):
+    """Remove every visible file from the session directory, combined CSV first."""
+    combined_csv_path = os.path.join(processor.session_dir, OUTPUT_CSV_NAME)
+    if os.path.exists(combined_csv_path):
+        os.remove(combined_csv_path)
+        print(f"🗑️ PRIORITY: Removed contaminating {OUTPUT_CSV_NAME}")
+    for old_file in os.listdir(processor.session_dir):
+        file_path = os.path.join(processor.session_dir, old_file)
+        if old_file.startswith('.') or not os.path.isfile(file_path):
+            continue
+        try:
+            os.remove(file_path)
+            print(f"🧹 Removed: {old_file}")
+        except Exception as e:
+            print(f"⚠️ Warning: Could not remove {old_file}: {str(e)}")
 
 def process_csv_file(file_path, session_dir):
-    """Process and merge incoming CSV/Excel data with the PDF CSV by matching on:
+    """Process and merge incoming CSV/Excel data with the PDF CSV.
+
+       Columns come from the output schema (get_output_schema). With the BOL layout,
+       rows are matched on:
        - Invoice No.
        - Style
        - Cartons* (renamed to 'Cartons')
        - Pieces* (renamed to 'Individual Pieces')
        
-       Then update the following fields using the incoming headers:
+       Then the following fields are updated using the incoming headers:
        - "Invoice Date" -> "Order Date"
        - "Ship-to Name" -> "Ship To Name"
        - "Order No." -> "Purchase Order No."
@@ -114,6 +371,8 @@ def process_csv_file(file_path, session_dir):
        - "Cancel Date" -> "Cancel Date"
     """
     try:
+        schema = get_output_schema()
+
         # Read input file as DataFrame with all columns as strings
         ext = os.path.splitext(file_path)[1].lower()
         if ext == ".csv":
@@ -124,31 +383,7 @@ def process_csv_file(file_path, session_dir):
             return False, "Unsupported file extension"
         
         # Rename incoming columns used for matching.
-        incoming_df.rename(columns={"Cartons*": "Cartons", "Pieces*": "Individual Pieces"}, inplace=True)
-        
-        # **INTELLIGENT ADDITIONAL FIELD MAPPING**: Map field names flexibly
-        additional_mapping_rules = {
-            "Invoice Date": "Order Date",
-            "Ship-to Name": "Ship To Name", 
-            "Order No.": "Purchase Order No.",
-            "Delivery Date": "Start Date",
-            "Cancel Date": "Cancel Date"
-        }
-        
-        # Map additional fields intelligently
-        additional_mapping = {}
-        for incoming_field, pdf_field in additional_mapping_rules.items():
-            incoming_match = find_column_match(incoming_field, incoming_df.columns)
-            pdf_match = find_column_match(pdf_field, existing_df.columns)
-            
-            if incoming_match and pdf_match:
-                additional_mapping[incoming_match] = pdf_match
-                print(f"✅ Additional field mapped: '{incoming_match}' -> '{pdf_match}'")
-            else:
-                if not incoming_match:
-                    print(f"⚠️ Incoming field '{incoming_field}' not found (optional)")
-                if not pdf_match:
-                    print(f"⚠️ PDF field '{pdf_field}' not found (optional)")
+        incoming_df.rename(columns=schema.incoming_renames, inplace=True)
         
         # Read existing combined CSV (from PDF processing) from session directory
         combined_csv_path = os.path.join(session_dir, OUTPUT_CSV_NAME)
@@ -157,8 +392,8 @@ def process_csv_file(file_path, session_dir):
         existing_df = pd.read_csv(combined_csv_path, dtype=str)
         
         # **ENHANCED DEBUGGING**: Show what columns actually exist
-        print(f"📊 PDF CSV columns available: {list(existing_df.columns)}")
-        print(f"📊 Incoming CSV columns available: {list(incoming_df.columns)}")
+        logger.debug("📊 PDF CSV columns available: %s", list(existing_df.columns))
+        logger.debug("📊 Incoming CSV columns available: %s", list(incoming_df.columns))
         
         # **INTELLIGENT COLUMN MAPPING**: Handle variations in column names
         def find_column_match(target_col, available_cols):
@@ -196,9 +431,27 @@ def process_csv_file(file_path, session_dir):
             
             return None
         
+        # **INTELLIGENT ADDITIONAL FIELD MAPPING**: Map field names flexibly
+        additional_mapping_rules = schema.incoming_mapping
+        
+        # Map additional fields intelligently
+        additional_mapping = {}
+        for incoming_field, pdf_field in additional_mapping_rules.items():
+            incoming_match = find_column_match(incoming_field, incoming_df.columns)
+            pdf_match = find_column_match(pdf_field, existing_df.columns)
+            
+            if incoming_match and pdf_match:
+                additional_mapping[incoming_match] = pdf_match
+                logger.debug("✅ Additional field mapped: '%s' -> '%s'", incoming_match, pdf_match)
+            else:
+                if not incoming_match:
+                    logger.debug("⚠️ Incoming field '%s' not found (optional)", incoming_field)
+                if not pdf_match:
+                    logger.debug("⚠️ PDF field '%s' not found (optional)", pdf_field)
+        
         # Map columns intelligently
         matching_columns_map = {}
-        required_columns = ["Invoice No.", "Style", "Cartons", "Individual Pieces"]
+        required_columns = schema.match_columns
         
         for req_col in required_columns:
             # Find in PDF data
@@ -212,140 +465,48 @@ def process_csv_file(file_path, session_dir):
                 return False, f"Column '{req_col}' not found in incoming file. Available columns: {list(incoming_df.columns)}"
             
             matching_columns_map[req_col] = {'pdf': pdf_match, 'csv': csv_match}
-            print(f"✅ Mapped '{req_col}': PDF='{pdf_match}', CSV='{csv_match}'")
+            logger.debug("✅ Mapped '%s': PDF='%s', CSV='%s'", req_col, pdf_match, csv_match)
         
         # Use the mapped column names for matching
         matching_columns = [matching_columns_map[col]['pdf'] for col in required_columns]
         
-        # Create a composite match key in both DataFrames using mapped columns
-        def create_match_key(df, cols):
-            return df[cols].fillna('').apply(
-                lambda row: "_".join([str(x).strip().replace(",", "").lower() for x in row]),
-                axis=1
-            )
-        
         # Use mapped column names for key creation
         pdf_key_cols = [matching_columns_map[col]['pdf'] for col in required_columns]
         csv_key_cols = [matching_columns_map[col]['csv'] for col in required_columns]
         
-        existing_df["match_key"] = create_match_key(existing_df, pdf_key_cols)
-        incoming_df["match_key"] = create_match_key(incoming_df, csv_key_cols)
-        
-        print("Existing DataFrame match keys:")
-        debug_cols_pdf = pdf_key_cols + ["match_key"]
-        print(existing_df[debug_cols_pdf].head(20))
-        print("Incoming DataFrame match keys:")
-        debug_cols_csv = csv_key_cols + ["match_key"]
-        print(incoming_df[debug_cols_csv].head(20))
-        
-        # Merge: update existing_df rows using incoming additional mapping.
-        for idx, inc_row in incoming_df.iterrows():
-            key = inc_row["match_key"]
-            matches = existing_df[existing_df["match_key"] == key]
-            if not matches.empty:
-                existing_index = matches.index[0]
-                for inc_col, pdf_col in additional_mapping.items():
-                    if inc_col in incoming_df.columns and pdf_col in existing_df.columns:
-                        value = inc_row.get(inc_col, "")
-                        existing_df.at[existing_index, pdf_col] = value
+        # Create a composite match key in both DataFrames using mapped columns
+        existing_df["match_key"] = build_match_key(existing_df, pdf_key_cols)
+        incoming_df["match_key"] = build_match_key(incoming_df, csv_key_cols)
+        
+        # Rendering DataFrames is expensive - only do it when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            debug_cols_pdf = pdf_key_cols + ["match_key"]
+            logger.debug("Existing DataFrame match keys:\n%s", existing_df[debug_cols_pdf].head(20))
+            debug_cols_csv = csv_key_cols + ["match_key"]
+            logger.debug("Incoming DataFrame match keys:\n%s", incoming_df[debug_cols_csv].head(20))
+        
+        # Merge: one keyed join updates the first PDF row matching each incoming key.
+        merge_additional_fields(existing_df, incoming_df, additional_mapping)
         
         # Drop the match_key columns.
         existing_df.drop(columns=["match_key"], inplace=True)
         incoming_df.drop(columns=["match_key"], inplace=True)
         
-        # Compute values for all rows first
-        if "BOL Cube" in existing_df.columns:
-            pallet_values = existing_df["BOL Cube"].apply(lambda x: compute_pallet(x))
-            existing_df["Pallet"] = ""  # Initialize empty column
-        else:
-            print("Warning: 'BOL Cube' column not found in existing CSV data.")
-            pallet_values = pd.Series([""] * len(existing_df))
-        
-        if "Ship To Name" in existing_df.columns:
-            burlington_values = existing_df.apply(
-                lambda row: compute_burlington(row["Ship To Name"], pallet_values.iloc[row.name]), 
-                axis=1
-            )
-            final_cube_values = existing_df.apply(
-                lambda row: compute_final_cube(row["Ship To Name"], pallet_values.iloc[row.name]), 
-                axis=1
-            )
-            
-            existing_df["Burlington Cube"] = ""  # Initialize empty column
-            existing_df["Final Cube"] = ""      # Initialize empty column
-        else:
-            print("Warning: 'Ship To Name' column not found in existing CSV data.")
-            burlington_values = pd.Series([""] * len(existing_df))
-            final_cube_values = pd.Series([""] * len(existing_df))
-        
-        # Group by Invoice No. and only set values for first row of each group
-        current_invoice = None
-        is_first_row = True
-        
-        for idx in range(len(existing_df)):
-            invoice_no = existing_df.iloc[idx]["Invoice No."]
+        # Pallet, Burlington Cube and Final Cube, set on the first row of each invoice
+        ship_to_col = schema.name_for('ship_to')
+        derive_cube_columns(existing_df, invoice_col=schema.name_for('invoice_no'),
+                            bol_cube_col=schema.name_for('bol_cube'), ship_to_col=ship_to_col,
+                            pallet_col=schema.name_for('pallet'),
+                            burlington_col=schema.name_for('burlington_cube'),
+                            final_cube_col=schema.name_for('final_cube'))
             
-            # Check if this is the first row of a new invoice group
-            if invoice_no != current_invoice:
-                current_invoice = invoice_no
-                is_first_row = True
-            
-            # Only set the values for the first row of each invoice group
-            if is_first_row:
-                existing_df.iloc[idx, existing_df.columns.get_loc("Pallet")] = pallet_values.iloc[idx]
-                existing_df.iloc[idx, existing_df.columns.get_loc("Burlington Cube")] = burlington_values.iloc[idx]
-                existing_df.iloc[idx, existing_df.columns.get_loc("Final Cube")] = final_cube_values.iloc[idx]
-                is_first_row = False
-            
-        def parse_cancel_date(date_str):
-            """
-            Convert a string like '3152025' -> 03/15/2025 or
-            '2202025' -> 02/20/2025 into a datetime object.
-
-            Handles:
-            - 7-digit format:  MDDYYYY  (e.g. '3152025')
-            - 8-digit format: MMDDYYYY  (e.g. '03152025')
-            """
-            date_str = str(date_str).strip()
-
-            # 7-digit: MDDYYYY
-            if len(date_str) == 7:
-                month = date_str[0]             # e.g. '3'
-                day   = date_str[1:3]          # e.g. '15'
-                year  = date_str[3:]           # e.g. '2025'
-                try:
-                    return pd.to_datetime(f"{month.zfill(2)}/{day}/{year}", format="%m/%d/%Y")
-                except:
-                    return pd.NaT
-
-            # 8-digit: MMDDYYYY
-            elif len(date_str) == 8:
-                month = date_str[0:2]          # e.g. '03'
-                day   = date_str[2:4]          # e.g. '15'
-                year  = date_str[4:]           # e.g. '2025'
-                try:
-                    return pd.to_datetime(f"{month}/{day}/{year}", format="%m/%d/%Y")
-                except:
-                    return pd.NaT
-
-            return pd.NaT
-
         # --- Sorting the output ---
-        if "Cancel Date" in existing_df.columns and "Ship To Name" in existing_df.columns:
-            # Convert the raw strings in "Cancel Date" to datetime using the custom function:
-            existing_df["Cancel Date_dt"] = existing_df["Cancel Date"].apply(parse_cancel_date)
-
-            # Compute the earliest date per "Ship To Name":
-            existing_df["min_cancel_date"] = existing_df.groupby("Ship To Name")["Cancel Date_dt"].transform("min")
-
-            # Sort by earliest group date, then Ship To Name, then the individual date:
-            existing_df.sort_values(by=["min_cancel_date", "Ship To Name", "Cancel Date_dt"], inplace=True)
-
-            # Drop the helper columns:
-            existing_df.drop(columns=["min_cancel_date", "Cancel Date_dt"], inplace=True)
-
+        cancel_col = schema.name_for('cancel_date')
+        if cancel_col in existing_df.columns and ship_to_col in existing_df.columns:
+            # Earliest Cancel Date per Ship To Name, then Ship To Name, then the row's own date
+            sort_by_cancel_date(existing_df, cancel_col=cancel_col, ship_to_col=ship_to_col)
         else:
-            print("Warning: 'Cancel Date' or 'Ship To Name' column not found; skipping sort.")
+            logger.warning("Warning: '%s' or '%s' column not found; skipping sort.", cancel_col, ship_to_col)
         
         # Save updated DataFrame back to the combined CSV in session directory
         existing_df.to_csv(combined_csv_path, index=False)
@@ -357,39 +518,9 @@ def process_csv_file(file_path, session_dir):
     except pd.errors.ParserError:
         return False, "Error parsing the file. Please ensure it's a valid CSV/Excel file"
     except Exception as e:
-        print(f"Error processing CSV: {str(e)}")
+        logger.error("Error processing CSV: %s", e)
         return False, f"Error processing file: {str(e)}"
 
-def compute_pallet(bol_cube):
-    """Compute pallet value from BOL Cube."""
-    try:
-        value = float(str(bol_cube).replace(",", "").strip())
-        return math.ceil(value / 80)
-    except Exception:
-        return ""
-
-def compute_burlington(ship_to_name, pallet):
-    """Compute Burlington Cube value."""
-    try:
-        if isinstance(ship_to_name, str) and "burlington" in ship_to_name.lower():
-            if pd.isna(pallet) or pallet == "":
-                return ""
-            return int(pallet) * 93
-    except Exception:
-        return ""
-    return ""
-
-def compute_final_cube(ship_to_name, pallet):
-    """Compute Final Cube value."""
-    try:
-        if isinstance(ship_to_name, str) and "burlington" not in ship_to_name.lower():
-            if pd.isna(pallet) or pallet == "":
-                return ""
-            return int(pallet) * 130
-    except Exception:
-        return ""
-    return ""
-
 def cleanup_old_files():
     """Clean up old PDFs and combined CSV file when page is loaded/refreshed."""
     try:
@@ -421,13 +552,16 @@ def get_or_create_session():
     
     # Check if we're being asked to force a new session
     force_new_session = request.args.get('_action') == 'new_session'
+
+    # Per-request DEBUG logging for the parser (?_debug=1), without raising the global level
+    debug = request.args.get('_debug', '').lower() in ('1', 'true', 'yes')
     
     # Get external session ID from query parameter
     external_session_id = request.args.get('_sid') or request.args.get('session_id')
     
     # If force new session is requested, always create a new session
     if force_new_session:
-        processor = DataProcessor()  # Creates new session
+        processor = DataProcessor(debug=debug)  # Creates new session
         print(f"🆕 Force creating new session due to _action=new_session: {processor.session_id}")
         return processor
     
@@ -448,12 +582,12 @@ def get_or_create_session():
                 # **SMART CONTAMINATION HANDLING**
                 # Only warn if it's not a fresh PDF upload (which will clean anyway)
                 request_path = request.path
-                if request_path not in ['/upload', '/upload-base64', '/upload-attachment']:
+                if request_path not in ['/upload', '/upload-base64', '/upload-attachment', '/upload-batch']:
                     print(f"⚠️ Session contamination may affect this request: {request_path}")
                     print(f"⚠️ External app should call /clear-session before processing new documents")
         
         # Create processor with the specified session ID (creates directory if needed)
-        processor = DataProcessor(session_id=external_session_id)
+        processor = DataProcessor(session_id=external_session_id, debug=debug)
         
         if os.path.exists(session_dir):
             status = "🔄 Using external session"
@@ -468,14 +602,14 @@ def get_or_create_session():
     # For internal Flask sessions (web UI), use simple logic
     if 'session_id' not in session:
         # Create new internal session
-        processor = DataProcessor()
+        processor = DataProcessor(debug=debug)
         session['session_id'] = processor.session_id
         print(f"🆕 Created new internal session: {processor.session_id}")
         return processor
     else:
         # Use existing internal session
         internal_session_id = session['session_id']
-        processor = DataProcessor(session_id=internal_session_id)
+        processor = DataProcessor(session_id=internal_session_id, debug=debug)
         print(f"♻️ Reusing internal session: {internal_session_id}")
         return processor
 
@@ -518,8 +652,14 @@ def process():
 # Add near your other routes
 @app.route('/health')
 def health():
-    # Check if poppler is working
-    poppler_status = "working" if os.environ.get('POPPLER_WORKING') else "not working"
+    # Poppler and OCR are probed once per process; ?refresh_poppler=1 re-runs the probes
+    if request.args.get('refresh_poppler', '').lower() in ('1', 'true', 'yes'):
+        poppler = PopplerUtils.refresh_poppler_status()
+        ocr = get_ocr_status(refresh=True)
+    else:
+        poppler = PopplerUtils.get_poppler_status()
+        ocr = get_ocr_status()
+    poppler_status = "working" if poppler['available'] else "not working"
     
     # Cookie configuration status
     is_production = os.environ.get('RENDER') or os.environ.get('RAILWAY') or os.environ.get('HEROKU')
@@ -535,15 +675,16 @@ def health():
     return jsonify({
         "status": "healthy",
         "poppler_status": poppler_status,
+        "poppler": poppler,
+        "ocr": ocr,
         "environment": os.environ.get('RENDER', 'local'),
-        "cookie_config": cookie_status
+        "cookie_config": cookie_status,
+        "result_cache": result_cache.stats()
     }), 200
 
 @app.route('/upload', methods=['POST'])
-def upload_file():
-    # Get existing processor with session directory
-    processor = get_or_create_session()
-    
+@reserves_session
+def upload_file(processor, job):
     print(f"📤 PDF Upload Request - Session: {processor.session_id}")
     
     if 'file' not in request.files:
@@ -623,44 +764,30 @@ def upload_file():
         # Save the uploaded PDF directly to session directory
         filename = secure_filename(file.filename)
         file_path = os.path.join(processor.session_dir, filename)
-        file.save(file_path)
+        try:
+            file_size = save_stream(file.stream, file_path)
+        except UploadTooLarge as e:
+            print(f"❌ {str(e)}")
+            return upload_too_large_response(e)
         
-        print(f"📏 Saved PDF size: {os.path.getsize(file_path)} bytes")
+        print(f"📏 Saved PDF size: {file_size} bytes")
         print(f"📄 PDF saved to: {file_path}")
         print(f"📁 Session directory: {processor.session_dir}")
         
-        # Process the PDF through our pipeline
-        print("🔄 Initializing PDF processor...")
-        pdf_processor = PDFProcessor(session_dir=processor.session_dir)
-        
-        print("🔄 Processing PDF...")
-        if not pdf_processor.process_first_pdf():
-            print("❌ PDF processing failed - check logs for details")
-            return jsonify({
-                'error': 'PDF processing failed',
-                'details': 'Could not extract text from PDF. Check server logs for more details.',
-                'session_id': processor.session_id
-            }), 500
+        result = {
+            'message': 'PDF processed successfully',
+            'filename': filename,
+            'session_id': processor.session_id,
+            'session_cleaned': True,
+            'ready_for_csv': True
+        }
+        if wants_async():
+            return queue_pdf_job(processor, job, filename, result)
         
-        print("🔄 Processing extracted text files...")
-        if not processor.process_all_files():
-            print("❌ Text processing failed - check logs for details")
-            return jsonify({
-                'error': 'Text processing failed',
-                'details': 'Could not process extracted text files. Check server logs for more details.',
-                'session_id': processor.session_id
-            }), 500
-            
-        # Create exporter with the same session directory
-        print("🔄 Creating final CSV...")
-        exporter = CSVExporter(session_dir=processor.session_dir)
-        if not exporter.combine_to_csv():
-            print("❌ CSV creation failed - check logs for details")
-            return jsonify({
-                'error': 'CSV creation failed',
-                'details': 'Could not create final CSV file. Check server logs for more details.',
-                'session_id': processor.session_id
-            }), 500
+        # Process the PDF through our pipeline
+        success, failed_stage = process_pdf(processor, result=result)
+        if not success:
+            return pipeline_error_response(processor, failed_stage, result)
         
         # **ENHANCED DEBUGGING**: Check what columns were created in the final CSV
         combined_csv_path = os.path.join(processor.session_dir, OUTPUT_CSV_NAME)
@@ -672,7 +799,7 @@ def upload_file():
                 print(f"📊 SUCCESS: Final CSV created with columns: {created_columns}")
                 
                 # Check for required columns that CSV upload will need
-                required_for_merge = ["Invoice No.", "Style", "Cartons", "Individual Pieces"]
+                required_for_merge = get_output_schema().match_columns
                 missing_columns = [col for col in required_for_merge if col not in created_columns]
                 if missing_columns:
                     print(f"⚠️ WARNING: Missing columns that CSV merge will need: {missing_columns}")
@@ -684,13 +811,7 @@ def upload_file():
                 print(f"⚠️ Could not debug CSV columns: {str(debug_error)}")
         
         print("✅ PDF processed successfully!")
-        return jsonify({
-            'message': 'PDF processed successfully',
-            'filename': filename,
-            'session_id': processor.session_id,
-            'session_cleaned': True,
-            'ready_for_csv': True
-        }), 200
+        return jsonify(result), 200
         
     except Exception as e:
         error_msg = str(e)
@@ -702,38 +823,37 @@ def upload_file():
         }), 500
 
 @app.route('/upload-base64', methods=['POST'])
-def upload_base64():
+@reserves_session
+def upload_base64(processor, job):
     """Handle file upload with base64 encoded data (for email attachments)."""
     try:
-        # Get existing processor with session directory
-        processor = get_or_create_session()
-        
         print(f"📤 Base64 Upload Request - Session: {processor.session_id}")
         
-        # Parse JSON request
-        data = request.get_json()
-        if not data:
+        # JSON carries the base64 in a field; any other body is the base64 text itself,
+        # streamed from the request (?filename=... names it)
+        if request.is_json:
+            # cache=False: the raw body is dropped once parsed
+            data = request.get_json(cache=False)
+            if not data:
+                print("❌ No JSON data provided")
+                return jsonify({'error': 'No JSON data provided'}), 400
+            
+            # Get file data from request
+            file_data = data.get('file_data') or data.get('attachmentData')
+            filename = data.get('filename') or data.get('name', 'attachment.pdf')
+            
+            if not file_data:
+                print("❌ No file data provided")
+                return jsonify({'error': 'No file data provided'}), 400
+        elif request.content_length:
+            file_data = request.stream
+            filename = request.args.get('filename', 'attachment.pdf')
+        else:
             print("❌ No JSON data provided")
             return jsonify({'error': 'No JSON data provided'}), 400
-            
-        # Get file data from request
-        file_data = data.get('file_data') or data.get('attachmentData')
-        filename = data.get('filename') or data.get('name', 'attachment.pdf')
-        
-        if not file_data:
-            print("❌ No file data provided")
-            return jsonify({'error': 'No file data provided'}), 400
         
         # Handle base64 encoded data
-        import base64
         try:
-            # Remove data URL prefix if present
-            if ',' in file_data:
-                file_data = file_data.split(',')[1]
-            
-            # Decode base64 data
-            decoded_data = base64.b64decode(file_data)
-            
             # Secure filename
             filename = secure_filename(filename)
             
@@ -741,55 +861,35 @@ def upload_base64():
             if not filename.lower().endswith('.pdf'):
                 filename += '.pdf'
             
-            # Save file to session directory
+            # Decode straight into the session directory, a chunk at a time
+            # (a data URL prefix is skipped)
             file_path = os.path.join(processor.session_dir, filename)
-            with open(file_path, 'wb') as f:
-                f.write(decoded_data)
+            file_size = save_base64(file_data, file_path)
+            del file_data
             
-            print(f"📄 Base64 PDF saved to: {file_path} ({len(decoded_data)} bytes)")
+            print(f"📄 Base64 PDF saved to: {file_path} ({file_size} bytes)")
             print(f"📁 Session directory: {processor.session_dir}")
             
-            # Process the PDF through our pipeline
-            print("🔄 Initializing PDF processor...")
-            pdf_processor = PDFProcessor(session_dir=processor.session_dir)
-            
-            print("🔄 Processing PDF...")
-            if not pdf_processor.process_first_pdf():
-                print("❌ PDF processing failed - check logs for details")
-                return jsonify({
-                    'error': 'PDF processing failed',
-                    'details': 'Could not extract text from PDF. Check server logs for more details.',
-                    'session_id': processor.session_id
-                }), 500
-                
-            print("🔄 Processing extracted text files...")
-            if not processor.process_all_files():
-                print("❌ Text processing failed - check logs for details")
-                return jsonify({
-                    'error': 'Text processing failed',
-                    'details': 'Could not process extracted text files. Check server logs for more details.',
-                    'session_id': processor.session_id
-                }), 500
-                
-            # Create exporter with the same session directory
-            print("🔄 Creating final CSV...")
-            exporter = CSVExporter(session_dir=processor.session_dir)
-            if not exporter.combine_to_csv():
-                print("❌ CSV creation failed - check logs for details")
-                return jsonify({
-                    'error': 'CSV creation failed',
-                    'details': 'Could not create final CSV file. Check server logs for more details.',
-                    'session_id': processor.session_id
-                }), 500
-                
-            print("✅ Base64 PDF processed successfully!")
-            return jsonify({
+            result = {
                 'message': 'Base64 PDF processed successfully',
                 'filename': filename,
-                'file_size': len(decoded_data),
+                'file_size': file_size,
                 'session_id': processor.session_id
-            }), 200
+            }
+            if wants_async():
+                return queue_pdf_job(processor, job, filename, result)
             
+            # Process the PDF through our pipeline
+            success, failed_stage = process_pdf(processor, result=result)
+            if not success:
+                return pipeline_error_response(processor, failed_stage, result)
+                
+            print("✅ Base64 PDF processed successfully!")
+            return jsonify(result), 200
+            
+        except UploadTooLarge as e:
+            print(f"❌ {str(e)}")
+            return upload_too_large_response(e)
         except Exception as decode_error:
             print(f"❌ Failed to decode base64 data: {str(decode_error)}")
             return jsonify({'error': f'Failed to decode file data: {str(decode_error)}'}), 400
@@ -803,13 +903,14 @@ def upload_base64():
             'session_id': processor.session_id if 'processor' in locals() else None
         }), 500
 
+# Fields /upload-attachment takes the PDF from, in order of preference
+ATTACHMENT_FIELDS = ('attachmentData', 'file_data', 'data')
+
 @app.route('/upload-attachment', methods=['POST'])
-def upload_attachment():
+@reserves_session
+def upload_attachment(processor, job):
     """Handle attachment upload with flexible data formats."""
     try:
-        # Get existing processor with session directory
-        processor = get_or_create_session()
-        
         print(f"📤 Attachment Upload Request - Session: {processor.session_id}")
         
         # Try to get data from different sources
@@ -817,40 +918,44 @@ def upload_attachment():
         
         # Check if it's JSON data
         if request.is_json:
-            data = request.get_json()
-        elif request.form:
-            # Form data
-            data = request.form.to_dict()
+            # cache=False: the raw body is dropped once parsed
+            data = request.get_json(cache=False)
+        elif request.mimetype in FORM_MIMETYPES:
+            # Form data, read from the stream: the base64 field is decoded to a hidden file
+            # in the session directory as it arrives instead of being parsed into memory
+            upload_path = os.path.join(processor.session_dir, f".upload_{os.getpid()}_{time.time_ns()}.pdf")
+            try:
+                data, file_size = save_form_base64(request.stream, request.mimetype,
+                                                   request.mimetype_params.get('boundary'), upload_path,
+                                                   ATTACHMENT_FIELDS)
+            except UploadTooLarge as e:
+                print(f"❌ {str(e)}")
+                return upload_too_large_response(e)
+            except ValueError as e:
+                print(f"❌ Failed to read attachment form: {str(e)}")
+                return jsonify({'error': f'Failed to process attachment data: {str(e)}'}), 400
+            if file_size:
+                data['attachmentData'] = Path(upload_path)
+            elif file_size is not None:
+                os.remove(upload_path)
+        elif request.mimetype in ('application/pdf', 'application/octet-stream') and request.content_length:
+            # Raw PDF body, streamed to disk (?filename=... names it)
+            data = {'attachmentData': request.stream, 'filename': request.args.get('filename')}
         
         if not data:
             print("❌ No data provided")
             return jsonify({'error': 'No data provided'}), 400
         
         # Get file information
-        attachment_data = data.get('attachmentData') or data.get('file_data') or data.get('data')
-        filename = data.get('filename') or data.get('name', 'attachment.pdf')
+        attachment_data = next(filter(None, map(data.get, ATTACHMENT_FIELDS)), None)
+        filename = data.get('filename') or data.get('name') or 'attachment.pdf'
         
         if not attachment_data:
             print("❌ No attachment data provided")
             return jsonify({'error': 'No attachment data provided'}), 400
         
         # Handle different data formats
-        import base64
         try:
-            # If it's already bytes, use as is
-            if isinstance(attachment_data, bytes):
-                file_bytes = attachment_data
-            else:
-                # Try to decode as base64
-                if isinstance(attachment_data, str):
-                    # Remove data URL prefix if present
-                    if ',' in attachment_data:
-                        attachment_data = attachment_data.split(',')[1]
-                    file_bytes = base64.b64decode(attachment_data)
-                else:
-                    print("❌ Invalid attachment data format")
-                    return jsonify({'error': 'Invalid attachment data format'}), 400
-            
             # Secure filename
             filename = secure_filename(filename)
             
@@ -858,56 +963,47 @@ def upload_attachment():
             if not filename.lower().endswith('.pdf'):
                 filename += '.pdf'
             
-            # Save file to session directory
+            # Save file to session directory, a chunk at a time
             file_path = os.path.join(processor.session_dir, filename)
-            with open(file_path, 'wb') as f:
-                f.write(file_bytes)
+            if isinstance(attachment_data, Path):
+                # Form field, already decoded while the body was read
+                os.replace(attachment_data, file_path)
+                file_size = os.path.getsize(file_path)
+            elif hasattr(attachment_data, 'read'):
+                # Raw bytes: copy as is
+                file_size = save_stream(attachment_data, file_path)
+            elif isinstance(attachment_data, str):
+                # Decode base64 (a data URL prefix is skipped)
+                file_size = save_base64(attachment_data, file_path)
+            else:
+                print("❌ Invalid attachment data format")
+                return jsonify({'error': 'Invalid attachment data format'}), 400
+            del attachment_data
             
-            print(f"📄 Attachment saved to: {file_path} ({len(file_bytes)} bytes)")
+            print(f"📄 Attachment saved to: {file_path} ({file_size} bytes)")
             print(f"📁 Session directory: {processor.session_dir}")
             
-            # Process the PDF through our pipeline
-            print("🔄 Initializing PDF processor...")
-            pdf_processor = PDFProcessor(session_dir=processor.session_dir)
-            
-            print("🔄 Processing PDF...")
-            if not pdf_processor.process_first_pdf():
-                print("❌ PDF processing failed - check logs for details")
-                return jsonify({
-                    'error': 'PDF processing failed',
-                    'details': 'Could not extract text from PDF. Check server logs for more details.',
-                    'session_id': processor.session_id
-                }), 500
-                
-            print("🔄 Processing extracted text files...")
-            if not processor.process_all_files():
-                print("❌ Text processing failed - check logs for details")
-                return jsonify({
-                    'error': 'Text processing failed',
-                    'details': 'Could not process extracted text files. Check server logs for more details.',
-                    'session_id': processor.session_id
-                }), 500
-                
-            # Create exporter with the same session directory
-            print("🔄 Creating final CSV...")
-            exporter = CSVExporter(session_dir=processor.session_dir)
-            if not exporter.combine_to_csv():
-                print("❌ CSV creation failed - check logs for details")
-                return jsonify({
-                    'error': 'CSV creation failed',
-                    'details': 'Could not create final CSV file. Check server logs for more details.',
-                    'session_id': processor.session_id
-                }), 500
-                
-            print("✅ Attachment processed successfully!")
-            return jsonify({
+            result = {
                 'message': 'Attachment processed successfully',
                 'filename': filename,
-                'file_size': len(file_bytes),
+                'file_size': file_size,
                 'session_id': processor.session_id,
                 'status': 'success'
-            }), 200
+            }
+            if wants_async():
+                return queue_pdf_job(processor, job, filename, result)
             
+            # Process the PDF through our pipeline
+            success, failed_stage = process_pdf(processor, result=result)
+            if not success:
+                return pipeline_error_response(processor, failed_stage, result)
+                
+            print("✅ Attachment processed successfully!")
+            return jsonify(result), 200
+            
+        except UploadTooLarge as e:
+            print(f"❌ {str(e)}")
+            return upload_too_large_response(e)
         except Exception as decode_error:
             print(f"❌ Failed to process attachment data: {str(decode_error)}")
             return jsonify({'error': f'Failed to process attachment data: {str(decode_error)}'}), 400
@@ -921,6 +1017,103 @@ def upload_attachment():
             'session_id': processor.session_id if 'processor' in locals() else None
         }), 500
 
+@app.route('/upload-batch', methods=['POST'])
+@reserves_session
+def upload_batch(processor, job):
+    """Process many PDFs in one request: a multipart list of PDFs and/or zip files, or a zip body.
+
+    ?output=combined (default) writes one combined CSV for /download-bol;
+    ?output=zip builds a zip of per-document CSVs plus manifest.json. The
+    response carries the manifest with each document's status, row count and timing.
+    """
+    try:
+        print(f"📦 Batch Upload Request - Session: {processor.session_id}")
+        
+        output = request.args.get('output', OUTPUT_COMBINED).lower()
+        if output not in (OUTPUT_COMBINED, OUTPUT_ZIP):
+            return jsonify({'error': f"Invalid output '{output}' (use 'combined' or 'zip')"}), 400
+        
+        # A batch replaces whatever the session held before
+        clear_session_outputs(processor)
+        
+        batch = BatchProcessor(processor.session_dir, processor.session_id, process_batch_document,
+                               debug=processor.log.session_debug)
+        batch.reset()
+        try:
+            uploads = request.files.getlist('files') + request.files.getlist('file')
+            for upload in uploads:
+                if not upload.filename:
+                    continue
+                if allowed_file(upload.filename, {'zip'}):
+                    batch.add_zip(upload.stream)
+                elif allowed_file(upload.filename, ALLOWED_PDF_EXTENSIONS):
+                    batch.add_pdf(upload.filename, upload.stream)
+                else:
+                    batch.reset()
+                    return jsonify({'error': f'Invalid file type: {upload.filename} (PDF or zip required)'}), 400
+            
+            # A bare zip body, e.g. from integrations that cannot build multipart requests
+            if not uploads and request.mimetype in ('application/zip', 'application/x-zip-compressed'):
+                batch.add_zip_stream(request.stream)
+        except BatchError as e:
+            batch.reset()
+            return jsonify({'error': str(e)}), 400
+        except UploadTooLarge as e:
+            batch.reset()
+            return upload_too_large_response(e)
+        
+        if not batch.documents:
+            return jsonify({'error': 'No PDF files provided (send files=... or a zip)'}), 400
+        
+        print(f"📦 Accepted {len(batch.documents)} PDFs: {batch.documents}")
+        query = session_query(processor)
+        download_url = f'/download-bol/{BATCH_ZIP_NAME}{query}' if output == OUTPUT_ZIP else f'/download-bol{query}'
+        
+        def run(job=None):
+            if job is not None:
+                job.stage('batch')
+            manifest = batch.run(output)
+            result = {
+                'message': f"Processed {manifest['succeeded']} of {manifest['document_count']} PDFs",
+                'session_id': processor.session_id,
+                'output': output,
+                'download_url': download_url if manifest['succeeded'] else None,
+                'manifest': manifest
+            }
+            if job is not None and not manifest['succeeded']:
+                job.fail('Batch processing failed', 'None of the PDFs in the batch could be processed')
+            return result
+        
+        if wants_async():
+            job.state['filename'] = f'{len(batch.documents)} PDFs'
+            job_queue.start(job, run)
+            return jsonify({
+                'message': 'Batch accepted for processing',
+                'documents': batch.documents,
+                'job_id': job.job_id,
+                'status': job.state['status'],
+                'status_url': f'/jobs/{job.job_id}{query}',
+                'download_url': download_url,
+                'session_id': processor.session_id
+            }), 202
+        
+        result = run()
+        if not result['manifest']['succeeded']:
+            print("❌ No PDF in the batch could be processed")
+            return jsonify(dict(result, error='Batch processing failed')), 500
+        
+        print(f"✅ {result['message']}")
+        return jsonify(result), 200
+        
+    except Exception as e:
+        error_msg = str(e)
+        print(f"❌ Unexpected error during batch upload: {error_msg}")
+        return jsonify({
+            'error': 'Unexpected error during batch upload',
+            'details': error_msg,
+            'session_id': processor.session_id if 'processor' in locals() else None
+        }), 500
+
 @app.route('/upload-csv', methods=['POST'])
 def upload_csv():
     try:
@@ -1178,13 +1371,43 @@ def download_bol_file():
         processor = get_or_create_session()
         csv_path = os.path.join(processor.session_dir, OUTPUT_CSV_NAME)
         
+        # A queued upload serves its result only once the job has finished
+        job = read_job(processor.session_dir)
+        if is_active(job):
+            return jsonify({
+                'message': 'PDF is still being processed',
+                'job': job,
+                'status_url': f"/jobs/{job['job_id']}{session_query(processor)}"
+            }), 202
+        
         if not os.path.exists(csv_path):
+            if job and job['status'] == FAILED:
+                return jsonify({'error': job['error'], 'details': job['details'], 'job': job}), 500
             return jsonify({'error': 'No processed file available'}), 404
             
         return send_file(csv_path, as_attachment=True, download_name='BOL_processed.csv')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report the stage and page progress of a queued PDF upload."""
+    try:
+        processor = get_or_create_session()
+        job = read_job(processor.session_dir)
+        
+        # Jobs are only visible from the session that queued them
+        if not job or job['job_id'] != job_id:
+            return jsonify({'error': f'Job {job_id} not found in this session'}), 404
+        
+        job = dict(job, active=is_active(job))
+        if job['status'] == 'succeeded':
+            # Each kind of job stores where its output is downloaded (e.g. the batch zip)
+            job['download_url'] = (job.get('result') or {}).get('download_url')
+        return jsonify(job), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/download-bol/<filename>')
 def download_bol_file_by_name(filename):
     """Download a specific BOL file by name."""
@@ -1296,21 +1519,6 @@ def process_workflow():
             return jsonify({'error': 'No PDF files found to process'}), 400
         
         # Process all PDFs
-        pdf_processor = PDFProcessor(session_dir=processor.session_dir)
-        if not pdf_processor.process_first_pdf():
-            return jsonify({'error': 'Failed to process PDF files'}), 500
-        
-        # Process text files
-        if not processor.process_all_files():
-            return jsonify({'error': 'Failed to process extracted text'}), 500
-        
-        # Create CSV
-        exporter = CSVExporter(session_dir=processor.session_dir)
-        if not exporter.combine_to_csv():
-            return jsonify({'error': 'Failed to create CSV output'}), 500
-        
-        # Get result info
-        csv_path = os.path.join(processor.session_dir, OUTPUT_CSV_NAME)
         result = {
             'status': 'success',
             'message': 'Processing completed successfully',
@@ -1318,6 +1526,21 @@ def process_workflow():
             'download_url': '/download-bol',
             'session_id': processor.session_id
         }
+        success, failed_stage = process_pdf(processor, result=result)
+        if not success:
+            workflow_errors = {
+                'pdf': 'Failed to process PDF files',
+                'text': 'Failed to process extracted text',
+                'csv': 'Failed to create CSV output'
+            }
+            error = {'error': workflow_errors[failed_stage]}
+            for key in ('document_errors', 'ocr'):
+                if key in result:
+                    error[key] = result[key]
+            return jsonify(error), 500
+        
+        # Get result info
+        csv_path = os.path.join(processor.session_dir, OUTPUT_CSV_NAME)
         
         if os.path.exists(csv_path):
             result['file_size'] = os.path.getsize(csv_path)
@@ -1933,6 +2156,10 @@ def api_docs():
         'service': 'BOL Extractor API',
         'version': '1.0.0',
         'description': 'API for processing BOL (Bill of Lading) PDF files and CSV data',
+        'limits': {
+            'max_upload_mb': MAX_UPLOAD_BYTES // (1024 * 1024),
+            'oversized_uploads': '413 with error, details and max_upload_mb'
+        },
         'automated_workflow_best_practices': {
             'recommended_workflow': [
                 'POST /auto-clean-session?_sid=your_session_id (ensure clean start)',
@@ -1961,7 +2188,8 @@ def api_docs():
                 'description': 'Upload and process a PDF file (automatically cleans contaminated sessions)',
                 'parameters': {
                     'file': 'PDF file (multipart/form-data)',
-                    '_sid': 'Session ID for external applications (optional)'
+                    '_sid': 'Session ID for external applications (optional)',
+                    '_async': '1 to queue processing and return 202 with a job id (optional)'
                 },
                 'response': 'Processing result with session cleanup status'
             },
@@ -1976,21 +2204,33 @@ def api_docs():
             'POST /upload-base64': {
                 'description': 'Upload and process base64 encoded PDF file',
                 'parameters': {
-                    'file_data': 'Base64 encoded file data (JSON)',
-                    'filename': 'Optional filename (JSON)',
-                    '_sid': 'Session ID for external applications (optional)'
+                    'file_data': 'Base64 encoded file data (JSON); or send the base64 text itself as the request body',
+                    'filename': 'Optional filename (JSON, or ?filename= with a raw body)',
+                    '_sid': 'Session ID for external applications (optional)',
+                    '_async': '1 to queue processing and return 202 with a job id (optional)'
                 },
                 'response': 'Processing result'
             },
             'POST /upload-attachment': {
                 'description': 'Upload and process attachment data (flexible format)',
                 'parameters': {
-                    'attachmentData': 'Attachment data (base64 or bytes)',
-                    'filename': 'Optional filename',
-                    '_sid': 'Session ID for external applications (optional)'
+                    'attachmentData': 'Attachment data (base64, JSON or form); or a raw application/pdf body',
+                    'filename': 'Optional filename (?filename= with a raw body)',
+                    '_sid': 'Session ID for external applications (optional)',
+                    '_async': '1 to queue processing and return 202 with a job id (optional)'
                 },
                 'response': 'Processing result'
             },
+            'POST /upload-batch': {
+                'description': 'Upload and process many PDFs at once; each PDF is processed separately and reported in a manifest',
+                'parameters': {
+                    'files': 'PDF and/or zip files (multipart/form-data, repeatable); or a zip request body',
+                    'output': "'combined' (default): one combined CSV for /download-bol; 'zip': per-document CSVs plus manifest.json",
+                    '_sid': 'Session ID for external applications (optional)',
+                    '_async': '1 to queue processing and return 202 with a job id (optional)'
+                },
+                'response': 'Manifest with per-document status, rows and seconds, and the download_url'
+            },
             'POST /auto-clean-session': {
                 'description': 'Automatically detect and clean contaminated sessions',
                 'parameters': {
@@ -2011,7 +2251,15 @@ def api_docs():
                 'parameters': {
                     '_sid': 'Session ID for external applications (optional)'
                 },
-                'response': 'CSV file download'
+                'response': 'CSV file download (202 with job status while a queued upload is processing)'
+            },
+            'GET /jobs/<job_id>': {
+                'description': 'Status of a queued PDF upload: stage, pages_done / page_count, result or error',
+                'parameters': {
+                    'job_id': 'Job ID returned by an upload with _async=1',
+                    '_sid': 'Session ID for external applications (optional)'
+                },
+                'response': 'Job status'
             },
             'GET /download-bol/<filename>': {
                 'description': 'Download specific file by name',
@@ -2069,7 +2317,10 @@ def api_docs():
             },
             'GET /health': {
                 'description': 'Health check endpoint',
-                'response': 'Health status'
+                'parameters': {
+                    'refresh_poppler': '1 to re-run the Poppler and OCR probes instead of reporting the cached results (optional)'
+                },
+                'response': 'Health status, including the cached Poppler and OCR probes and result cache hit/miss counters'
             },
             'GET /api/health': {
                 'description': 'API health check endpoint',
@@ -0,0 +1,214 @@
+"""
+Processing of many PDFs uploaded in one request.
+
+Every document runs through the regular pipeline in its own work directory
+(<session>/.batch/<name>) on a small thread pool, so one bad PDF cannot spoil
+the others and each document gets its own CSV, status and timing. The results
+are then assembled into the session's combined CSV, or into a zip of
+per-document CSVs, and described by a manifest.
+"""
+
+import os
+import csv
+import json
+import time
+import shutil
+import zipfile
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.utils import secure_filename
+from data_processor import DataProcessor
+from upload_stream import save_stream
+from config import OUTPUT_CSV_NAME, BATCH_WORKERS, BATCH_MAX_FILES, BATCH_MAX_UNZIPPED_MB
+
+logger = logging.getLogger(__name__)
+
+BATCH_DIR = ".batch"
+BATCH_ZIP_NAME = "bol_batch.zip"
+MANIFEST_NAME = "manifest.json"
+
+# Output modes
+OUTPUT_COMBINED = 'combined'
+OUTPUT_ZIP = 'zip'
+OUTPUT_MODES = (OUTPUT_COMBINED, OUTPUT_ZIP)
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class BatchError(ValueError):
+    """The upload cannot be accepted as a batch (bad zip, too many files, ...)."""
+
+
+class BatchProcessor:
+    def __init__(self, session_dir, session_id, process_document, workers=BATCH_WORKERS,
+                 max_files=BATCH_MAX_FILES, max_unzipped_mb=BATCH_MAX_UNZIPPED_MB, debug=False):
+        """Collect PDFs for a batch in session_dir.
+
+        process_document(data_processor) runs the pipeline for the one PDF in
+        data_processor.session_dir and returns (success, message).
+        """
+        self.session_dir = session_dir
+        self.session_id = session_id
+        self.process_document = process_document
+        self.workers = max(1, workers)
+        self.max_files = max_files
+        self.max_unzipped_bytes = max_unzipped_mb * 1024 * 1024
+        self.debug = debug
+        self.batch_dir = os.path.join(session_dir, BATCH_DIR)
+        self.documents = []  # PDF file names, in upload order
+        self._unzipped_bytes = 0
+
+    def reset(self):
+        """Remove the work directories of an earlier batch."""
+        shutil.rmtree(self.batch_dir, ignore_errors=True)
+
+    def add_pdf(self, filename, stream):
+        """Copy one uploaded PDF into its work directory in chunks. Returns the stored name.
+
+        Raises UploadTooLarge past MAX_UPLOAD_MB.
+        """
+        name = self._reserve_name(filename)
+        save_stream(stream, os.path.join(self._document_dir(name), name))
+        return name
+
+    def add_zip(self, stream):
+        """Add every PDF inside a zip file (a path or a seekable file object). Returns the stored names.
+
+        Folders inside the zip are flattened; other file types are ignored.
+        """
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile as e:
+            raise BatchError(f"Not a valid zip file: {e}")
+
+        names = []
+        with archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith('.pdf')]
+            # Sizes are checked before anything is extracted; reads stop at the declared size
+            self._unzipped_bytes += sum(info.file_size for info in members)
+            if self._unzipped_bytes > self.max_unzipped_bytes:
+                raise BatchError(f"Zip contents exceed {self.max_unzipped_bytes // (1024 * 1024)} MB")
+            for info in members:
+                with archive.open(info) as member:
+                    names.append(self.add_pdf(os.path.basename(info.filename), member))
+        return names
+
+    def add_zip_stream(self, stream):
+        """Add every PDF inside a zip read from a stream (e.g. a bare request body). Returns the stored names.
+
+        The zip is copied to a temp file in the batch directory in chunks, so it is never
+        held in memory. Raises UploadTooLarge past MAX_UPLOAD_MB.
+        """
+        os.makedirs(self.batch_dir, exist_ok=True)
+        fd, zip_path = tempfile.mkstemp(prefix=".upload_", suffix=".zip", dir=self.batch_dir)
+        os.close(fd)
+        try:
+            save_stream(stream, zip_path)
+            return self.add_zip(zip_path)
+        finally:
+            os.remove(zip_path)
+
+    def run(self, output=OUTPUT_COMBINED):
+        """Process every added PDF and assemble the output. Returns the manifest.
+
+        The combined output is written to the session's OUTPUT_CSV_NAME; the zip
+        output to BATCH_ZIP_NAME, with one CSV per document plus the manifest.
+        """
+        if output not in OUTPUT_MODES:
+            raise BatchError(f"Unknown output '{output}' (use one of: {', '.join(OUTPUT_MODES)})")
+        if not self.documents:
+            raise BatchError("No PDF files in the batch")
+
+        started = time.perf_counter()
+        workers = min(self.workers, len(self.documents))
+        logger.info("📦 Processing batch of %d PDFs with %d workers", len(self.documents), workers)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bol-batch') as executor:
+            # map keeps upload order
+            results = list(executor.map(self._process_one, self.documents))
+
+        succeeded = [result for result in results if result['status'] == 'succeeded']
+        manifest = {
+            'output': output,
+            'document_count': len(results),
+            'succeeded': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'rows': sum(result['rows'] for result in succeeded),
+            'documents': results,
+        }
+        manifest['file'] = (BATCH_ZIP_NAME if output == OUTPUT_ZIP else OUTPUT_CSV_NAME) if succeeded else None
+        manifest['seconds'] = round(time.perf_counter() - started, 3)
+
+        if succeeded:
+            if output == OUTPUT_ZIP:
+                self._write_zip(succeeded, manifest)
+            else:
+                self._write_combined(succeeded)
+        self.reset()
+
+        logger.info("📦 Batch finished: %d of %d PDFs processed in %.2fs",
+                    manifest['succeeded'], manifest['document_count'], manifest['seconds'])
+        return manifest
+
+    def _process_one(self, name):
+        document_dir = self._document_dir(name)
+        started = time.perf_counter()
+        result = {'filename': name, 'status': 'failed', 'rows': 0, 'error': None}
+        try:
+            data_processor = DataProcessor(session_id=self.session_id, debug=self.debug, session_dir=document_dir)
+            success, message = self.process_document(data_processor)
+            if success:
+                result['status'] = 'succeeded'
+                result['rows'] = self._count_rows(os.path.join(document_dir, OUTPUT_CSV_NAME))
+            else:
+                result['error'] = message
+        except Exception as e:
+            logger.exception("❌ Batch document %s failed", name)
+            result['error'] = str(e)
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        return result
+
+    def _write_combined(self, results):
+        """Concatenate the per-document CSVs (one header) into the session's combined CSV."""
+        output_path = os.path.join(self.session_dir, OUTPUT_CSV_NAME)
+        with open(output_path, 'w', encoding='utf-8', newline='') as out:
+            for index, result in enumerate(results):
+                with open(self._result_csv(result), encoding='utf-8', newline='') as f:
+                    header = f.readline()
+                    if index == 0:
+                        out.write(header)
+                    shutil.copyfileobj(f, out, COPY_CHUNK_SIZE)
+
+    def _write_zip(self, results, manifest):
+        zip_path = os.path.join(self.session_dir, BATCH_ZIP_NAME)
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for result in results:
+                csv_name = f"{os.path.splitext(result['filename'])[0]}.csv"
+                result['csv'] = csv_name
+                archive.write(self._result_csv(result), csv_name)
+            archive.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+
+    def _result_csv(self, result):
+        return os.path.join(self._document_dir(result['filename']), OUTPUT_CSV_NAME)
+
+    def _reserve_name(self, filename):
+        if len(self.documents) >= self.max_files:
+            raise BatchError(f"Too many PDFs in one batch (limit {self.max_files})")
+        stem = os.path.splitext(secure_filename(filename or ''))[0] or 'document'
+        name = f"{stem}.pdf"
+        suffix = 2
+        while name in self.documents:
+            name = f"{stem}_{suffix}.pdf"
+            suffix += 1
+        self.documents.append(name)
+        os.makedirs(self._document_dir(name), exist_ok=True)
+        return name
+
+    def _document_dir(self, name):
+        return os.path.join(self.batch_dir, os.path.splitext(name)[0])
+
+    @staticmethod
+    def _count_rows(csv_path):
+        with open(csv_path, encoding='utf-8', newline='') as f:
+            return max(0, sum(1 for _ in csv.reader(f)) - 1)
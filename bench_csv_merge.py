@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark: merging an incoming customer export into the combined PDF CSV.
+
+Compares the original iterrows() scan (one boolean mask over the PDF rows per
+incoming row) with the keyed join in csv_merger.merge_additional_fields, for
+1k to 100k rows on each side. The row scan is quadratic, so it is only timed up
+to --legacy-limit rows.
+
+Also times building the composite match key (the original per-row apply()
+against csv_merger.build_match_key) and the Pallet / Burlington Cube / Final Cube
+derivation (per-row apply() plus an iloc loop against
+csv_merger.derive_cube_columns), and the Cancel Date parse and sort (per-row
+parse_cancel_date against csv_merger.sort_by_cancel_date).
+
+Usage: python bench_csv_merge.py [--legacy-limit N]
+"""
+
+import sys
+import time
+import random
+import pandas as pd
+from csv_merger import (build_match_key, merge_additional_fields, derive_cube_columns, sort_by_cancel_date,
+                        compute_pallet, compute_burlington, compute_final_cube)
+
+ADDITIONAL_MAPPING = {
+    "Invoice Date": "Order Date",
+    "Ship-to Name": "Ship To Name",
+    "Order No.": "Purchase Order No.",
+    "Delivery Date": "Start Date",
+    "Cancel Date": "Cancel Date",
+}
+
+
+KEY_COLUMNS = ["Invoice No.", "Style", "Cartons", "Individual Pieces"]
+
+
+def legacy_match_key(df, cols):
+    """The original create_match_key from process_csv_file, kept as the baseline."""
+    return df[cols].fillna('').apply(
+        lambda row: "_".join([str(x).strip().replace(",", "").lower() for x in row]),
+        axis=1
+    )
+
+
+def legacy_merge(existing_df, incoming_df, additional_mapping):
+    """The original merge loop from process_csv_file, kept as the baseline."""
+    for idx, inc_row in incoming_df.iterrows():
+        key = inc_row["match_key"]
+        matches = existing_df[existing_df["match_key"] == key]
+        if not matches.empty:
+            existing_index = matches.index[0]
+            for inc_col, pdf_col in additional_mapping.items():
+                if inc_col in incoming_df.columns and pdf_col in existing_df.columns:
+                    value = inc_row.get(inc_col, "")
+                    existing_df.at[existing_index, pdf_col] = value
+
+
+def legacy_derive_cube_columns(existing_df):
+    """The original cube derivation from process_csv_file, kept as the baseline."""
+    if "BOL Cube" in existing_df.columns:
+        pallet_values = existing_df["BOL Cube"].apply(lambda x: compute_pallet(x))
+        existing_df["Pallet"] = pd.Series("", index=existing_df.index, dtype=object)
+    else:
+        pallet_values = pd.Series([""] * len(existing_df))
+
+    if "Ship To Name" in existing_df.columns:
+        burlington_values = existing_df.apply(
+            lambda row: compute_burlington(row["Ship To Name"], pallet_values.iloc[row.name]),
+            axis=1
+        )
+        final_cube_values = existing_df.apply(
+            lambda row: compute_final_cube(row["Ship To Name"], pallet_values.iloc[row.name]),
+            axis=1
+        )
+        existing_df["Burlington Cube"] = pd.Series("", index=existing_df.index, dtype=object)
+        existing_df["Final Cube"] = pd.Series("", index=existing_df.index, dtype=object)
+    else:
+        burlington_values = pd.Series([""] * len(existing_df))
+        final_cube_values = pd.Series([""] * len(existing_df))
+
+    current_invoice = None
+    is_first_row = True
+    for idx in range(len(existing_df)):
+        invoice_no = existing_df.iloc[idx]["Invoice No."]
+        if invoice_no != current_invoice:
+            current_invoice = invoice_no
+            is_first_row = True
+        if is_first_row:
+            existing_df.iloc[idx, existing_df.columns.get_loc("Pallet")] = pallet_values.iloc[idx]
+            existing_df.iloc[idx, existing_df.columns.get_loc("Burlington Cube")] = burlington_values.iloc[idx]
+            existing_df.iloc[idx, existing_df.columns.get_loc("Final Cube")] = final_cube_values.iloc[idx]
+            is_first_row = False
+
+
+def legacy_parse_cancel_date(date_str):
+    """The original parse_cancel_date from process_csv_file, kept as the baseline."""
+    date_str = str(date_str).strip()
+    if len(date_str) == 7:
+        month = date_str[0]
+        day = date_str[1:3]
+        year = date_str[3:]
+        try:
+            return pd.to_datetime(f"{month.zfill(2)}/{day}/{year}", format="%m/%d/%Y")
+        except:
+            return pd.NaT
+    elif len(date_str) == 8:
+        month = date_str[0:2]
+        day = date_str[2:4]
+        year = date_str[4:]
+        try:
+            return pd.to_datetime(f"{month}/{day}/{year}", format="%m/%d/%Y")
+        except:
+            return pd.NaT
+    return pd.NaT
+
+
+def legacy_sort_by_cancel_date(existing_df):
+    """The original Cancel Date sort from process_csv_file, kept as the baseline."""
+    existing_df["Cancel Date_dt"] = existing_df["Cancel Date"].apply(legacy_parse_cancel_date)
+    existing_df["min_cancel_date"] = existing_df.groupby("Ship To Name")["Cancel Date_dt"].transform("min")
+    existing_df.sort_values(by=["min_cancel_date", "Ship To Name", "Cancel Date_dt"], inplace=True)
+    existing_df.drop(columns=["min_cancel_date", "Cancel Date_dt"], inplace=True)
+
+
+def synthetic_cancel_dates(row_count, seed=42):
+    """Ship To names with 7- and 8-digit Cancel Dates plus malformed values."""
+    rng = random.Random(seed)
+
+    def cancel_date():
+        month, day, year = rng.randint(1, 12), rng.randint(1, 31), rng.choice([2024, 2025, 2026])
+        return rng.choice([
+            f"{month}{day:02d}{year}", f"{month:02d}{day:02d}{year}", f"{month:02d}{day:02d}{year}",
+            "", None, "n/a", f"{month}/{day}/{year}", f" {month}{day:02d}{year} ",
+        ])
+
+    return pd.DataFrame({
+        "Ship To Name": [rng.choice(["BURLINGTON #12", "ROSS 7", "TJ MAXX", "MARSHALLS", None])
+                         for _ in range(row_count)],
+        "Cancel Date": [cancel_date() for _ in range(row_count)],
+        "Row": [str(n) for n in range(row_count)],
+    }, dtype=str)
+
+
+def synthetic_pdf_rows(row_count, seed=42):
+    """Combined-CSV rows: invoices of 1-8 rows sharing a BOL cube, mixed Ship To names."""
+    rng = random.Random(seed)
+    invoices, cubes, ship_to = [], [], []
+    while len(invoices) < row_count:
+        invoice = rng.choice([f"A{rng.randrange(100000)}", None])
+        cube = rng.choice([f"{rng.uniform(0, 999):.2f}", "1,234.50", "", None, "n/a", "80", "0"])
+        name = rng.choice(["BURLINGTON #12", "Burlington Stores", "ROSS 7", "TJ MAXX", "", None])
+        for _ in range(rng.randint(1, 8)):
+            invoices.append(invoice)
+            cubes.append(cube)
+            ship_to.append(name)
+    return pd.DataFrame({
+        "Invoice No.": invoices[:row_count], "BOL Cube": cubes[:row_count], "Ship To Name": ship_to[:row_count],
+        "Pallet": [None] * row_count, "Burlington Cube": [None] * row_count, "Final Cube": [None] * row_count,
+    }, dtype=str)
+
+
+def synthetic_frames(row_count, seed=42):
+    """PDF rows and an incoming export sharing ~80% of keys, with some duplicate keys on both sides."""
+    rng = random.Random(seed)
+    key_space = max(1, int(row_count * 0.9))
+    existing = pd.DataFrame({
+        "match_key": [f"a{rng.randrange(key_space)}_st{rng.randrange(50)}" for _ in range(row_count)],
+        **{pdf_col: [""] * row_count for pdf_col in ADDITIONAL_MAPPING.values()},
+    }, dtype=str)
+    incoming_keys = [
+        key if rng.random() < 0.8 else f"missing{n}"
+        for n, key in enumerate(rng.choices(existing["match_key"].tolist(), k=row_count))
+    ]
+    incoming = pd.DataFrame({
+        "match_key": incoming_keys,
+        **{inc_col: [f"{inc_col[:3]}{n}" for n in range(row_count)] for inc_col in ADDITIONAL_MAPPING},
+    }, dtype=str)
+    return existing, incoming
+
+
+def synthetic_key_frame(row_count, seed=42):
+    """PDF-style key columns with thousands separators, padding, mixed case and gaps."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Invoice No.": [rng.choice(["A", "b", " C"]) + str(rng.randrange(10000)) for _ in range(row_count)],
+        "Style": [rng.choice(["ST", "st", "Xy"]) + str(rng.randrange(500)) + rng.choice(["", " "]) for _ in range(row_count)],
+        "Cartons": [rng.choice([str(rng.randrange(100)), None, ""]) for _ in range(row_count)],
+        "Individual Pieces": [f"{rng.randrange(5000):,}" for _ in range(row_count)],
+    }, dtype=str)
+
+
+def _time(fn, existing, incoming):
+    existing = existing.copy()
+    start = time.perf_counter()
+    fn(existing, incoming, ADDITIONAL_MAPPING)
+    return time.perf_counter() - start, existing
+
+
+def run(sizes=(1000, 5000, 10000, 50000, 100000), legacy_limit=10000):
+    print("Merge of N incoming rows into N PDF rows")
+    print(f"  {'rows':>8} {'row scan':>12} {'keyed join':>12} {'speed-up':>10}")
+    for size in sizes:
+        existing, incoming = synthetic_frames(size)
+        joined, joined_df = _time(merge_additional_fields, existing, incoming)
+        if size <= legacy_limit:
+            legacy, legacy_df = _time(legacy_merge, existing, incoming)
+            assert legacy_df.equals(joined_df)
+            print(f"  {size:>8,} {legacy * 1000:>10.1f}ms {joined * 1000:>10.1f}ms {legacy / joined:>9.1f}x")
+        else:
+            print(f"  {size:>8,} {'(skipped)':>12} {joined * 1000:>10.1f}ms {'':>10}")
+
+    print()
+    print("Match key over N rows of the four key columns")
+    print(f"  {'rows':>8} {'row apply':>12} {'columnwise':>12} {'speed-up':>10}")
+    for size in sizes:
+        frame = synthetic_key_frame(size)
+        start = time.perf_counter()
+        legacy_keys = legacy_match_key(frame, KEY_COLUMNS)
+        legacy = time.perf_counter() - start
+        start = time.perf_counter()
+        keys = build_match_key(frame, KEY_COLUMNS)
+        columnwise = time.perf_counter() - start
+        assert keys.tolist() == legacy_keys.tolist()
+        print(f"  {size:>8,} {legacy * 1000:>10.1f}ms {columnwise * 1000:>10.1f}ms {legacy / columnwise:>9.1f}x")
+
+    print()
+    print("Pallet / Burlington Cube / Final Cube over N PDF rows")
+    print(f"  {'rows':>8} {'row apply':>12} {'columnar':>12} {'speed-up':>10}")
+    for size in sizes:
+        frame = synthetic_pdf_rows(size)
+        legacy, legacy_df = _time(lambda df, *_: legacy_derive_cube_columns(df), frame, None)
+        columnar, columnar_df = _time(lambda df, *_: derive_cube_columns(df), frame, None)
+        assert columnar_df.equals(legacy_df)
+        print(f"  {size:>8,} {legacy * 1000:>10.1f}ms {columnar * 1000:>10.1f}ms {legacy / columnar:>9.1f}x")
+
+    print()
+    print("Cancel Date parse and group sort over N PDF rows")
+    print(f"  {'rows':>8} {'row apply':>12} {'vectorized':>12} {'speed-up':>10}")
+    for size in sizes:
+        frame = synthetic_cancel_dates(size)
+        legacy, legacy_df = _time(lambda df, *_: legacy_sort_by_cancel_date(df), frame, None)
+        vectorized, vectorized_df = _time(lambda df, *_: sort_by_cancel_date(df), frame, None)
+        assert vectorized_df.equals(legacy_df)
+        print(f"  {size:>8,} {legacy * 1000:>10.1f}ms {vectorized * 1000:>10.1f}ms {legacy / vectorized:>9.1f}x")
+
+
+if __name__ == "__main__":
+    limit = 10000
+    if "--legacy-limit" in sys.argv:
+        limit = int(sys.argv[sys.argv.index("--legacy-limit") + 1])
+    run(legacy_limit=limit)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak RSS of collecting and writing a large consolidated load.
+
+"legacy" reproduces the former records: a dict per page holding 4-string row lists,
+a second list of 6-element rows per invoice, and each invoice's CSV built in a
+StringIO. "records" is the current DataProcessor: PageResults and TableRows kept
+as parsed and fed straight to the CSV writer. Each variant runs in its own process
+so its peak RSS (ru_maxrss) is its own.
+
+Usage: python bench_invoice_memory.py [row_count]
+"""
+
+import io
+import os
+import csv
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+import logging
+from bol_parser import parse_page
+from data_processor import DataProcessor
+from output_schema import BOL_SCHEMA
+from pdf_fixtures import bol_page_lines
+
+ROWS_PER_PAGE = 50
+# A consolidated load: 100,000 rows make one invoice
+PAGES_PER_INVOICE = 2000
+
+
+def synthetic_page_texts(row_count):
+    """(page_id, text) of BOL pages holding row_count table rows in total, generated lazily."""
+    for page in range(row_count // ROWS_PER_PAGE):
+        invoice_no = f"A{1000 + page // PAGES_PER_INVOICE}"
+        rows = [(n, f"ST{page:05d}{n}", n * 12, f"{n * 1.5:.1f}") for n in range(1, ROWS_PER_PAGE + 1)]
+        yield str(page + 1), "\n".join(bol_page_lines(invoice_no, rows, totals=False))
+
+
+def _legacy(pages, work_dir):
+    invoice_data = {}
+    for _, text in pages:
+        page = parse_page(text)
+        invoice = invoice_data.setdefault(page.invoice_no, {'pages': [], 'has_totals': False})
+        invoice['pages'].append({'rows': [list(row) for row in page.rows], 'has_totals': page.has_totals,
+                                 'totals': page.totals, 'bol_cube': page.bol_cube})
+
+    header = list(BOL_SCHEMA.header)
+    for invoice_no, data in invoice_data.items():
+        bol_cube = data['pages'][0]['bol_cube']
+        all_rows = [[row[0], bol_cube, row[1], row[2], invoice_no, row[3]]
+                    for page in data['pages'] for row in page['rows']]
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(header)
+        for row_data in sorted(all_rows, key=lambda x: x[4]):
+            data_row = [""] * 28
+            data_row[13], data_row[16], data_row[20] = row_data[0], row_data[1], row_data[2]
+            data_row[22], data_row[24], data_row[25] = row_data[3], row_data[4], row_data[5]
+            writer.writerow(data_row)
+        with open(os.path.join(work_dir, f"{invoice_no}.csv"), 'w', encoding='utf-8', newline='') as f:
+            f.write(output.getvalue())
+
+
+def _records(pages, work_dir):
+    assert DataProcessor(session_dir=work_dir).process_pages(pages, combined=True)
+
+
+VARIANTS = {'legacy': _legacy, 'records': _records}
+
+
+def _measure(variant, row_count):
+    """Run one variant in this process and print its peak RSS and time."""
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as work_dir:
+        baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        VARIANTS[variant](synthetic_page_texts(row_count), work_dir)
+        seconds = time.perf_counter() - start
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(peak_kb, peak_kb - baseline_kb, seconds)
+
+
+def run(row_count=100_000):
+    print(f"Collecting and writing {row_count:,} rows ({row_count // ROWS_PER_PAGE:,} pages)")
+    for variant in VARIANTS:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--variant', variant, str(row_count)],
+                                capture_output=True, text=True, check=True).stdout.splitlines()[-1].split()
+        peak_kb, growth_kb, seconds = int(output[0]), int(output[1]), float(output[2])
+        print(f"  {variant:8}: peak RSS {peak_kb / 1024:7.1f} MB (+{growth_kb / 1024:6.1f} MB), {seconds:6.2f} s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == '--variant':
+        _measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: re-extracting a re-issued BOL PDF with the per-page text cache.
+
+Extracts a synthetic N-page PDF without the cache, then with a cold cache, then
+a re-issue of it where a single page changed.
+
+Usage: python bench_page_cache.py [page_count]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from page_cache import PageTextCache
+from pdf_processor import PDFProcessor
+from pdf_fixtures import write_text_pdf, bol_page_lines
+
+
+def synthetic_pages(page_count, changed_page=None):
+    pages = []
+    for page in range(1, page_count + 1):
+        rows = [(n, f"ST{page:03d}{n}", n * 12, f"{n * 1.5:.1f}") for n in range(1, 31)]
+        if page == changed_page:
+            rows[0] = (99, "CHANGED", 1, "1.0")
+        pages.append(bol_page_lines(f"A{1000 + page}", rows, page_label=f"Page {page}"))
+    return pages
+
+
+def _extract(pdf_path, text_cache):
+    processor = PDFProcessor(os.path.dirname(pdf_path), workers=1, text_cache=text_cache)
+    start = time.perf_counter()
+    texts = list(processor.iter_pages(pdf_path))
+    return time.perf_counter() - start, texts
+
+
+def run(page_count=50):
+    with tempfile.TemporaryDirectory() as work_dir:
+        original = write_text_pdf(os.path.join(work_dir, "original.pdf"), synthetic_pages(page_count))
+        reissue = write_text_pdf(os.path.join(work_dir, "reissue.pdf"),
+                                 synthetic_pages(page_count, changed_page=page_count // 2))
+        cache = PageTextCache(os.path.join(work_dir, "pages.sqlite3"), max_pages=10000)
+
+        uncached, expected = _extract(reissue, False)
+        cold, _ = _extract(original, cache)
+        warm, texts = _extract(reissue, cache)
+        assert texts == expected
+        cache.close()
+
+    print(f"Extracting a {page_count}-page BOL PDF")
+    print(f"  no cache                : {uncached * 1000:8.1f} ms")
+    print(f"  cold cache (original)   : {cold * 1000:8.1f} ms")
+    print(f"  re-issue, 1 page changed: {warm * 1000:8.1f} ms ({uncached / warm:.1f}x faster)")
+    print(f"  one page without cache  : {uncached / page_count * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-page text versus the table-region text mode on dense BOL pages.
+
+Dense pages carry address blocks above the table and terms below it, which the
+parser never reads. Both modes must parse to the same PageResults.
+
+Usage: python bench_page_layout.py [page_count]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from bol_parser import parse_page
+from pdf_processor import PDFProcessor, TEXT_MODE_FULL, TEXT_MODE_TABLE
+from pdf_fixtures import write_text_pdf, bol_page_lines
+
+
+def dense_page(page, row_count=20):
+    rows = [(n, f"ST{page:03d}{n}", n * 12, f"{n * 1.5:.1f}") for n in range(1, row_count + 1)]
+    lines = bol_page_lines(f"A{1000 + page}", rows, page_label=f"Page {page}")
+    addresses = [f"ADDRESS LINE {n} 12345 NORTH DISTRIBUTION AVENUE SUITE {n} SPRINGFIELD" for n in range(5)]
+    terms = [f"TERMS AND CONDITIONS {n}: CARRIER ACCEPTS THE GOODS IN APPARENT GOOD ORDER" for n in range(30)]
+    # The invoice stays within the first lines, as the parser expects
+    return lines[:4] + addresses + lines[4:] + terms
+
+
+def _extract(pdf_path, text_mode):
+    processor = PDFProcessor(os.path.dirname(pdf_path), workers=1, text_cache=False, ocr=False,
+                             text_mode=text_mode)
+    start = time.perf_counter()
+    texts = [text for _, text in processor.iter_pages(pdf_path)]
+    return time.perf_counter() - start, texts
+
+
+def run(page_count=50):
+    with tempfile.TemporaryDirectory() as work_dir:
+        pdf_path = write_text_pdf(os.path.join(work_dir, "dense.pdf"),
+                                  [dense_page(page) for page in range(1, page_count + 1)])
+        full, full_texts = _extract(pdf_path, TEXT_MODE_FULL)
+        table, table_texts = _extract(pdf_path, TEXT_MODE_TABLE)
+
+    assert [parse_page(text) for text in table_texts] == [parse_page(text) for text in full_texts]
+    full_chars = sum(len(text) for text in full_texts)
+    table_chars = sum(len(text) for text in table_texts)
+
+    print(f"Extracting a {page_count}-page dense BOL PDF")
+    print(f"  full page   : {full * 1000:8.1f} ms ({full_chars} characters)")
+    print(f"  table region: {table * 1000:8.1f} ms ({table_chars} characters, {full / table:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
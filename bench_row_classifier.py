@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: table row classification on a 10k-line synthetic table.
+
+Compares the original per-call regex logic (_is_valid_table_row followed by a
+re.match per token to find the weight) with the precompiled TableRowClassifier.
+
+Usage: python bench_row_classifier.py [line_count]
+"""
+
+import sys
+import timeit
+from row_fixtures import legacy_parse_row, compiled_parse_row, synthetic_table
+
+
+def run(line_count=10000, repeat=5):
+    lines = synthetic_table(line_count)
+    assert [legacy_parse_row(line) for line in lines] == [compiled_parse_row(line) for line in lines]
+
+    legacy = min(timeit.repeat(lambda: [legacy_parse_row(line) for line in lines], number=1, repeat=repeat))
+    compiled = min(timeit.repeat(lambda: [compiled_parse_row(line) for line in lines], number=1, repeat=repeat))
+
+    print(f"Row classification on {line_count:,} synthetic table lines (best of {repeat})")
+    print(f"  legacy regex calls : {legacy * 1000:8.1f} ms ({legacy / line_count * 1e6:.2f} µs/line)")
+    print(f"  compiled classifier: {compiled * 1000:8.1f} ms ({compiled / line_count * 1e6:.2f} µs/line)")
+    print(f"  speed-up           : {legacy / compiled:8.2f}x")
+    return legacy, compiled
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,215 @@
+"""
+Single-pass parser for the text of one BOL page.
+
+One forward walk over the page lines finds the invoice number, the CARTONS/STYLE/PIECES
+table, its rows and totals, and the BOL cube that precedes "SHIPPING INSTRUCTIONS:".
+"""
+
+import re
+import logging
+from typing import NamedTuple
+
+# Bump whenever parsing or the CSV layout changes, so cached results are not reused
+PARSER_VERSION = "1"
+
+# Only the first few lines of a page carry the "BILL OF LADING <invoice>" heading
+INVOICE_SEARCH_LINES = 10
+
+INVOICE_PATTERN = re.compile(r'BILL OF LADING\s+([A-Z]\d+)', re.IGNORECASE)
+CUBE_PATTERN = re.compile(r'\b\d{1,3}\.\d{2}\b')
+
+# Lines that are clearly headers or instructions rather than table data
+SKIP_PATTERNS = [
+    r'^CARTONS.*STYLE.*PIECES',
+    r'^SHIPPING INSTRUCTIONS',
+    r'^TOTAL CARTONS',
+    r'^Page \d+',
+    r'^BILL OF LADING',
+    r'^[A-Z\s]+:',  # Lines ending with colon (like labels)
+]
+
+# Row classification results
+ROW = 'row'
+NOT_A_ROW = 'not a table row'
+INSUFFICIENT_TOKENS = 'insufficient tokens'
+NO_WEIGHT = 'no weight found'
+
+
+class TableRow(NamedTuple):
+    """One data row of a BOL table. Created once by the parser and written as is."""
+    cartons: str
+    pieces: str         # Individual pieces
+    weight: str         # Individual weight
+    style: str
+
+
+class PageResult(NamedTuple):
+    """Everything DataProcessor needs from one page; also kept as its page record."""
+    invoice_no: str
+    table_found: bool
+    rows: list          # TableRow per data row
+    has_totals: bool
+    totals: dict        # {'pieces': ..., 'weight': ...}
+    bol_cube: str
+
+
+class TableRowClassifier:
+    """Decide whether a table line is a data row and split it into its fields.
+
+    Every pattern is compiled once and each line is tokenised once. Build one per
+    process (ROW_CLASSIFIER) rather than per line or per page.
+    """
+
+    def __init__(self, skip_patterns=SKIP_PATTERNS):
+        # All skip patterns are anchored, so one alternation tried with match() is equivalent
+        self._skip = re.compile('|'.join(f'(?:{pattern})' for pattern in skip_patterns), re.IGNORECASE)
+        self._digit_start = re.compile(r'\d')
+        self._digit_runs = re.compile(r'\d+')
+        # Typical style codes: letters then digits, or digits then letters
+        self._style_code = re.compile(r'\b(?:[A-Z]+\d+|\d+[A-Z]+)\b')
+        self._weight = re.compile(r'\d+\.?\d*')
+
+    def classify(self, line):
+        """Classify a table line.
+
+        Returns (kind, row): kind is ROW, NOT_A_ROW, INSUFFICIENT_TOKENS or NO_WEIGHT, and
+        row is a TableRow when kind is ROW.
+        Lines whose cells are tab-separated (word-mode text, see page_layout) take
+        cartons, style and pieces from the first three cells instead of tokens.
+        """
+        tokens = line.split()
+        if not tokens:
+            return NOT_A_ROW, None
+
+        normalized = ' '.join(tokens)
+        if self._skip.match(normalized) or not self._looks_like_data(normalized, tokens):
+            return NOT_A_ROW, None
+
+        fields = tokens
+        if '\t' in line:
+            fields = [cell.strip() for cell in line.split('\t')]
+            if not all(fields[:3]):
+                return INSUFFICIENT_TOKENS, None
+        if len(fields) < 3:
+            return INSUFFICIENT_TOKENS, None
+
+        # The weight should be the last numeric token
+        for token in reversed(tokens):
+            token = token.replace(',', '')
+            if self._weight.fullmatch(token):
+                return ROW, TableRow(fields[0].replace(',', ''), fields[2].replace(',', ''), token, fields[1])
+        return NO_WEIGHT, None
+
+    def is_table_row(self, line):
+        """Check if a line is a table row, whether or not its fields can be read."""
+        return self.classify(line)[0] != NOT_A_ROW
+
+    def _looks_like_data(self, normalized, tokens):
+        # 1. Starts with a number
+        if self._digit_start.match(normalized):
+            return True
+
+        # 2. Contains multiple numeric values (could be a table row with formatting issues)
+        if len(self._digit_runs.findall(normalized)) >= 3:
+            return True
+
+        # 3. Contains a style code plus at least one token that starts with a number
+        if self._style_code.search(normalized):
+            return len(tokens) >= 3 and any(self._digit_start.match(token) for token in tokens)
+
+        return False
+
+
+ROW_CLASSIFIER = TableRowClassifier()
+
+
+def is_table_row(line):
+    """Check if a line is a valid table row using more flexible criteria."""
+    return ROW_CLASSIFIER.is_table_row(line)
+
+
+def parse_totals(line):
+    """Read pieces and weight from a line like
+    "30 TOTAL CARTONS 2,160 TOTAL PIECES TOTAL VOL / WGT 595.2"."""
+    totals = {'pieces': '', 'weight': ''}
+    tokens = line.split()
+    if len(tokens) >= 11:
+        totals['pieces'] = tokens[3].replace(',', '')
+        totals['weight'] = tokens[-1].replace(',', '')
+    return totals
+
+
+def parse_page(content, log=None):
+    """Parse the text of one page in a single forward pass and return a PageResult.
+
+    When log (a logger or SessionLogger) has DEBUG enabled, every added and skipped
+    table line is logged; otherwise no per-row message is built.
+    """
+    log_rows = log is not None and log.isEnabledFor(logging.DEBUG)
+
+    invoice_no = ""
+    invoice_done = False
+
+    table_found = False
+    in_table = False
+    rows = []
+    has_totals = False
+    totals = {'pieces': '', 'weight': ''}
+
+    # The BOL cube is the closest cube-looking value above the first
+    # "SHIPPING INSTRUCTIONS:" line, i.e. the last one seen before it.
+    bol_cube = ""
+    cube_candidate = ""
+    cube_done = False
+
+    for index, line in enumerate(content.splitlines()):
+        upper = line.upper()
+
+        if not invoice_done:
+            if index >= INVOICE_SEARCH_LINES:
+                invoice_done = True
+            elif "BILL OF LADING" in upper:
+                match = INVOICE_PATTERN.search(line)
+                if match:
+                    invoice_no = match.group(1)
+                    invoice_done = True
+
+        if not cube_done:
+            if "SHIPPING INSTRUCTIONS:" in upper:
+                bol_cube = cube_candidate
+                cube_done = True
+            else:
+                match = CUBE_PATTERN.search(line)
+                if match:
+                    cube_candidate = match.group(0)
+
+        if in_table:
+            # Check for totals first, then the end of the table
+            if "TOTAL CARTONS" in upper:
+                has_totals = True
+                totals = parse_totals(line)
+                in_table = False
+                if log_rows:
+                    log.debug("  Found totals at line %d: pieces=%s, weight=%s",
+                              index + 1, totals['pieces'], totals['weight'])
+            elif "SHIPPING INSTRUCTIONS:" in upper:
+                in_table = False
+            else:
+                kind, row = ROW_CLASSIFIER.classify(line)
+                if kind is ROW:
+                    rows.append(row)
+                    if log_rows:
+                        log.debug("  Line %d: Added row - cartons=%s, style=%s, pieces=%s, weight=%s",
+                                  index + 1, row[0], row[3], row[1], row[2])
+                elif log_rows and line.strip():
+                    log.debug("  Line %d: Skipped (%s) - %s", index + 1, kind, line.strip())
+        elif not table_found and "CARTONS" in upper and "STYLE" in upper and "PIECES" in upper:
+            table_found = True
+            in_table = True
+            if log_rows:
+                log.debug("  Found table header at line %d: %s", index, line.strip())
+
+        if invoice_done and cube_done and table_found and not in_table:
+            break
+
+    return PageResult(invoice_no, table_found, rows, has_totals, totals, bol_cube)
@@ -13,6 +13,93 @@ else:
 
 # File Processing
 OUTPUT_CSV_NAME = "combined_data.csv"
+# Write every invoice of a PDF upload straight into OUTPUT_CSV_NAME (one writer, temp file
+# plus rename) instead of one CSV per invoice that CSVExporter combines afterwards
+SINGLE_WRITER_EXPORT = os.environ.get("SINGLE_WRITER_EXPORT", "1").lower() in ("1", "true", "yes")
+# JSON list of output columns replacing the built-in 28-column BOL layout, e.g. to add
+# customer-specific columns (see output_schema; empty = the BOL layout)
+OUTPUT_SCHEMA_PATH = os.environ.get("OUTPUT_SCHEMA_PATH", "")
+
+# Uploads
+# Largest PDF accepted, after base64 decoding (request bodies may be a third larger for base64)
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", "100"))
+# Uploads are written to disk and base64-decoded in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Largest form field (KB) held in memory; base64 attachment fields are streamed to disk instead
+MAX_FORM_FIELD_KB = int(os.environ.get("MAX_FORM_FIELD_KB", "500"))
+
+# PDF Text Extraction
+# Worker processes used to extract page text (1 = extract in the request process)
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", "1"))
+# What text is laid out per page: "full" (the whole page), "table" (only the invoice
+# line and the table region, see page_layout; falls back to the whole page when not found)
+# or "words" (the page's words, with table rows split into cells by column position)
+PDF_TEXT_MODE = os.environ.get("PDF_TEXT_MODE", "full").lower()
+# Number of consecutive pages handed to a worker per task
+PDF_PAGES_PER_TASK = int(os.environ.get("PDF_PAGES_PER_TASK", "8"))
+# Extra address space (MB) a worker may map beyond its start-up footprint (0 = no cap)
+PDF_WORKER_MAX_MEMORY_MB = int(os.environ.get("PDF_WORKER_MAX_MEMORY_MB", "512"))
+# Tasks a worker runs before it is replaced, so pdfminer caches never accumulate
+PDF_WORKER_MAX_TASKS = int(os.environ.get("PDF_WORKER_MAX_TASKS", "50"))
+# Persistent cache of extracted page text, keyed by a hash of each page's content stream
+PAGE_TEXT_CACHE_PATH = os.environ.get(
+    "PAGE_TEXT_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "page_text_cache.sqlite3"))
+# Pages kept in the cache; least recently used pages are pruned beyond this (0 = disabled)
+PAGE_TEXT_CACHE_MAX_PAGES = int(os.environ.get("PAGE_TEXT_CACHE_MAX_PAGES", "50000"))
+# Debug sink: also write each extracted page to <session>/<page>.txt in the in-memory pipeline
+PERSIST_PAGE_TEXT = os.environ.get("PERSIST_PAGE_TEXT", "").lower() in ("1", "true", "yes")
+
+# PDF Page Images (extract_images)
+# Render resolution, output format ("jpeg" or "png") and pdftoppm threads per batch
+PDF_IMAGE_DPI = int(os.environ.get("PDF_IMAGE_DPI", "200"))
+PDF_IMAGE_FORMAT = os.environ.get("PDF_IMAGE_FORMAT", "jpeg").lower()
+PDF_IMAGE_THREADS = int(os.environ.get("PDF_IMAGE_THREADS", "1"))
+# Pages rendered per pdftoppm call; only one batch is on disk in the scratch folder at a time
+PDF_IMAGE_BATCH_PAGES = int(os.environ.get("PDF_IMAGE_BATCH_PAGES", "4"))
+
+# OCR Fallback
+# OCR pages without a text layer (scans) when pytesseract, Tesseract and Poppler are installed
+OCR_ENABLED = os.environ.get("OCR_ENABLED", "1").lower() in ("1", "true", "yes")
+# Render resolution for OCR; Tesseract reads printed text best around 300 DPI
+OCR_DPI = int(os.environ.get("OCR_DPI", "300"))
+# Pages recognised at the same time (each runs its own tesseract process)
+OCR_THREADS = int(os.environ.get("OCR_THREADS", "2"))
+# Tesseract language(s), e.g. "eng" or "eng+spa"
+OCR_LANG = os.environ.get("OCR_LANG", "eng")
+# Extra tesseract options; --psm 6 reads the page as one block so table rows stay on one line
+OCR_TESSERACT_CONFIG = os.environ.get("OCR_TESSERACT_CONFIG", "--psm 6")
+# Give up on a page after this many seconds (0 = no limit)
+OCR_PAGE_TIMEOUT = int(os.environ.get("OCR_PAGE_TIMEOUT", "60"))
+
+# Logging
+# Default level for all loggers; row-level detail is only logged at DEBUG
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# Comma-separated session IDs that always log at DEBUG (row-level parsing detail)
+DEBUG_SESSIONS = {s.strip() for s in os.environ.get("DEBUG_SESSIONS", "").split(",") if s.strip()}
+
+# Background Jobs
+# Threads that run queued PDF uploads (per web worker process)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+# Queue uploads by default (202 + job polling); ?_async=0/1 overrides per request
+ASYNC_UPLOADS = os.environ.get("ASYNC_UPLOADS", "").lower() in ("1", "true", "yes")
+# A queued/running job whose status has not been updated for this long is treated as dead
+JOB_STALE_SECONDS = int(os.environ.get("JOB_STALE_SECONDS", "900"))
+
+# Result Cache
+# Combined CSVs of processed PDFs, keyed by the SHA-256 of the PDF bytes
+RESULT_CACHE_DIR = os.environ.get(
+    "RESULT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "result_cache"))
+# Size bound for the cache directory; least recently used entries are evicted (0 = disabled)
+RESULT_CACHE_MAX_MB = int(os.environ.get("RESULT_CACHE_MAX_MB", "256"))
+
+# Batch Uploads
+# Documents of one batch upload processed at the same time (threads; extraction itself
+# runs on the PDF_EXTRACT_WORKERS pool when that is above 1)
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "2"))
+# Most PDFs accepted in one batch, counting the PDFs inside zip files
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "50"))
+# Most bytes a batch's zip files may expand to
+BATCH_MAX_UNZIPPED_MB = int(os.environ.get("BATCH_MAX_UNZIPPED_MB", "256"))
 
 # Modelss
 OPENAI_MODEL = "o3-mini"
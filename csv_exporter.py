@@ -1,9 +1,16 @@
 import os
 import gc
 import glob
+import time
+import logging
 import pandas as pd
 from config import OUTPUT_CSV_NAME
 
+logger = logging.getLogger(__name__)
+
+# Bytes copied per read when concatenating CSV files
+COPY_CHUNK_SIZE = 1024 * 1024
+
 class CSVExporter:
     def __init__(self, session_dir):
         """Initialize the CSV exporter with a session directory."""
@@ -17,77 +24,123 @@ class CSVExporter:
                         if os.path.basename(f) != OUTPUT_CSV_NAME]
 
             if not csv_files:
-                print("No CSV files found to combine")
+                logger.warning("No CSV files found to combine")
                 return False
 
-            print(f"Found {len(csv_files)} CSV files to combine")
-
-            # Process files in chunks to conserve memory
-            chunk_size = 5
+            logger.info("Found %d CSV files to combine", len(csv_files))
             output_path = os.path.join(self.session_dir, OUTPUT_CSV_NAME)
-            first_file = True
-
-            for i in range(0, len(csv_files), chunk_size):
-                chunk = csv_files[i:i + chunk_size]
-                print(f"Processing chunk {i//chunk_size + 1} of {(len(csv_files) + chunk_size - 1)//chunk_size}")
-                
-                # Read and combine chunk of CSV files
-                dfs = []
-                files_to_remove = []
-                for file in chunk:
-                    try:
-                        # Read CSV in chunks
-                        for df_chunk in pd.read_csv(file, chunksize=1000, dtype=str):
-                            dfs.append(df_chunk)
-                        files_to_remove.append(file)  # Mark for removal after reading
-                    except Exception as e:
-                        print(f"Error processing {file}: {str(e)}")
-                        continue
-
-                if not dfs:
-                    continue
 
-                # Combine chunks and write to output
-                chunk_df = pd.concat(dfs, ignore_index=True)
-                
-                if first_file:
-                    # Write with header for first chunk
-                    chunk_df.to_csv(output_path, index=False, mode='w')
-                    first_file = False
-                else:
-                    # Append without header for subsequent chunks
-                    chunk_df.to_csv(output_path, index=False, mode='a', header=False)
-
-                # **ROBUST CLEANUP**: Remove individual CSV files after successful combining
-                for file in files_to_remove:
-                    max_attempts = 3
-                    for attempt in range(max_attempts):
-                        try:
-                            if os.path.exists(file):
-                                os.remove(file)
-                                print(f"✅ Removed individual CSV: {os.path.basename(file)}")
-                                break
-                        except Exception as e:
-                            if attempt < max_attempts - 1:
-                                print(f"⚠️ Attempt {attempt + 1} failed to remove {file}: {str(e)}")
-                                import time
-                                time.sleep(0.1)  # Brief wait before retry
-                            else:
-                                print(f"❌ FAILED to remove {file} after {max_attempts} attempts: {str(e)}")
-                                print(f"❌ This may cause contamination detection in future workflows")
-
-                # Clear memory
-                del dfs
-                del chunk_df
-                gc.collect()
-
-            print(f"Successfully combined files into {OUTPUT_CSV_NAME}")
+            # Every file written by DataProcessor has the same header, so the rows can be
+            # copied across as bytes; pandas only has to reconcile differing headers
+            if self._read_common_header(csv_files) is not None:
+                self._concatenate(csv_files, output_path)
+                self._remove_files(csv_files)
+            else:
+                logger.info("CSV headers differ, combining with pandas")
+                self._combine_with_pandas(csv_files, output_path)
+
+            logger.info("Successfully combined %d files into %s", len(csv_files), OUTPUT_CSV_NAME)
             return True
 
         except Exception as e:
-            print(f"Error combining CSV files: {str(e)}")
+            logger.error("Error combining CSV files: %s", e)
             return False
 
+    @staticmethod
+    def _read_common_header(csv_files):
+        """The header line shared by all files, or None when any file's header differs or is missing."""
+        header = None
+        for file in csv_files:
+            with open(file, 'rb') as f:
+                line = f.readline()
+            if not line.strip() or (header is not None and line.rstrip(b"\r\n") != header.rstrip(b"\r\n")):
+                return None
+            header = header or line
+        return header
+
+    @staticmethod
+    def _concatenate(csv_files, output_path):
+        """Write the first file's header, then the rows of every file, with buffered byte copies."""
+        with open(output_path, 'wb') as out:
+            for index, file in enumerate(csv_files):
+                with open(file, 'rb') as f:
+                    header = f.readline()
+                    if index == 0:
+                        out.write(header)
+                    last_chunk = b""
+                    for chunk in iter(lambda: f.read(COPY_CHUNK_SIZE), b""):
+                        out.write(chunk)
+                        last_chunk = chunk
+                # A file without a trailing newline must not run into the next one
+                if last_chunk and not last_chunk.endswith(b"\n"):
+                    out.write(b"\r\n" if header.endswith(b"\r\n") else b"\n")
+                logger.debug("Copied %s", os.path.basename(file))
+
+    def _combine_with_pandas(self, csv_files, output_path):
+        """Combine files with differing headers through pandas, aligning columns by name."""
+        # Process files in chunks to conserve memory
+        chunk_size = 5
+        first_file = True
+
+        for i in range(0, len(csv_files), chunk_size):
+            chunk = csv_files[i:i + chunk_size]
+            logger.debug("Processing chunk %d of %d", i // chunk_size + 1, (len(csv_files) + chunk_size - 1) // chunk_size)
+
+            # Read and combine chunk of CSV files
+            dfs = []
+            files_to_remove = []
+            for file in chunk:
+                try:
+                    # Read CSV in chunks
+                    for df_chunk in pd.read_csv(file, chunksize=1000, dtype=str):
+                        dfs.append(df_chunk)
+                    files_to_remove.append(file)  # Mark for removal after reading
+                except Exception as e:
+                    logger.error("Error processing %s: %s", file, e)
+                    continue
+
+            if not dfs:
+                continue
+
+            # Combine chunks and write to output
+            chunk_df = pd.concat(dfs, ignore_index=True)
+
+            if first_file:
+                # Write with header for first chunk
+                chunk_df.to_csv(output_path, index=False, mode='w')
+                first_file = False
+            else:
+                # Append without header for subsequent chunks
+                chunk_df.to_csv(output_path, index=False, mode='a', header=False)
+
+            self._remove_files(files_to_remove)
+
+            # Clear memory
+            del dfs
+            del chunk_df
+            gc.collect()
+
+    @staticmethod
+    def _remove_files(files):
+        """**ROBUST CLEANUP**: Remove individual CSV files after successful combining."""
+        for file in files:
+            max_attempts = 3
+            for attempt in range(max_attempts):
+                try:
+                    if os.path.exists(file):
+                        os.remove(file)
+                        logger.debug("✅ Removed individual CSV: %s", os.path.basename(file))
+                        break
+                except Exception as e:
+                    if attempt < max_attempts - 1:
+                        logger.warning("⚠️ Attempt %d failed to remove %s: %s", attempt + 1, file, e)
+                        time.sleep(0.1)  # Brief wait before retry
+                    else:
+                        logger.error("❌ FAILED to remove %s after %d attempts: %s", file, max_attempts, e)
+                        logger.error("❌ This may cause contamination detection in future workflows")
+
 if __name__ == "__main__":
+    from utils import configure_logging
+    configure_logging()
     exporter = CSVExporter(".")
     exporter.combine_to_csv()
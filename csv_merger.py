@@ -0,0 +1,171 @@
+"""
+Column-wise helpers for merging an incoming customer CSV/Excel export into the
+combined PDF CSV (see process_csv_file in app.py).
+"""
+
+import math
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MATCH_KEY = "match_key"
+
+# Cube arithmetic: a pallet holds 80 cube; Burlington ships count 93 per pallet, others 130
+CUBE_PER_PALLET = 80
+BURLINGTON_CUBE_PER_PALLET = 93
+FINAL_CUBE_PER_PALLET = 130
+
+
+def build_match_key(df, cols):
+    """Build the composite match key with column-wise string operations.
+
+    Each value is stripped, loses its commas and is lowercased; the columns are
+    joined with "_". Missing values count as empty strings.
+    """
+    parts = [
+        df[col].fillna('').astype(str).str.strip().str.replace(',', '', regex=False).str.lower()
+        for col in cols
+    ]
+    if not parts:
+        return pd.Series('', index=df.index, dtype=object)
+    return parts[0].str.cat(parts[1:], sep='_') if len(parts) > 1 else parts[0]
+
+
+def merge_additional_fields(existing_df, incoming_df, additional_mapping, key=MATCH_KEY):
+    """Copy the mapped incoming columns onto matching PDF rows with one keyed join.
+
+    Both frames must carry the composite key column. Matching follows the original
+    row-by-row merge: each incoming row updates the first PDF row with the same key,
+    and when several incoming rows share a key the last one wins.
+
+    existing_df is updated in place. Returns the number of PDF rows updated.
+    """
+    # Last incoming row per key, first PDF row per key
+    incoming_last = incoming_df.drop_duplicates(subset=key, keep="last").set_index(key)
+    first_keys = existing_df.loc[~existing_df[key].duplicated(keep="first"), key]
+    matched = first_keys[first_keys.isin(incoming_last.index)]
+
+    if matched.empty:
+        return 0
+
+    for inc_col, pdf_col in additional_mapping.items():
+        if inc_col in incoming_last.columns and pdf_col in existing_df.columns:
+            existing_df.loc[matched.index, pdf_col] = incoming_last.loc[matched.to_numpy(), inc_col].to_numpy()
+
+    logger.debug("Merged %d incoming rows into %d PDF rows", len(incoming_df), len(matched))
+    return len(matched)
+
+
+def compute_pallet(bol_cube):
+    """Compute pallet value from BOL Cube."""
+    try:
+        value = float(str(bol_cube).replace(",", "").strip())
+        return math.ceil(value / CUBE_PER_PALLET)
+    except Exception:
+        return ""
+
+def compute_burlington(ship_to_name, pallet):
+    """Compute Burlington Cube value."""
+    try:
+        if isinstance(ship_to_name, str) and "burlington" in ship_to_name.lower():
+            if pd.isna(pallet) or pallet == "":
+                return ""
+            return int(pallet) * BURLINGTON_CUBE_PER_PALLET
+    except Exception:
+        return ""
+    return ""
+
+def compute_final_cube(ship_to_name, pallet):
+    """Compute Final Cube value."""
+    try:
+        if isinstance(ship_to_name, str) and "burlington" not in ship_to_name.lower():
+            if pd.isna(pallet) or pallet == "":
+                return ""
+            return int(pallet) * FINAL_CUBE_PER_PALLET
+    except Exception:
+        return ""
+    return ""
+
+
+def _empty_column(df):
+    # object dtype, so the int cube values can be written next to ""
+    return pd.Series("", index=df.index, dtype=object)
+
+
+def derive_cube_columns(df, invoice_col="Invoice No.", bol_cube_col="BOL Cube", ship_to_col="Ship To Name",
+                        pallet_col="Pallet", burlington_col="Burlington Cube", final_cube_col="Final Cube"):
+    """Fill Pallet, Burlington Cube and Final Cube on the first row of each invoice.
+
+    Rows of one invoice are consecutive; a row starts a new invoice when its
+    invoice number differs from the previous row's (missing numbers never match).
+    BOL Cube repeats per invoice, so compute_pallet runs once per distinct value and
+    the results are spread back with the factorized codes. The *_col arguments name
+    the columns (an output column passed as None is not written). df is updated in place.
+    """
+    invoices = df[invoice_col]
+    first_rows = invoices.ne(invoices.shift()).to_numpy()
+    empty = np.full(len(df), "", dtype=object)
+    derived = {pallet_col: empty, burlington_col: empty, final_cube_col: empty}
+    recomputed = set()
+
+    if bol_cube_col in df.columns:
+        codes, uniques = pd.factorize(df[bol_cube_col])
+        # Missing cubes get code -1, which picks the trailing "" slot
+        pallets = np.array([compute_pallet(value) for value in uniques] + [""], dtype=object)
+        derived[pallet_col] = pallets[codes]
+        recomputed.add(pallet_col)
+    else:
+        logger.warning("Warning: '%s' column not found in existing CSV data.", bol_cube_col)
+        codes = np.full(len(df), -1)
+        pallets = np.array([""], dtype=object)
+
+    if ship_to_col in df.columns:
+        ship_to = df[ship_to_col]
+        is_burlington = ship_to.str.lower().str.contains("burlington", regex=False, na=False).to_numpy(dtype=bool)
+        has_name = ship_to.notna().to_numpy()
+
+        burlington = np.array([p * BURLINGTON_CUBE_PER_PALLET if p != "" else "" for p in pallets], dtype=object)
+        final_cube = np.array([p * FINAL_CUBE_PER_PALLET if p != "" else "" for p in pallets], dtype=object)
+        derived[burlington_col] = np.where(is_burlington, burlington[codes], "")
+        derived[final_cube_col] = np.where(has_name & ~is_burlington, final_cube[codes], "")
+        recomputed.update((burlington_col, final_cube_col))
+    else:
+        logger.warning("Warning: '%s' column not found in existing CSV data.", ship_to_col)
+
+    for column, values in derived.items():
+        if column is None:
+            continue
+        if column in recomputed:
+            df[column] = _empty_column(df)
+        df.loc[first_rows, column] = values[first_rows]
+
+
+def parse_cancel_dates(values):
+    """Convert a column of Cancel Date strings to datetimes in one pass.
+
+    Handles:
+    - 7-digit format:  MDDYYYY  (e.g. '3152025'  -> 03/15/2025)
+    - 8-digit format: MMDDYYYY  (e.g. '03152025' -> 03/15/2025)
+
+    Anything else, and any invalid date, becomes NaT.
+    """
+    text = values.fillna('').astype(str).str.strip()
+    lengths = text.str.len()
+    # Pad the single-digit month so both encodings share one layout
+    text = text.where(lengths != 7, text.str[0].str.zfill(2) + text.str[1:])
+    slashed = (text.str[0:2] + "/" + text.str[2:4] + "/" + text.str[4:]).where(lengths.isin([7, 8]))
+    return pd.to_datetime(slashed, format="%m/%d/%Y", errors="coerce")
+
+
+def sort_by_cancel_date(df, cancel_col="Cancel Date", ship_to_col="Ship To Name"):
+    """Sort rows by the earliest Cancel Date of their Ship To Name, then Ship To Name,
+    then their own Cancel Date. df is sorted in place."""
+    df["Cancel Date_dt"] = parse_cancel_dates(df[cancel_col])
+
+    # Compute the earliest date per "Ship To Name":
+    df["min_cancel_date"] = df.groupby(ship_to_col)["Cancel Date_dt"].transform("min")
+
+    df.sort_values(by=["min_cancel_date", ship_to_col, "Cancel Date_dt"], inplace=True)
+    df.drop(columns=["min_cancel_date", "Cancel Date_dt"], inplace=True)
@@ -4,17 +4,47 @@ import csv
 import io
 import uuid
 import shutil
+import logging
+from itertools import chain
 from datetime import datetime
-from utils import FileUtils  # Removed OpenAI dependency
+from utils import FileUtils, SessionLogger  # Removed OpenAI dependency
+from bol_parser import parse_page, TableRow
+from output_schema import get_output_schema
+from config import OUTPUT_CSV_NAME
 import gc
 
+logger = logging.getLogger(__name__)
+
+class InvoiceData:
+    """Pages collected for one invoice; its PageResults are kept as they came from the parser."""
+    __slots__ = ('pages', 'has_totals')
+
+    def __init__(self):
+        self.pages = []          # PageResult per page with a table
+        self.has_totals = False
+
+    def rows(self):
+        """Every TableRow of the invoice, in page order."""
+        return chain.from_iterable(page.rows for page in self.pages)
+
+    def row_count(self):
+        return sum(len(page.rows) for page in self.pages)
+
+
 class DataProcessor:
-    def __init__(self, session_id=None):
-        """Initialize the data processor with a session directory."""
+    def __init__(self, session_id=None, debug=False, session_dir=None, schema=None):
+        """Initialize the data processor with a session directory.
+
+        debug enables row-level DEBUG logging for this session only. session_dir
+        overrides processing_sessions/<session_id>, e.g. for one document of a batch.
+        schema is the OutputSchema CSVs are written in (default: get_output_schema()).
+        """
         self.base_dir = FileUtils.get_script_dir()
         self.session_id = session_id or self._generate_session_id()
-        self.session_dir = os.path.join(self.base_dir, 'processing_sessions', self.session_id)
+        self.log = SessionLogger(logger, self.session_id, debug=debug)
+        self.session_dir = session_dir or os.path.join(self.base_dir, 'processing_sessions', self.session_id)
         self.invoice_data = {}  # Store data for multi-page invoices
+        self.schema = schema or get_output_schema()
         self._setup_session_directory()
 
     def _generate_session_id(self):
@@ -26,7 +56,7 @@ class DataProcessor:
     def _setup_session_directory(self):
         """Create the session directory if it doesn't exist."""
         os.makedirs(self.session_dir, exist_ok=True)
-        print(f"Created session directory: {self.session_dir}")
+        self.log.debug("Created session directory: %s", self.session_dir)
 
     @staticmethod
     def cleanup_sessions():
@@ -36,61 +66,97 @@ class DataProcessor:
         if os.path.exists(sessions_dir):
             try:
                 shutil.rmtree(sessions_dir)
-                print("Cleaned up all processing sessions")
+                logger.info("Cleaned up all processing sessions")
             except Exception as e:
-                print(f"Error cleaning up sessions: {str(e)}")
+                logger.error("Error cleaning up sessions: %s", e)
 
     def process_all_files(self):
         """Process all TXT files in the session directory."""
         # Get all txt files except requirements.txt
         txt_files = [f for f in FileUtils.get_txt_files(self.session_dir) if f != 'requirements.txt']
         if not txt_files:
-            print("No TXT files found in the session directory")
+            self.log.warning("No TXT files found in the session directory")
             return False
 
-        print(f"Found {len(txt_files)} TXT files to process")
+        self.log.info("Found %d TXT files to process", len(txt_files))
         
         try:
             # Process all files without deleting them first
-            print("=== PHASE 1: COLLECTING DATA FROM ALL FILES ===")
+            self.log.info("=== PHASE 1: COLLECTING DATA FROM ALL FILES ===")
             for txt_file in txt_files:
                 self._collect_invoice_data(txt_file)
             
-            # Validate collected data
-            print("=== DATA COLLECTION SUMMARY ===")
-            total_collected_rows = 0
-            for invoice_no, data in self.invoice_data.items():
-                invoice_rows = sum(len(page['rows']) for page in data['pages'])
-                total_collected_rows += invoice_rows
-                print(f"Invoice {invoice_no}: {len(data['pages'])} pages, {invoice_rows} rows")
-            print(f"TOTAL COLLECTED ROWS: {total_collected_rows}")
-            
-            # Process all collected data
-            print("\n=== PHASE 2: PROCESSING COLLECTED DATA ===")
-            total_processed_rows = 0
-            for invoice_no, pages_data in self.invoice_data.items():
-                rows_processed = self._process_invoice_data(invoice_no, pages_data)
-                total_processed_rows += rows_processed
-            
-            print(f"\n=== PROCESSING SUMMARY ===")
-            print(f"Total rows collected: {total_collected_rows}")
-            print(f"Total rows processed: {total_processed_rows}")
-            
-            if total_collected_rows != total_processed_rows:
-                print(f"⚠️  WARNING: Row count mismatch! {total_collected_rows - total_processed_rows} rows may have been lost!")
-            else:
-                print("✅ SUCCESS: All collected rows were processed successfully!")
+            self._process_collected_data()
             
             # Clean up TXT files only after successful processing
-            print("\n=== PHASE 3: CLEANING UP TXT FILES ===")
+            self.log.info("=== PHASE 3: CLEANING UP TXT FILES ===")
             self._cleanup_txt_files()
             
             return True
             
         except Exception as e:
-            print(f"Error processing files: {str(e)}")
+            self.log.error("Error processing files: %s", e)
             return False
 
+    def process_pages(self, pages, combined=False):
+        """Process (page_number, text) pairs streamed straight from the PDF extractor.
+
+        This is the in-memory counterpart of process_all_files: no TXT files are read or removed.
+        With combined, every invoice is written straight into OUTPUT_CSV_NAME instead of
+        one CSV per invoice (see _write_combined_csv), so no CSVExporter pass is needed.
+        """
+        try:
+            self.log.info("=== PHASE 1: COLLECTING DATA FROM EXTRACTED PAGES ===")
+            page_count = 0
+            for page_number, text in pages:
+                page_count += 1
+                try:
+                    self._collect_page_data(f"page {page_number}", text)
+                except Exception as e:
+                    self.log.error("Error collecting data from page %s: %s", page_number, e)
+
+            if not page_count:
+                self.log.warning("No pages received from the PDF extractor")
+                return False
+
+            self.log.info("Collected data from %d pages", page_count)
+            self._process_collected_data(combined)
+            return True
+
+        except Exception as e:
+            self.log.error("Error processing pages: %s", e)
+            return False
+
+    def _process_collected_data(self, combined=False):
+        """Summarize the collected invoice data and write one CSV per invoice, or one combined CSV."""
+        # Validate collected data
+        self.log.info("=== DATA COLLECTION SUMMARY ===")
+        total_collected_rows = 0
+        for invoice_no, data in self.invoice_data.items():
+            invoice_rows = data.row_count()
+            total_collected_rows += invoice_rows
+            self.log.info("Invoice %s: %d pages, %d rows", invoice_no, len(data.pages), invoice_rows)
+        self.log.info("TOTAL COLLECTED ROWS: %d", total_collected_rows)
+        
+        # Process all collected data
+        self.log.info("=== PHASE 2: PROCESSING COLLECTED DATA ===")
+        if combined:
+            total_processed_rows = self._write_combined_csv()
+        else:
+            total_processed_rows = 0
+            for invoice_no, pages_data in self.invoice_data.items():
+                rows_processed = self._process_invoice_data(invoice_no, pages_data)
+                total_processed_rows += rows_processed
+        
+        self.log.info("=== PROCESSING SUMMARY ===")
+        self.log.info("Total rows collected: %d", total_collected_rows)
+        self.log.info("Total rows processed: %d", total_processed_rows)
+        
+        if total_collected_rows != total_processed_rows:
+            self.log.warning("⚠️  WARNING: Row count mismatch! %d rows may have been lost!", total_collected_rows - total_processed_rows)
+        else:
+            self.log.info("✅ SUCCESS: All collected rows were processed successfully!")
+
     def _cleanup_txt_files(self):
         """Clean up TXT files after successful processing."""
         txt_files = [f for f in FileUtils.get_txt_files(self.session_dir) if f != 'requirements.txt']
@@ -98,246 +164,144 @@ class DataProcessor:
             file_path = os.path.join(self.session_dir, txt_file)
             try:
                 os.remove(file_path)
-                print(f"Cleaned up {txt_file}")
+                self.log.debug("Cleaned up %s", txt_file)
             except Exception as e:
-                print(f"Warning: Could not remove {txt_file}: {str(e)}")
+                self.log.warning("Could not remove %s: %s", txt_file, e)
 
     def _collect_invoice_data(self, txt_file):
         """Collect data from a single TXT file and group by invoice number."""
         file_path = os.path.join(self.session_dir, txt_file)
-        print(f"Collecting data from {txt_file}...")
         
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
                 content = file.read()
 
-            invoice_no = self._get_invoice_no(content)
-            if not invoice_no:
-                print(f"Invoice number not found in {txt_file}")
-                return
-
-            # Initialize invoice data if not exists
-            if invoice_no not in self.invoice_data:
-                self.invoice_data[invoice_no] = {
-                    'pages': [],
-                    'has_totals': False
-                }
-
-            # Extract table rows and check for totals
-            table_data = self._extract_table_data(content)
-            if table_data:
-                rows, has_totals, totals = table_data
-                page_data = {
-                    'rows': rows,  # Don't store full content, just extracted data
-                    'has_totals': has_totals,
-                    'totals': totals,
-                    'bol_cube': self._extract_bol_cube(content)
-                }
-                self.invoice_data[invoice_no]['pages'].append(page_data)
-                if has_totals:
-                    self.invoice_data[invoice_no]['has_totals'] = True
-                
-                print(f"  Found {len(rows)} rows in {txt_file}, totals: {has_totals}")
+            self._collect_page_data(txt_file, content)
             
             # DON'T DELETE THE TXT FILE HERE - wait until all processing is complete
             
         except Exception as e:
-            print(f"Error collecting data from {txt_file}: {str(e)}")
+            self.log.error("Error collecting data from %s: %s", txt_file, e)
         
         # Force garbage collection
         gc.collect()
 
-    def _extract_table_data(self, content):
-        """Extract table rows and totals from content."""
-        lines = content.splitlines()
-        table_start = None
-        rows = []
-        has_totals = False
-        totals = {'pieces': '', 'weight': ''}
-
-        # Find table start
-        for i, line in enumerate(lines):
-            if "CARTONS" in line.upper() and "STYLE" in line.upper() and "PIECES" in line.upper():
-                table_start = i
-                print(f"  Found table header at line {i}: {line.strip()}")
-                break
-
-        if table_start is None:
-            print("  WARNING: Table header not found")
-            return None
-
-        # Process rows and look for totals
-        print(f"  Processing table data from line {table_start + 1}...")
-        for line_num, line in enumerate(lines[table_start+1:], table_start + 2):
-            line_stripped = line.strip()
-            
-            # Check for totals first
-            if "TOTAL CARTONS" in line.upper():
-                has_totals = True
-                tokens = line.split()
-                if len(tokens) >= 11:
-                    totals['pieces'] = tokens[3].replace(',', '')
-                    totals['weight'] = tokens[-1].replace(',', '')
-                print(f"  Found totals at line {line_num}: pieces={totals['pieces']}, weight={totals['weight']}")
-                break
-            
-            # Stop at shipping instructions
-            if "SHIPPING INSTRUCTIONS:" in line.upper():
-                print(f"  Reached shipping instructions at line {line_num}")
-                break
-            
-            # Skip empty lines
-            if not line_stripped:
-                continue
-            
-            # Improved row detection - more flexible patterns
-            # Look for lines that contain numeric data that could be table rows
-            if self._is_valid_table_row(line_stripped):
-                tokens = line_stripped.split()
-                if len(tokens) >= 3:
-                    try:
-                        # Try to extract the data - be more flexible with parsing
-                        cartons = tokens[0].replace(',', '')
-                        style = tokens[1]
-                        individual_pieces = tokens[2].replace(',', '')
-                        
-                        # The weight should be the last numeric token
-                        individual_weight = ""
-                        for token in reversed(tokens):
-                            if re.match(r'^\d+\.?\d*$', token.replace(',', '')):
-                                individual_weight = token.replace(',', '')
-                                break
-                        
-                        if individual_weight:  # Only add if we found a weight
-                            rows.append([cartons, individual_pieces, individual_weight, style])
-                            print(f"  Line {line_num}: Added row - cartons={cartons}, style={style}, pieces={individual_pieces}, weight={individual_weight}")
-                        else:
-                            print(f"  Line {line_num}: Skipped (no weight found) - {line_stripped}")
-                    except (IndexError, ValueError) as e:
-                        print(f"  Line {line_num}: Skipped (parsing error) - {line_stripped} - {str(e)}")
-                else:
-                    print(f"  Line {line_num}: Skipped (insufficient tokens) - {line_stripped}")
-            else:
-                print(f"  Line {line_num}: Skipped (not a table row) - {line_stripped}")
-
-        print(f"  Extracted {len(rows)} rows total")
-        return rows, has_totals, totals
-
-    def _is_valid_table_row(self, line):
-        """Check if a line is a valid table row using more flexible criteria."""
-        # Remove extra spaces
-        line = ' '.join(line.split())
-        
-        # Skip obviously non-data lines
-        if not line:
-            return False
-        
-        # Skip lines that are clearly headers or instructions
-        skip_patterns = [
-            r'^CARTONS.*STYLE.*PIECES',
-            r'^SHIPPING INSTRUCTIONS',
-            r'^TOTAL CARTONS',
-            r'^Page \d+',
-            r'^BILL OF LADING',
-            r'^[A-Z\s]+:',  # Lines ending with colon (like labels)
-        ]
+    def _collect_page_data(self, source, content):
+        """Collect data from the text of a single page and group by invoice number."""
+        self.log.debug("Collecting data from %s...", source)
+
+        # One pass over the page finds the invoice number, table rows, totals and BOL cube
+        page = parse_page(content, log=self.log)
+        invoice_no = page.invoice_no
+        if not invoice_no:
+            self.log.warning("Invoice number not found in %s", source)
+            return
+
+        # Initialize invoice data if not exists
+        invoice = self.invoice_data.get(invoice_no)
+        if invoice is None:
+            invoice = self.invoice_data[invoice_no] = InvoiceData()
+
+        if not page.table_found:
+            self.log.warning("Table header not found in %s", source)
+            return
+
+        # The parsed page is the page record: no full content, just extracted data
+        invoice.pages.append(page)
+        if page.has_totals:
+            invoice.has_totals = True
         
-        for pattern in skip_patterns:
-            if re.match(pattern, line, re.IGNORECASE):
-                return False
-        
-        # Look for patterns that indicate this is a data row
-        # 1. Starts with a number (original logic)
-        if re.match(r'^\d+', line):
-            return True
-        
-        # 2. Contains multiple numeric values (could be a table row with formatting issues)
-        numbers = re.findall(r'\d+', line)
-        if len(numbers) >= 3:  # At least 3 numbers suggests a data row
-            return True
-        
-        # 3. Contains typical style patterns (letters/numbers combination)
-        if re.search(r'\b[A-Z]+\d+\b', line) or re.search(r'\b\d+[A-Z]+\b', line):
-            tokens = line.split()
-            # Check if we have enough tokens and at least one looks like a number
-            if len(tokens) >= 3 and any(re.match(r'^\d+', token) for token in tokens):
-                return True
-        
-        return False
-
-    def _extract_bol_cube(self, content):
-        """Extract BOL Cube from content."""
-        lines = content.splitlines()
-        for i, line in enumerate(lines):
-            if "SHIPPING INSTRUCTIONS:" in line.upper():
-                j = i - 1
-                while j >= 0:
-                    candidate = lines[j].strip()
-                    match = re.search(r'\b\d{1,3}\.\d{2}\b', candidate)
-                    if match:
-                        return match.group(0)
-                    j -= 1
-                break
-        return ""
+        self.log.debug("  Found %d rows in %s, totals: %s", len(page.rows), source, page.has_totals)
 
     def _process_invoice_data(self, invoice_no, data):
         """Process collected data for an invoice and create CSV."""
-        print(f"\n=== Processing Invoice {invoice_no} ===")
+        totals, bol_cube = self._invoice_totals(invoice_no, data)
+        row_count = data.row_count()
+
+        # Generate CSV straight into the invoice's file
+        new_filename = f"{invoice_no}.csv"
+        new_file_path = os.path.join(self.session_dir, new_filename)
+        with open(new_file_path, 'w', encoding='utf-8', newline='') as file:
+            self._format_csv(file, invoice_no, bol_cube, data.rows(), totals['pieces'], totals['weight'])
+
+        self.log.info("Successfully processed invoice %s with %d rows", invoice_no, row_count)
+        return row_count  # Return the number of rows processed for the summary
+
+    def _write_combined_csv(self):
+        """Write every collected invoice into the session's OUTPUT_CSV_NAME through one csv.writer.
+
+        Rows go to a hidden temp file that replaces the combined CSV once complete, so
+        a reader never sees a partial file. When no invoice was found nothing is written
+        and an earlier combined CSV is removed, so it never passes for this run's output.
+        Returns the number of rows written.
+        """
+        output_path = os.path.join(self.session_dir, OUTPUT_CSV_NAME)
+        if not self.invoice_data:
+            self.log.warning("No invoices found, %s not written", OUTPUT_CSV_NAME)
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            return 0
+
+        temp_path = os.path.join(self.session_dir, f".{OUTPUT_CSV_NAME}.tmp")
+        total_rows = 0
+        try:
+            with open(temp_path, 'w', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(self.schema.header)
+                for invoice_no, data in self.invoice_data.items():
+                    totals, bol_cube = self._invoice_totals(invoice_no, data)
+                    writer.writerows(self.schema.emitter.rows(
+                        self._invoice_fields(invoice_no, bol_cube, totals['pieces'], totals['weight']), data.rows()))
+                    row_count = data.row_count()
+                    total_rows += row_count
+                    self.log.info("Successfully processed invoice %s with %d rows", invoice_no, row_count)
+            os.replace(temp_path, output_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self.log.info("Wrote %d invoices (%d rows) to %s", len(self.invoice_data), total_rows, OUTPUT_CSV_NAME)
+        return total_rows
+
+    def _invoice_totals(self, invoice_no, data):
+        """Resolve an invoice's totals and BOL cube from its InvoiceData.
+
+        Returns (totals, bol_cube) where totals is {'pieces': ..., 'weight': ...}.
+        """
+        self.log.info("=== Processing Invoice %s ===", invoice_no)
         
         # Count total rows across all pages
-        total_rows = sum(len(page['rows']) for page in data['pages'])
-        print(f"Total rows found across all pages: {total_rows}")
+        total_rows = data.row_count()
+        self.log.debug("Total rows found across all pages: %d", total_rows)
         
         # Get totals from the last page that has non-empty totals
         totals = None
         bol_cube = ""
-        print("Looking for totals in pages (reverse order):")
-        for i, page in enumerate(reversed(data['pages'])):
-            print(f"  Checking page {len(data['pages'])-i}")
-            print(f"    Has totals: {page['has_totals']}")
-            if page['has_totals'] and page['totals']['pieces'] and page['totals']['weight']:
-                totals = page['totals']
-                bol_cube = page['bol_cube']
-                print(f"    Found valid totals: {totals}")
-                print(f"    BOL Cube: {bol_cube}")
+        self.log.debug("Looking for totals in pages (reverse order):")
+        for i, page in enumerate(reversed(data.pages)):
+            self.log.debug("  Checking page %d", len(data.pages) - i)
+            self.log.debug("    Has totals: %s", page.has_totals)
+            if page.has_totals and page.totals['pieces'] and page.totals['weight']:
+                totals = page.totals
+                bol_cube = page.bol_cube
+                self.log.debug("    Found valid totals: %s", totals)
+                self.log.debug("    BOL Cube: %s", bol_cube)
                 break
 
         # If no totals found, calculate from individual rows
         if not totals:
-            print("No pre-calculated totals found. Calculating from individual rows...")
-            totals = self._calculate_totals_from_rows(data['pages'])
+            self.log.info("No pre-calculated totals found for %s. Calculating from individual rows...", invoice_no)
+            totals = self._calculate_totals_from_rows(data.pages)
             # Use BOL cube from first page that has one
-            for page in data['pages']:
-                if page['bol_cube']:
-                    bol_cube = page['bol_cube']
+            for page in data.pages:
+                if page.bol_cube:
+                    bol_cube = page.bol_cube
                     break
-            print(f"Calculated totals: {totals}")
-            print(f"Using BOL Cube: {bol_cube}")
-
-        # Collect all rows from all pages
-        all_rows = []
-        for page_num, page in enumerate(data['pages'], 1):
-            print(f"Processing page {page_num}: {len(page['rows'])} rows")
-            for row in page['rows']:
-                # row is [cartons, individual_pieces, individual_weight, style]
-                all_rows.append([row[0], bol_cube, row[1], row[2], invoice_no, row[3]])
-
-        print(f"Total rows to process: {len(all_rows)}")
-
-        # Generate CSV
-        formatted_data = self._format_csv(all_rows, totals['pieces'], totals['weight'])
-        if formatted_data:
-            new_filename = f"{invoice_no}.csv"
-            new_file_path = os.path.join(self.session_dir, new_filename)
-            
-            with open(new_file_path, 'w', encoding='utf-8', newline='') as file:
-                file.write(formatted_data)
-            
-            print(f"Successfully processed invoice {invoice_no} with {len(all_rows)} rows")
-            return len(all_rows)  # Return the number of rows processed for the summary
-        else:
-            print(f"ERROR: Failed to generate CSV for invoice {invoice_no}")
-            return 0  # Return 0 for failed processing
+            self.log.info("Calculated totals: %s", totals)
+            self.log.info("Using BOL Cube: %s", bol_cube)
+
+        return totals, bol_cube
 
     def _calculate_totals_from_rows(self, pages):
         """Calculate totals from individual rows when no totals are found."""
@@ -345,15 +309,14 @@ class DataProcessor:
         total_weight = 0.0
         
         for page in pages:
-            for row in page['rows']:
+            for row in page.rows:
                 try:
-                    # row is [cartons, individual_pieces, individual_weight, style]
-                    pieces = int(row[1].replace(',', '')) if row[1] else 0
-                    weight = float(row[2].replace(',', '')) if row[2] else 0.0
+                    pieces = int(row.pieces.replace(',', '')) if row.pieces else 0
+                    weight = float(row.weight.replace(',', '')) if row.weight else 0.0
                     total_pieces += pieces
                     total_weight += weight
                 except (ValueError, IndexError) as e:
-                    print(f"    Warning: Could not parse row {row}: {str(e)}")
+                    self.log.warning("    Could not parse row %s: %s", row, e)
                     continue
         
         return {
@@ -361,89 +324,18 @@ class DataProcessor:
             'weight': str(int(total_weight))  # Convert to int for consistency
         }
 
-    def _format_csv(self, rows, total_pieces, total_weight):
-        """Format rows into CSV with proper column mapping."""
-        output = io.StringIO()
+    def _format_csv(self, output, invoice_no, bol_cube, rows, total_pieces, total_weight):
+        """Write an invoice's CSV (header and TableRows, in self.schema's layout) to the file handle output."""
         writer = csv.writer(output)
+        writer.writerow(self.schema.header)
+        writer.writerows(self.schema.emitter.rows(
+            self._invoice_fields(invoice_no, bol_cube, total_pieces, total_weight), rows))
 
-        # Write header
-        header = [""] * 28
-        header[0] = "RTS ID"
-        header[1] = "RTS Status"
-        header[2] = "Load #"
-        header[3] = "Wave #"
-        header[4] = "Routed Date"
-        header[5] = "Ready Date"
-        header[6] = "Date of Pickup"
-        header[7] = "Time of Pickup"
-        header[8] = "Outbound BOL"
-        header[9] = "Order Date"              # Column J
-        header[10] = "Customer"
-        header[11] = "Ship To Name"           # Column L
-        header[12] = "Purchase Order No."    # Column M
-        header[13] = "Cartons"                # Column N
-        header[14] = "Start Date"             # Column O
-        header[15] = "Cancel Date"            # Column P
-        header[16] = "BOL Cube"               # Column Q
-        header[17] = "Final Cube"
-        header[18] = "Burlington Cube"
-        header[19] = "Pallet"
-        header[20] = "Individual Pieces"      # Column U
-        header[21] = "Total Pieces"
-        header[22] = "Individual Weight"      # Column W
-        header[23] = "Total Weight"
-        header[24] = "Invoice No."            # Column Y
-        header[25] = "Style"                  # Column Z
-        header[26] = "Release"                  # Column AA
-        header[27] = "Assigned Trucking Co."                  # Column AB
-        writer.writerow(header)
-
-        # Sort rows by Invoice No. to ensure consistent grouping
-        sorted_rows = sorted(rows, key=lambda x: x[4])  # Sort by Invoice No. (index 4)
-        
-        # Group rows by invoice number
-        current_invoice = None
-        is_first_row = True
-
-        # Write data rows
-        for row_data in sorted_rows:
-            data_row = [""] * 28
-            invoice_no = row_data[4]  # Get current row's invoice number
-            
-            # Check if this is the first row of a new invoice group
-            if invoice_no != current_invoice:
-                current_invoice = invoice_no
-                is_first_row = True
-            
-            # Fill in the standard fields
-            data_row[13] = row_data[0]  # Cartons
-            data_row[16] = row_data[1]  # BOL Cube
-            data_row[20] = row_data[2]  # Individual Pieces
-            data_row[22] = row_data[3]  # Individual Weight
-            data_row[24] = row_data[4]  # Invoice No.
-            data_row[25] = row_data[5]  # Style
-            
-            # Only include totals in the first row of each invoice group
-            if is_first_row:
-                data_row[21] = total_pieces  # Total Pieces
-                data_row[23] = total_weight  # Total Weight
-                is_first_row = False
-            
-            writer.writerow(data_row)
-
-        return output.getvalue()
-
-    def _get_invoice_no(self, content):
-        """Extract invoice number from content using regex."""
-        lines = content.splitlines()
-        invoice_no = ""
-        for line in lines[:10]:
-            if "BILL OF LADING" in line.upper():
-                match = re.search(r'BILL OF LADING\s+([A-Z]\d+)', line, re.IGNORECASE)
-                if match:
-                    invoice_no = match.group(1)
-                    break
-        return invoice_no
+    @staticmethod
+    def _invoice_fields(invoice_no, bol_cube, total_pieces, total_weight):
+        """The invoice-wide values output columns can take (output_schema.INVOICE_FIELDS)."""
+        return {'invoice_no': invoice_no, 'bol_cube': bol_cube,
+                'total_pieces': total_pieces, 'total_weight': total_weight}
 
     def _format_data(self, content):
         """Extract and structure shipping information into CSV format with specific column assignments."""
@@ -480,7 +372,7 @@ class DataProcessor:
                 break
         
         if table_start is None:
-            print("Table header not found in the document.")
+            self.log.warning("Table header not found in the document.")
             return None
 
         # --- Process Table Rows and Extract Summary Totals ---
@@ -507,65 +399,23 @@ class DataProcessor:
                 style = tokens[1]
                 individual_pieces = tokens[2].replace(',', '')  # Remove commas
                 individual_weight = tokens[-1].replace(',', '')  # Remove commas
-                rows.append([cartons, bol_cube, individual_pieces, individual_weight, invoice_no, style])
+                rows.append(TableRow(cartons, individual_pieces, individual_weight, style))
             else:
                 continue
 
-        # --- Generate CSV with Specific Column Mapping ---
-        # Create a CSV with 28 columns (A-AB)
+        # --- Generate CSV in the schema's layout ---
         output = io.StringIO()
         writer = csv.writer(output)
-
-        header = [""] * 28
-        header[0] = "RTS ID"
-        header[1] = "RTS Status"
-        header[2] = "Load #"
-        header[3] = "Wave #"
-        header[4] = "Routed Date"
-        header[5] = "Ready Date"
-        header[6] = "Date of Pickup"
-        header[7] = "Time of Pickup"
-        header[8] = "Outbound BOL"
-        header[9] = "Order Date"              # Column J
-        header[10] = "Customer"
-        header[11] = "Ship To Name"           # Column L
-        header[12] = "Purchase Order No."    # Column M
-        header[13] = "Cartons"                # Column N
-        header[14] = "Start Date"             # Column O
-        header[15] = "Cancel Date"            # Column P
-        header[16] = "BOL Cube"               # Column Q
-        header[17] = "Final Cube"
-        header[18] = "Burlington Cube"
-        header[19] = "Pallet"
-        header[20] = "Individual Pieces"      # Column U
-        header[21] = "Total Pieces"
-        header[22] = "Individual Weight"      # Column W
-        header[23] = "Total Weight"
-        header[24] = "Invoice No."            # Column Y
-        header[25] = "Style"                  # Column Z
-        header[26] = "Release"                  # Column AA
-        header[27] = "Assigned Trucking Co."                  # Column AB
-
-        # Ensure any header cell that is empty is explicitly an empty string.
-        header = [col if col else "" for col in header]
-        writer.writerow(header)
-
-        # Write each data row, adding the summary totals to the designated columns.
-        for row_data in rows:
-            # row_data is [cartons, bol_cube, individual_pieces, individual_weight, invoice_no, style]
-            data_row = [""] * 28
-            data_row[13] = row_data[0]  # Cartons -> Column N
-            data_row[16] = row_data[1]  # BOL Cube -> Column Q
-            data_row[20] = row_data[2]  # Individual Pieces -> Column U
-            data_row[22] = row_data[3]  # Individual Weight -> Column W
-            data_row[24] = row_data[4]  # Invoice No. -> Column Y
-            data_row[25] = row_data[5]  # Style -> Column Z
-            data_row[21] = summary_total_pieces  # Total Pieces -> Column V (index 21)
-            data_row[23] = summary_total_weight  # Total Weight -> Column X (index 23)
-            writer.writerow(data_row)
+        writer.writerow(self.schema.header)
+        # The summary totals go on every row
+        writer.writerows(self.schema.emitter.rows(
+            self._invoice_fields(invoice_no, bol_cube, summary_total_pieces, summary_total_weight),
+            rows, first_row_only=False))
         
         return output.getvalue()
 
 if __name__ == "__main__":
+    from utils import configure_logging
+    configure_logging()
     processor = DataProcessor()
     processor.process_all_files()
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+In-process background job queue for PDF uploads.
+
+Uploads hand the pipeline to a thread pool and return a job id straight away.
+Job state lives in the session directory (.job.json), so any web worker process
+can answer a status poll or a download for the session, and one session never
+sees another session's job. Reserving claims the session through a lock file
+created with O_EXCL, so web worker processes never queue two jobs for one session.
+Uploads reserve the session before they touch its files and release it when they
+end without queueing.
+"""
+
+import os
+import json
+import time
+import socket
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import JOB_WORKERS, JOB_STALE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+JOB_FILE = ".job.json"
+# Held by whichever process is checking for and recording a session's job
+CLAIM_FILE = ".job.claim"
+# A claim older than this was left by a process that died while holding it
+CLAIM_STALE_SECONDS = 30
+
+# Job statuses
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Recorded on each job so other processes can tell whether a queued job's owner is alive
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def read_job(session_dir):
+    """Return the job recorded for a session, or None."""
+    try:
+        with open(os.path.join(session_dir, JOB_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _owner_alive(owner):
+    """True when owner names a live process on this host."""
+    host, _, pid = (owner or "").rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # Alive, owned by another user
+    return True
+
+
+def is_active(job, stale_seconds=JOB_STALE_SECONDS):
+    """True while a job is queued or running and its owner is still updating it.
+
+    A queued job is not updated while it waits for a worker, so it stays active for
+    as long as the process that queued it is alive.
+    """
+    if not job or job.get('status') not in ACTIVE_STATUSES:
+        return False
+    if job['status'] == QUEUED and _owner_alive(job.get('owner')):
+        return True
+    return time.time() - job.get('updated_at', 0) < stale_seconds
+
+
+def _claim_session(session_dir):
+    """Create the session's claim file; False while another process holds it.
+
+    O_CREAT | O_EXCL makes the create atomic across processes. A stale claim is
+    removed and taken over once.
+    """
+    path = os.path.join(session_dir, CLAIM_FILE)
+    for _ in range(2):
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) < CLAIM_STALE_SECONDS:
+                    return False
+                os.remove(path)
+                logger.warning("Removed a stale job claim in %s", session_dir)
+            except OSError:
+                return False
+    return False
+
+
+def _release_session(session_dir):
+    try:
+        os.remove(os.path.join(session_dir, CLAIM_FILE))
+    except OSError:
+        pass
+
+
+class Job:
+    """Progress reporter handed to the job function.
+
+    Every update rewrites the session's job file atomically; per-page updates are
+    throttled to one write per progress_interval seconds.
+    """
+
+    def __init__(self, session_dir, session_id, filename=None, progress_interval=0.5):
+        now = time.time()
+        self.session_dir = session_dir
+        self.progress_interval = progress_interval
+        self._last_write = 0.0
+        self.submitted = False
+        self.state = {
+            'job_id': uuid.uuid4().hex,
+            'session_id': session_id,
+            'filename': filename,
+            'status': QUEUED,
+            'owner': OWNER,
+            'stage': None,
+            'pages_done': 0,
+            'page_count': 0,
+            'created_at': now,
+            'started_at': None,
+            'finished_at': None,
+            'updated_at': now,
+            'error': None,
+            'details': None,
+            'result': None,
+        }
+
+    @property
+    def job_id(self):
+        return self.state['job_id']
+
+    def stage(self, stage):
+        """Enter a pipeline stage (e.g. 'pdf', 'csv')."""
+        self._update(status=RUNNING, stage=stage)
+
+    def page(self, pages_done, page_count):
+        """Record page progress inside the current stage."""
+        self.state.update(pages_done=pages_done, page_count=page_count)
+        if time.time() - self._last_write >= self.progress_interval or pages_done == page_count:
+            self._update()
+
+    def succeed(self, result):
+        self._update(status=SUCCEEDED, result=result, finished_at=time.time())
+
+    def fail(self, error, details=None):
+        self._update(status=FAILED, error=error, details=details, finished_at=time.time())
+
+    def _update(self, **changes):
+        self.state.update(changes)
+        if self.state['status'] == RUNNING and self.state['started_at'] is None:
+            self.state['started_at'] = time.time()
+        self.state['updated_at'] = time.time()
+        self._last_write = self.state['updated_at']
+        self.save()
+
+    def save(self):
+        path = os.path.join(self.session_dir, JOB_FILE)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # The session may have been cleared while the job was running
+            logger.warning("Could not record job %s: %s", self.job_id, e)
+
+
+class JobQueue:
+    """Thread pool that runs one job at a time per session."""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = max(1, workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def reserve(self, session_dir, session_id, filename=None):
+        """Record a queued Job for a session, so no other upload can use it; returns the Job.
+
+        Returns None when the session already has an active job, or another process
+        is reserving it right now. Hand the Job to start(), or to release() when
+        there is nothing to queue.
+        """
+        if not _claim_session(session_dir):
+            return None
+        try:
+            if is_active(read_job(session_dir)):
+                return None
+            job = Job(session_dir, session_id, filename=filename)
+            job.save()
+            return job
+        finally:
+            _release_session(session_dir)
+
+    def start(self, job, fn):
+        """Queue fn(job) for a reserved Job.
+
+        fn reports progress through the Job and returns the result payload; raising
+        marks the job as failed.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bol-job')
+            job.submitted = True
+            self._executor.submit(self._run, job, fn)
+        logger.info("📥 Queued job %s for session %s", job.job_id, job.state['session_id'])
+        return job
+
+    def submit(self, session_dir, session_id, fn, filename=None):
+        """reserve() and start() in one; returns the Job, or None when the session is busy."""
+        job = self.reserve(session_dir, session_id, filename=filename)
+        return self.start(job, fn) if job is not None else None
+
+    def release(self, job):
+        """Drop a reservation that was never started; a started job is left to finish."""
+        if job.submitted:
+            return
+        recorded = read_job(job.session_dir)
+        if recorded and recorded.get('job_id') == job.job_id:
+            try:
+                os.remove(os.path.join(job.session_dir, JOB_FILE))
+            except OSError:
+                pass
+
+    def _run(self, job, fn):
+        try:
+            result = fn(job)
+            if job.state['status'] != FAILED:
+                job.succeed(result)
+                logger.info("✅ Job %s finished", job.job_id)
+        except Exception as e:
+            logger.exception("❌ Job %s failed", job.job_id)
+            job.fail('Unexpected error during PDF processing', str(e))
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,116 @@
+"""
+OCR fallback for pages without a text layer (scanned BOLs).
+
+pytesseract is an optional dependency: without it, or without the tesseract
+binary or Poppler, get_ocr_status() says why and such pages keep their
+"no text" placeholder. Pages are rendered one at a time with Poppler and
+recognised on a thread pool; every tesseract call is its own process, so the
+threads really run in parallel.
+"""
+
+import time
+import logging
+import threading
+from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+import pdf2image
+from utils import PopplerUtils
+from config import (POPPLER_PATH, OCR_ENABLED, OCR_DPI, OCR_THREADS, OCR_LANG,
+                    OCR_TESSERACT_CONFIG, OCR_PAGE_TIMEOUT)
+
+try:
+    import pytesseract
+except ImportError:  # Optional: pip install pytesseract (plus the tesseract binary)
+    pytesseract = None
+
+logger = logging.getLogger(__name__)
+
+# Process-wide result of the OCR probe (see get_ocr_status)
+_ocr_status = None
+_ocr_status_lock = threading.Lock()
+
+
+class OcrResult(NamedTuple):
+    """Text recognised on one page."""
+    page_number: int
+    text: str           # "" when nothing was recognised or OCR failed
+    seconds: float      # Render plus recognition time
+    error: str          # None on success
+
+
+def get_ocr_status(refresh=False):
+    """Return the memoised OCR probe result for this process.
+
+    OCR is available when it is enabled, pytesseract imports, the tesseract binary
+    runs and Poppler is available for rendering. Returns
+    {'available': bool, 'error': str or None, 'version': str or None, 'checked_at': float}.
+    """
+    global _ocr_status
+    with _ocr_status_lock:
+        if _ocr_status is None or refresh:
+            error = version = None
+            if not OCR_ENABLED:
+                error = "OCR is disabled (OCR_ENABLED)"
+            elif pytesseract is None:
+                error = "pytesseract is not installed"
+            else:
+                try:
+                    version = str(pytesseract.get_tesseract_version())
+                except Exception as e:
+                    error = f"Tesseract not available: {e}"
+            if error is None:
+                poppler = PopplerUtils.get_poppler_status()
+                if not poppler['available']:
+                    error = f"Poppler not available for rendering: {poppler['error']}"
+            if error and OCR_ENABLED:
+                logger.warning("⚠️ OCR fallback not available: %s", error)
+            _ocr_status = {'available': error is None, 'error': error, 'version': version,
+                           'checked_at': time.time()}
+        return dict(_ocr_status)
+
+
+class PageOCR:
+    def __init__(self, dpi=OCR_DPI, threads=OCR_THREADS, lang=OCR_LANG,
+                 tesseract_config=OCR_TESSERACT_CONFIG, timeout=OCR_PAGE_TIMEOUT):
+        """OCR engine rendering pages at dpi and recognising `threads` pages at a time."""
+        self.dpi = dpi
+        self.threads = max(1, threads)
+        self.lang = lang
+        self.tesseract_config = tesseract_config
+        self.timeout = timeout
+
+    def ocr_pages(self, pdf_path, page_numbers):
+        """Recognise the given pages of a PDF. Yields an OcrResult per page, in the given order."""
+        page_numbers = list(page_numbers)
+        if not page_numbers:
+            return
+        threads = min(self.threads, len(page_numbers))
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='bol-ocr') as executor:
+            yield from executor.map(lambda page_number: self.ocr_page(pdf_path, page_number), page_numbers)
+
+    def ocr_page(self, pdf_path, page_number):
+        """Render one page with Poppler and run Tesseract on it."""
+        started = time.perf_counter()
+        try:
+            images = pdf2image.convert_from_path(
+                pdf_path,
+                dpi=self.dpi,
+                first_page=page_number,
+                last_page=page_number,
+                grayscale=True,
+                poppler_path=POPPLER_PATH
+            )
+            try:
+                text = pytesseract.image_to_string(
+                    images[0], lang=self.lang, config=self.tesseract_config, timeout=self.timeout)
+            finally:
+                for image in images:
+                    image.close()
+        except Exception as e:
+            seconds = time.perf_counter() - started
+            logger.warning("⚠️ OCR failed for page %d: %s", page_number, e)
+            return OcrResult(page_number, "", seconds, str(e))
+
+        seconds = time.perf_counter() - started
+        logger.debug("OCR page %d: %d characters in %.2fs", page_number, len(text), seconds)
+        return OcrResult(page_number, text, seconds, None)
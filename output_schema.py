@@ -0,0 +1,201 @@
+"""
+Declarative layout of the CSV we produce.
+
+An OutputSchema lists the output columns in order. Each Column says where its
+value comes from:
+- source: a parsed TableRow field or an invoice-wide field, filled by the writer;
+- derived: a value the merge computes (pallet and cube columns);
+- incoming: the customer-export headers the merge copies into it;
+- role: what the merge otherwise looks the column up by.
+
+DataProcessor writes through the schema's RowEmitter, and process_csv_file reads
+its match, copy and cube columns from the same schema. A customer-specific layout
+is a JSON file of columns named by OUTPUT_SCHEMA_PATH.
+"""
+
+import json
+import hashlib
+import logging
+import threading
+from operator import itemgetter
+from typing import NamedTuple
+from bol_parser import TableRow
+from config import OUTPUT_SCHEMA_PATH
+
+logger = logging.getLogger(__name__)
+
+# Sources the writer fills a column from
+ROW_FIELDS = TableRow._fields                                         # Per table row
+INVOICE_FIELDS = ('invoice_no', 'bol_cube', 'total_pieces', 'total_weight')  # Per invoice
+# Values process_csv_file derives once the customer export is merged
+DERIVED_FIELDS = ('pallet', 'burlington_cube', 'final_cube')
+# Fields process_csv_file cannot merge without (each a column's source, derived field or role)
+REQUIRED_FIELDS = ('invoice_no', 'ship_to')
+
+
+class Column(NamedTuple):
+    """One output column."""
+    name: str
+    source: str = None            # ROW_FIELDS or INVOICE_FIELDS entry the writer fills it from
+    first_row_only: bool = False  # Only written on the first row of each invoice (totals)
+    default: str = ""             # Written when the column has no source
+    derived: str = None           # DERIVED_FIELDS entry the merge computes into it
+    incoming: tuple = ()          # Customer-export headers the merge copies into it (or renames, for match columns)
+    match: bool = False           # Part of the key customer rows are matched on
+    role: str = None              # Name the merge looks it up by, e.g. 'ship_to' or 'cancel_date'
+
+
+class RowEmitter:
+    """Builds output rows for one schema, compiled once.
+
+    Each output row is a single itemgetter call over (the invoice's column values
+    + the TableRow): no per-column Python work happens per row.
+    """
+
+    def __init__(self, columns):
+        self._columns = columns
+        width = len(columns)
+        positions = [width + ROW_FIELDS.index(column.source) if column.source in ROW_FIELDS else index
+                     for index, column in enumerate(columns)]
+        getter = itemgetter(*positions)
+        self._getter = getter if width > 1 else (lambda values: (getter(values),))
+
+    def _invoice_values(self, invoice, first_row):
+        return tuple(
+            invoice[column.source] if column.source in INVOICE_FIELDS and (first_row or not column.first_row_only)
+            else ("" if column.source else column.default)
+            for column in self._columns
+        )
+
+    def rows(self, invoice, table_rows, first_row_only=True):
+        """Yield the output row (a tuple) of each TableRow of one invoice.
+
+        invoice maps every INVOICE_FIELDS name to its value. first_row_only=False
+        repeats first-row-only columns (the totals) on every row.
+        """
+        getter = self._getter
+        first = self._invoice_values(invoice, True)
+        rest = self._invoice_values(invoice, False) if first_row_only else first
+        table_rows = iter(table_rows)
+        for row in table_rows:
+            yield getter(first + row)
+            break
+        yield from map(getter, map(rest.__add__, table_rows))
+
+
+class OutputSchema:
+    def __init__(self, columns):
+        """Validate the columns and compile their RowEmitter. Raises ValueError for a bad layout.
+
+        fingerprint is a short hash of the columns, for keying output produced under the schema.
+        """
+        self.columns = tuple(Column(**column) if isinstance(column, dict) else column for column in columns)
+        if not self.columns:
+            raise ValueError("An output schema needs at least one column")
+
+        seen = set()
+        for column in self.columns:
+            if column.name in seen:
+                raise ValueError(f"Duplicate output column '{column.name}'")
+            seen.add(column.name)
+            if column.source is not None and column.source not in ROW_FIELDS + INVOICE_FIELDS:
+                raise ValueError(f"Column '{column.name}': unknown source '{column.source}'")
+            if column.derived is not None and column.derived not in DERIVED_FIELDS:
+                raise ValueError(f"Column '{column.name}': unknown derived field '{column.derived}'")
+        for field in REQUIRED_FIELDS:
+            if self.name_for(field) is None:
+                raise ValueError(f"An output schema needs a column for '{field}' (as its source, derived field or role)")
+        if not self.match_columns:
+            raise ValueError("An output schema needs at least one match column")
+
+        self.header = tuple(column.name for column in self.columns)
+        self.emitter = RowEmitter(self.columns)
+        self.fingerprint = hashlib.sha256(
+            json.dumps([list(column) for column in self.columns]).encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def from_json(cls, path):
+        """Load a schema from a JSON list of column objects (the Column fields)."""
+        with open(path, encoding='utf-8') as f:
+            columns = json.load(f)
+        if not isinstance(columns, list):
+            raise ValueError(f"{path}: expected a list of columns")
+        return cls([dict(column, incoming=tuple(column.get('incoming', ()))) for column in columns])
+
+    def name_for(self, field):
+        """Header of the column whose source, derived field or role is field; None when absent."""
+        for column in self.columns:
+            if field in (column.source, column.derived, column.role):
+                return column.name
+        return None
+
+    @property
+    def match_columns(self):
+        """Columns the merge builds its composite key from, in schema order."""
+        return [column.name for column in self.columns if column.match]
+
+    @property
+    def incoming_renames(self):
+        """{customer header: column} for the match columns' alternative headers."""
+        return {name: column.name for column in self.columns if column.match for name in column.incoming}
+
+    @property
+    def incoming_mapping(self):
+        """{customer header: column} of the values the merge copies onto matched rows."""
+        return {name: column.name for column in self.columns if not column.match for name in column.incoming}
+
+
+# The BOL layout, columns A-AB
+BOL_SCHEMA = OutputSchema([
+    Column("RTS ID"),
+    Column("RTS Status"),
+    Column("Load #"),
+    Column("Wave #"),
+    Column("Routed Date"),
+    Column("Ready Date"),
+    Column("Date of Pickup"),
+    Column("Time of Pickup"),
+    Column("Outbound BOL"),
+    Column("Order Date", incoming=("Invoice Date",)),                       # Column J
+    Column("Customer"),
+    Column("Ship To Name", incoming=("Ship-to Name",), role='ship_to'),     # Column L
+    Column("Purchase Order No.", incoming=("Order No.",)),                  # Column M
+    Column("Cartons", source='cartons', incoming=("Cartons*",), match=True),  # Column N
+    Column("Start Date", incoming=("Delivery Date",)),                      # Column O
+    Column("Cancel Date", incoming=("Cancel Date",), role='cancel_date'),   # Column P
+    Column("BOL Cube", source='bol_cube'),                                  # Column Q
+    Column("Final Cube", derived='final_cube'),
+    Column("Burlington Cube", derived='burlington_cube'),
+    Column("Pallet", derived='pallet'),
+    Column("Individual Pieces", source='pieces', incoming=("Pieces*",), match=True),  # Column U
+    Column("Total Pieces", source='total_pieces', first_row_only=True),
+    Column("Individual Weight", source='weight'),                           # Column W
+    Column("Total Weight", source='total_weight', first_row_only=True),
+    Column("Invoice No.", source='invoice_no', match=True),                 # Column Y
+    Column("Style", source='style', match=True),                            # Column Z
+    Column("Release"),                                                      # Column AA
+    Column("Assigned Trucking Co."),                                        # Column AB
+])
+
+# Process-wide schema (see get_output_schema)
+_output_schema = None
+_output_schema_lock = threading.Lock()
+
+
+def get_output_schema(refresh=False):
+    """The schema named by OUTPUT_SCHEMA_PATH, or BOL_SCHEMA; loaded and compiled once per process.
+
+    A schema file that cannot be loaded is logged and BOL_SCHEMA is used instead.
+    """
+    global _output_schema
+    with _output_schema_lock:
+        if _output_schema is None or refresh:
+            schema = BOL_SCHEMA
+            if OUTPUT_SCHEMA_PATH:
+                try:
+                    schema = OutputSchema.from_json(OUTPUT_SCHEMA_PATH)
+                    logger.info("📋 Output schema loaded from %s (%d columns)", OUTPUT_SCHEMA_PATH, len(schema.columns))
+                except (OSError, ValueError, TypeError) as e:
+                    logger.error("❌ Could not load output schema %s, using the BOL layout: %s", OUTPUT_SCHEMA_PATH, e)
+            _output_schema = schema
+        return _output_schema
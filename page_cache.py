@@ -0,0 +1,160 @@
+"""
+Persistent cache of extracted page text, keyed by a fingerprint of the page.
+
+Re-issued BOL PDFs repeat most of their pages byte for byte. The fingerprint
+hashes what pdfminer lays text out from - the decoded content streams, the page
+resources (fonts, form XObjects) and the page geometry - so an unchanged page is
+recognised in any document and page.extract_text() only runs for new pages.
+The cache is a SQLite file shared by every web and extraction worker process.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import pdfplumber
+from pdfminer.pdftypes import PDFObjRef, PDFStream
+from config import PAGE_TEXT_CACHE_PATH, PAGE_TEXT_CACHE_MAX_PAGES
+
+logger = logging.getLogger(__name__)
+
+# Bump when the extraction call or its parameters change
+PAGE_CACHE_VERSION = "1"
+
+# Resource dictionaries nest (fonts -> descriptors -> font files); deeper than this is noise
+MAX_FINGERPRINT_DEPTH = 8
+
+# Prune once every this many inserts
+PRUNE_INTERVAL = 500
+
+
+def _feed(digest, obj, depth, seen):
+    """Hash a pdfminer object tree deterministically, resolving indirect references."""
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in seen or depth > MAX_FINGERPRINT_DEPTH:
+            digest.update(b"R%d;" % obj.objid)
+            return
+        seen.add(obj.objid)
+        obj = obj.resolve()
+
+    if isinstance(obj, PDFStream):
+        digest.update(b"S")
+        _feed(digest, obj.attrs, depth + 1, seen)
+        digest.update(obj.get_data())
+    elif isinstance(obj, dict):
+        digest.update(b"{")
+        for key in sorted(obj, key=str):
+            digest.update(str(key).encode('utf-8', 'surrogatepass') + b"=")
+            _feed(digest, obj[key], depth + 1, seen)
+        digest.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"[")
+        for item in obj:
+            _feed(digest, item, depth + 1, seen)
+        digest.update(b"]")
+    else:
+        digest.update(repr(obj).encode('utf-8', 'surrogatepass') + b";")
+
+
+def page_fingerprint(page):
+    """SHA-256 of everything text extraction depends on for a pdfplumber page.
+
+    Returns None when the page objects cannot be read; such pages are not cached.
+    """
+    page_obj = page.page_obj
+    digest = hashlib.sha256(f"page-text:{PAGE_CACHE_VERSION}:{pdfplumber.__version__}\n".encode('utf-8'))
+    try:
+        _feed(digest, [page_obj.mediabox, getattr(page_obj, 'cropbox', None), page.rotation], 0, set())
+        _feed(digest, page_obj.contents, 0, set())
+        _feed(digest, page_obj.resources, 0, set())
+    except Exception as e:
+        logger.debug("Could not fingerprint page %s: %s", page.page_number, e)
+        return None
+    return digest.hexdigest()
+
+
+class PageTextCache:
+    def __init__(self, path=PAGE_TEXT_CACHE_PATH, max_pages=PAGE_TEXT_CACHE_MAX_PAGES):
+        """Page text cache in the SQLite file at path, holding at most max_pages pages."""
+        self.path = path
+        self.max_pages = max_pages
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._local = threading.local()
+
+    def get(self, key):
+        """Cached text for a page fingerprint, or None."""
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT text FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute("UPDATE pages SET used_at = ? WHERE key = ?", (time.time(), key))
+            connection.commit()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Page text cache unavailable: %s", e)
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key, text):
+        try:
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO pages (key, text, used_at) VALUES (?, ?, ?)", (key, text, time.time()))
+            connection.commit()
+            self._inserts += 1
+            if self._inserts % PRUNE_INTERVAL == 0:
+                self.prune()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Could not cache page text: %s", e)
+
+    def prune(self):
+        """Drop the least recently used pages beyond max_pages."""
+        connection = self._connection()
+        connection.execute(
+            "DELETE FROM pages WHERE key IN (SELECT key FROM pages ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_pages,))
+        connection.commit()
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def _connection(self):
+        # One connection per thread; WAL lets extraction workers read while another writes
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, text TEXT NOT NULL, used_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS pages_used_at ON pages (used_at)")
+            connection.commit()
+            self._local.connection = connection
+        return connection
+
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_page_text_cache(path=PAGE_TEXT_CACHE_PATH, max_pages=PAGE_TEXT_CACHE_MAX_PAGES):
+    """The process-wide cache for path, or None when page text caching is disabled."""
+    if not path or max_pages <= 0:
+        return None
+    with _shared_caches_lock:
+        cache = _shared_caches.get(path)
+        if cache is None:
+            cache = _shared_caches[path] = PageTextCache(path, max_pages)
+        return cache
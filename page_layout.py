@@ -0,0 +1,313 @@
+"""
+Layout-aware text extraction for BOL pages.
+
+The parser only needs the "BILL OF LADING <invoice>" line and the region from the
+CARTONS/STYLE/PIECES header down to "SHIPPING INSTRUCTIONS:" (table rows, totals
+and the cube value). extract_table_region_text() finds those rows from the
+character positions and lays out text for them alone, through pdfplumber's
+within_bbox(). extract_word_table_text() reads the page as words instead and
+splits table rows into cells by the x positions of the header's columns.
+
+Turning every character of a page into pdfplumber's char dict is most of the
+per-page cost. On the pdfplumber releases listed in FAST_PATH_PDFPLUMBER the
+characters are read from pdfminer's layout objects instead, and only those inside
+the regions are converted for pdfplumber's text layout. That reads pdfminer
+internals, so any other release takes the public page.chars/within_bbox() path.
+"""
+
+import bisect
+import logging
+import threading
+from operator import itemgetter
+from typing import NamedTuple
+import pdfplumber
+from pdfminer.layout import LTChar, LTContainer
+from bol_parser import CUBE_PATTERN, INVOICE_SEARCH_LINES
+
+logger = logging.getLogger(__name__)
+
+# Same vertical tolerance pdfplumber uses to put characters on one line
+LINE_TOLERANCE = 3
+
+HEADER_WORDS = ("CARTONS", "STYLE", "PIECES")
+INVOICE_PHRASE = "BILLOFLADING"
+INSTRUCTIONS_PHRASE = "SHIPPINGINSTRUCTIONS:"
+INSTRUCTIONS_LINE = "SHIPPING INSTRUCTIONS:"
+TOTALS_LINE = "TOTAL CARTONS"
+
+# Separates the cells of a table row in word-mode text (see bol_parser.TableRowClassifier)
+CELL_SEPARATOR = "\t"
+
+# pdfplumber releases (major, minor) the fast path was checked against
+FAST_PATH_PDFPLUMBER = ((0, 10), (0, 11))
+
+# Column layouts by header row, shared by every page with the same header (see column_layout)
+MAX_COLUMN_LAYOUTS = 64
+_column_layouts = {}
+_column_layouts_lock = threading.Lock()
+
+
+def _version(version):
+    parts = version.split('.')[:2]
+    return tuple(int(part) for part in parts) if all(part.isdigit() for part in parts) else None
+
+
+# Whether the pdfminer layout objects can be read directly (see fast_path)
+FAST_PATH = _version(pdfplumber.__version__) in FAST_PATH_PDFPLUMBER
+
+
+def fast_path(page):
+    """True when the page's characters are read from pdfminer's layout objects."""
+    return FAST_PATH and page.pdf.unicode_norm is None
+
+
+def _iter_lt_chars(objs):
+    for obj in objs:
+        if isinstance(obj, LTContainer):
+            yield from _iter_lt_chars(obj._objs)
+        elif isinstance(obj, LTChar):
+            yield obj
+
+
+def layout_chars(page):
+    """The text, top and bottom of every character of a page (plus its LTChar), in drawing order.
+
+    The fast path's stand-in for page.chars: enough for find_table_regions, and
+    converted to pdfplumber char dicts (char_dicts) only for the characters laid out.
+    """
+    height, mb_top = page.height, page.mediabox[1]
+    chars = []
+    for char in _iter_lt_chars(page.layout._objs):
+        top = height - char.y1 + mb_top
+        chars.append({'text': char.get_text(), 'top': top, 'bottom': top + (char.y1 - char.y0), 'lt': char})
+    return chars
+
+
+def _char_dict(char, mb_x0, doctop):
+    lt = char['lt']
+    return {
+        'text': char['text'],
+        'x0': lt.x0 + mb_x0,
+        'x1': lt.x1 + mb_x0,
+        'top': char['top'],
+        'bottom': char['bottom'],
+        'doctop': doctop + char['top'],
+        'upright': lt.upright,
+        'matrix': lt.matrix,
+        'size': lt.size,
+        'fontname': lt.fontname,
+        'width': lt.width,
+        'height': lt.height,
+    }
+
+
+def char_dicts(page, chars):
+    """pdfplumber char dicts for layout_chars() entries: the attributes its text layout reads."""
+    mb_x0, doctop = page.mediabox[0], page.initial_doctop
+    return [_char_dict(char, mb_x0, doctop) for char in chars]
+
+
+def _phrase_rows(chars):
+    """Map each searched phrase to the tops of the rows it starts on, top to bottom.
+
+    Characters are searched in drawing order with whitespace removed, so a phrase
+    is found whether or not the PDF draws its spaces.
+    """
+    compact, tops = [], []
+    for char in chars:
+        text = char['text']
+        if not text.isspace():
+            compact.append(text.upper())
+            tops.append(char['top'])
+    compact = "".join(compact)
+    if len(compact) != len(tops):
+        return None  # Multi-character glyphs (ligatures); positions would not line up
+
+    rows = {}
+    for phrase in HEADER_WORDS + (INVOICE_PHRASE, INSTRUCTIONS_PHRASE):
+        found = []
+        start = compact.find(phrase)
+        while start >= 0:
+            found.append(tops[start])
+            start = compact.find(phrase, start + 1)
+        rows[phrase] = sorted(found)
+    return rows
+
+
+def _same_row(tops, top):
+    return any(abs(other - top) <= LINE_TOLERANCE for other in tops)
+
+
+def _row_bottom(chars, top):
+    """Lowest bottom of the characters on the row starting at top."""
+    return max(char['bottom'] for char in chars if abs(char['top'] - top) <= LINE_TOLERANCE)
+
+
+def _count_lines_above(chars, top):
+    """Number of text lines (pdfplumber clustering) that start above top."""
+    lines = 0
+    last = None
+    for char_top in sorted(char['top'] for char in chars
+                           if char['top'] < top - LINE_TOLERANCE and not char['text'].isspace()):
+        if last is None or char_top - last > LINE_TOLERANCE:
+            lines += 1
+        last = char_top
+    return lines
+
+
+def find_table_regions(chars):
+    """Locate the invoice row and the table region of a BOL page from its char dicts.
+
+    Returns ((invoice_top, invoice_bottom), (table_top, table_bottom)) in pdfplumber
+    top coordinates, or None when the page does not have the expected layout: no
+    header row, no "SHIPPING INSTRUCTIONS:" below it, or no invoice line within the
+    lines the parser searches.
+    """
+    rows = _phrase_rows(chars)
+    if rows is None:
+        return None
+
+    header_tops = [top for top in rows["CARTONS"]
+                   if _same_row(rows["STYLE"], top) and _same_row(rows["PIECES"], top)]
+    if not header_tops or not rows[INSTRUCTIONS_PHRASE] or not rows[INVOICE_PHRASE]:
+        return None
+    header_top = header_tops[0]
+    instructions_top = rows[INSTRUCTIONS_PHRASE][0]
+    invoice_top = rows[INVOICE_PHRASE][0]
+
+    # The parser takes the cube from above the first instructions line, and the
+    # invoice from the first few lines of the page
+    if not invoice_top < header_top < instructions_top:
+        return None
+    if _count_lines_above(chars, invoice_top) >= INVOICE_SEARCH_LINES:
+        return None
+
+    invoice_region = (invoice_top - LINE_TOLERANCE, _row_bottom(chars, invoice_top) + LINE_TOLERANCE)
+    table_region = (header_top - LINE_TOLERANCE, _row_bottom(chars, instructions_top) + LINE_TOLERANCE)
+    return invoice_region, table_region
+
+
+def region_text(page, top, bottom, chars=None):
+    """Text of the characters lying wholly between top and bottom, laid out by pdfplumber.
+
+    chars are the page's layout_chars() on the fast path; None crops the page itself.
+    """
+    if chars is not None:
+        inside = [char for char in chars if char['top'] >= top and char['bottom'] <= bottom]
+        return pdfplumber.utils.extract_text(char_dicts(page, inside))
+    x0, page_top, x1, page_bottom = page.bbox
+    region = page.within_bbox((x0, max(top, page_top), x1, min(bottom, page_bottom)))
+    return region.extract_text() or ""
+
+
+def extract_table_region_text(page):
+    """Text of the invoice line plus the table region of a pdfplumber page.
+
+    Falls back to the text of the whole page (identical to page.extract_text())
+    when the regions cannot be found or no cube value precedes the instructions
+    line inside them, so parsing never sees less than it needs. Returns (text, cropped).
+    """
+    fast = layout_chars(page) if fast_path(page) else None
+    regions = find_table_regions(page.chars if fast is None else fast)
+    if regions is not None:
+        invoice_region, table_region = regions
+        table_text = region_text(page, *table_region, chars=fast)
+        # The cube is the last cube-looking value on the lines above the instructions line
+        above_instructions = table_text.upper().partition(INSTRUCTIONS_LINE)[0].rpartition("\n")[0]
+        if CUBE_PATTERN.search(above_instructions):
+            return region_text(page, *invoice_region, chars=fast) + "\n" + table_text, True
+
+    logger.debug("Page %s: no table region found, using the whole page", page.page_number)
+    if fast is not None:
+        return pdfplumber.utils.extract_text(char_dicts(page, fast)), False
+    return page.extract_text() or "", False
+
+
+class ColumnLayout(NamedTuple):
+    """Columns of a BOL table, taken from the words of its header row."""
+    names: tuple        # Header words, left to right
+    boundaries: tuple   # x positions splitting consecutive columns
+
+    def cells(self, words):
+        """Assign the words of one line to columns by their centres. Returns a cell per column."""
+        cells = [[] for _ in self.names]
+        for word in words:
+            cells[bisect.bisect(self.boundaries, (word['x0'] + word['x1']) / 2)].append(word['text'])
+        return [" ".join(cell) for cell in cells]
+
+
+def column_layout(header_words):
+    """ColumnLayout for a header row, computed once per distinct header position.
+
+    Every page of a document (and every document from the same template) draws
+    its header at the same x positions, so the boundaries are looked up by the
+    rounded header geometry rather than worked out again for each page.
+    """
+    signature = tuple((word['text'], round(word['x0']), round(word['x1'])) for word in header_words)
+    with _column_layouts_lock:
+        layout = _column_layouts.get(signature)
+    if layout is not None:
+        return layout
+
+    # Each column ends halfway across the gap to the next header word
+    boundaries = tuple((left['x1'] + right['x0']) / 2 for left, right in zip(header_words, header_words[1:]))
+    layout = ColumnLayout(tuple(word['text'].upper() for word in header_words), boundaries)
+    with _column_layouts_lock:
+        if len(_column_layouts) >= MAX_COLUMN_LAYOUTS:
+            _column_layouts.clear()
+        _column_layouts[signature] = layout
+    return layout
+
+
+def page_words(page):
+    """Words of a pdfplumber page, as page.extract_words() returns them."""
+    if fast_path(page):
+        return pdfplumber.utils.extract_words(char_dicts(page, layout_chars(page)))
+    return page.extract_words()
+
+
+def _numeric_cell(cell):
+    return cell.replace(',', '').isdigit()
+
+
+def extract_word_table_text(page):
+    """Page text built from its words, with table rows split into cells by column.
+
+    Lines come out as page.extract_text() would lay them out, except the rows
+    between the CARTONS/STYLE/PIECES header and the totals or instructions line:
+    their cells are joined with CELL_SEPARATOR, so multi-word styles stay in one
+    cell, and a line with an empty first column (a wrapped cell) is merged into
+    the row above. Rows whose cartons or pieces cell is not a number are left as
+    plain text. Returns (text, columns_found).
+    """
+    words = page_words(page)
+    lines = pdfplumber.utils.cluster_objects(words, itemgetter('top'), LINE_TOLERANCE)
+
+    out = []
+    layout = None
+    in_table = False
+    last_row = None  # Cells of the row a wrapped line is merged into
+    for line_words in lines:
+        text = " ".join(word['text'] for word in line_words)
+        upper = text.upper()
+        if in_table and (TOTALS_LINE in upper or INSTRUCTIONS_LINE in upper):
+            in_table = False
+        elif in_table:
+            cells = layout.cells(line_words)
+            if not cells[0] and last_row is not None:
+                for index, cell in enumerate(cells):
+                    if cell:
+                        last_row[index] = f"{last_row[index]} {cell}".strip()
+                continue
+            if len(cells) >= 3 and _numeric_cell(cells[0]) and _numeric_cell(cells[2]):
+                last_row = cells
+                out.append(cells)
+                continue
+            last_row = None
+        elif layout is None and all(word in upper for word in HEADER_WORDS):
+            layout = column_layout(line_words)
+            in_table = True
+        out.append(text)
+
+    text = "\n".join(line if isinstance(line, str) else CELL_SEPARATOR.join(line) for line in out)
+    return text, layout is not None
@@ -0,0 +1,116 @@
+"""
+Helpers for building small text PDFs and BOL page text in tests and benchmarks.
+No third-party PDF writer is needed - the documents use the built-in Helvetica font.
+"""
+
+
+def _escape_pdf_text(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_text_pdf(pages, font_size=9, leading=12):
+    """Return the bytes of a PDF with one page per entry in pages (a list of text lines).
+
+    A line may also be a list of (x, text) cells, drawn x points right of the margin.
+    """
+    objects = [
+        b"<</Type/Catalog/Pages 2 0 R>>",
+        None,  # Pages tree, filled in once the page object numbers are known
+        b"<</Type/Font/Subtype/Type1/BaseFont/Helvetica/Encoding/WinAnsiEncoding>>",
+    ]
+    page_refs = []
+    for lines in pages:
+        content = [f"BT /F1 {font_size} Tf {leading} TL 36 760 Td"]
+        for line in lines:
+            if isinstance(line, str):
+                content.append(f"({_escape_pdf_text(line)}) Tj T*")
+                continue
+            x = 0
+            for cell_x, text in line:
+                content.append(f"{cell_x - x} 0 Td ({_escape_pdf_text(text)}) Tj")
+                x = cell_x
+            content.append(f"{-x} 0 Td T*")
+        content.append("ET")
+        stream = "\n".join(content).encode('latin-1')
+
+        objects.append(b"<</Length %d>>stream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]"
+            b"/Resources<</Font<</F1 3 0 R>>>>/Contents %d 0 R>>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<</Type/Pages/Kids[" + kids + b"]/Count %d>>" % len(page_refs)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer<</Size %d/Root 1 0 R>>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(output)
+
+
+def write_text_pdf(path, pages):
+    """Write a text PDF to path and return the path."""
+    with open(path, 'wb') as f:
+        f.write(build_text_pdf(pages))
+    return path
+
+
+def bol_page_lines(invoice_no, rows, totals=True, bol_cube="123.45", page_label=None):
+    """Build the text lines of a BOL page.
+
+    rows are (cartons, style, pieces, weight) tuples.
+    """
+    lines = [
+        "ACME DISTRIBUTION CENTER",
+        f"BILL OF LADING {invoice_no}",
+        "SHIP FROM: 100 WAREHOUSE WAY",
+        "SHIP TO: RETAIL STORE 42",
+        "CARTONS STYLE PIECES DESCRIPTION WEIGHT",
+    ]
+    for cartons, style, pieces, weight in rows:
+        lines.append(f"{cartons} {style} {pieces} APPAREL {weight}")
+    if totals:
+        total_cartons = sum(int(str(r[0]).replace(',', '')) for r in rows)
+        total_pieces = sum(int(str(r[2]).replace(',', '')) for r in rows)
+        total_weight = sum(float(str(r[3]).replace(',', '')) for r in rows)
+        lines.append(f"{total_cartons} TOTAL CARTONS {total_pieces:,} TOTAL PIECES TOTAL VOL / WGT {total_weight:.1f}")
+    lines.append(f"CUBE {bol_cube}")
+    lines.append("SHIPPING INSTRUCTIONS:")
+    lines.append("HANDLE WITH CARE")
+    if page_label:
+        lines.append(page_label)
+    return lines
+
+
+# x offsets of the CARTONS, STYLE, PIECES, DESCRIPTION and WEIGHT columns
+BOL_COLUMNS = (0, 60, 150, 210, 330)
+
+
+def bol_column_page_lines(invoice_no, rows, bol_cube="123.45"):
+    """Build the lines of a BOL page whose table cells sit in columns.
+
+    rows are (cartons, style, pieces, description, weight) tuples; a row with an
+    empty cartons cell continues (wraps) the row above it.
+    """
+    header = ("CARTONS", "STYLE", "PIECES", "DESCRIPTION", "WEIGHT")
+    lines = [
+        "ACME DISTRIBUTION CENTER",
+        f"BILL OF LADING {invoice_no}",
+        "SHIP TO: RETAIL STORE 42",
+        list(zip(BOL_COLUMNS, header)),
+    ]
+    for row in rows:
+        lines.append([(x, str(cell)) for x, cell in zip(BOL_COLUMNS, row) if str(cell)])
+    lines.append(f"CUBE {bol_cube}")
+    lines.append("SHIPPING INSTRUCTIONS:")
+    return lines
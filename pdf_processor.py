@@ -1,143 +1,618 @@
 import os
+import re
 import gc
+import time
+import shutil
+import tempfile
+import atexit
+import logging
+import threading
+import multiprocessing
 import pdfplumber
 import pdf2image
-from utils import PopplerUtils, FileUtils, PopplerNotFoundError
-from config import POPPLER_PATH
+from utils import PopplerUtils, FileUtils
+from page_cache import get_page_text_cache, page_fingerprint
+from page_layout import extract_table_region_text, extract_word_table_text
+from ocr import PageOCR, get_ocr_status
+from config import (POPPLER_PATH, PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK, PDF_TEXT_MODE,
+                    PDF_WORKER_MAX_MEMORY_MB, PDF_WORKER_MAX_TASKS, PERSIST_PAGE_TEXT,
+                    PAGE_TEXT_CACHE_PATH, PAGE_TEXT_CACHE_MAX_PAGES,
+                    PDF_IMAGE_DPI, PDF_IMAGE_FORMAT, PDF_IMAGE_THREADS, PDF_IMAGE_BATCH_PAGES)
+
+logger = logging.getLogger(__name__)
+
+# Extraction pools are shared by every PDFProcessor in the process (keyed by size)
+# so worker start-up is paid once rather than on every upload.
+_extraction_pools = {}
+_extraction_pools_lock = threading.Lock()
+
+
+def _limit_worker_memory(max_memory_mb):
+    """Cap the address space of an extraction worker process (POSIX only)."""
+    if max_memory_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return  # No rlimits on Windows
+
+    # Allow max_memory_mb on top of what the freshly started worker already maps
+    try:
+        with open('/proc/self/statm') as statm:
+            baseline = int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        baseline = 0
+
+    limit = baseline + max_memory_mb * 1024 * 1024
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    except (ValueError, OSError) as e:
+        logger.warning("⚠️ Could not cap extraction worker memory: %s", e)
+
+
+def _get_extraction_pool(workers):
+    """Return the shared extraction pool with the given number of workers."""
+    with _extraction_pools_lock:
+        pool = _extraction_pools.get(workers)
+        if pool is None:
+            # 'spawn' keeps workers independent of any threads in the web process
+            context = multiprocessing.get_context('spawn')
+            pool = context.Pool(
+                processes=workers,
+                initializer=_limit_worker_memory,
+                initargs=(PDF_WORKER_MAX_MEMORY_MB,),
+                maxtasksperchild=PDF_WORKER_MAX_TASKS or None
+            )
+            _extraction_pools[workers] = pool
+            logger.info("🧵 Started PDF extraction pool with %d workers", workers)
+        return pool
+
+
+@atexit.register
+def shutdown_extraction_pools():
+    """Terminate all shared extraction pools."""
+    with _extraction_pools_lock:
+        for pool in _extraction_pools.values():
+            pool.terminate()
+        _extraction_pools.clear()
+
+
+# Text modes (see PDF_TEXT_MODE)
+TEXT_MODE_FULL = 'full'
+TEXT_MODE_TABLE = 'table'
+TEXT_MODE_WORDS = 'words'
+TEXT_MODES = (TEXT_MODE_FULL, TEXT_MODE_TABLE, TEXT_MODE_WORDS)
+
+
+def _empty_page_text(page_number):
+    """Placeholder text for a page without a text layer."""
+    return f"[Page {page_number} - No text content found]"
+
+
+def _extract_page_text(page, page_number, text_cache=None, text_mode=TEXT_MODE_FULL):
+    """Extract the text of a single pdfplumber page, with a placeholder for empty pages.
+
+    text_mode TEXT_MODE_TABLE lays out only the invoice line and the table region;
+    TEXT_MODE_WORDS builds the text from words and splits table rows into cells.
+    With a text_cache, pages whose fingerprint is already cached skip extraction.
+    Returns (text, extracted) where extracted is False for a cache hit.
+    """
+    key = page_fingerprint(page) if text_cache is not None else None
+    if key and text_mode != TEXT_MODE_FULL:
+        key = f"{key}:{text_mode}"
+    text = text_cache.get(key) if key else None
+    extracted = text is None
+
+    if extracted:
+        if text_mode == TEXT_MODE_TABLE:
+            text, _ = extract_table_region_text(page)
+        elif text_mode == TEXT_MODE_WORDS:
+            text, _ = extract_word_table_text(page)
+        else:
+            text = page.extract_text() or ""
+        if key:
+            text_cache.put(key, text)
+
+    if not text or text.strip() == "":
+        logger.warning("⚠️ Page %d has no extractable text", page_number)
+        text = _empty_page_text(page_number)
+
+    # Clear page from memory
+    if hasattr(page, 'flush_cache'):
+        page.flush_cache()
+
+    return text, extracted
+
+
+def _extract_page_range(task):
+    """Worker entry point: open the PDF and extract text for pages first..last (1-based).
+
+    Returns a list of (page_number, text) tuples; text is None for pages that failed.
+    """
+    pdf_path, first_page, last_page, cache_path, text_mode = task
+    text_cache = get_page_text_cache(cache_path, PAGE_TEXT_CACHE_MAX_PAGES) if cache_path else None
+    results = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number in range(first_page, last_page + 1):
+            try:
+                text, _ = _extract_page_text(pdf.pages[page_number - 1], page_number, text_cache, text_mode)
+            except Exception as page_error:
+                logger.warning("⚠️ Error processing page %d: %s", page_number, page_error)
+                text = None
+            results.append((page_number, text))
+    gc.collect()
+    return results
+
+
+# Image formats extract_images can write: format -> file extension
+IMAGE_EXTENSIONS = {'jpeg': 'jpg', 'png': 'png'}
+
+# pdftoppm names its output <prefix>-<page number>.<ext>
+_RENDERED_PAGE_PATTERN = re.compile(r'-(\d+)\.\w+$')
+
 
 class PDFProcessor:
-    def __init__(self, session_dir):
-        """Initialize the PDF processor with a session directory."""
+    def __init__(self, session_dir, workers=None, persist_text=None, text_cache=None, ocr=None, text_mode=None):
+        """Initialize the PDF processor with a session directory.
+
+        workers sets the number of extraction processes (defaults to PDF_EXTRACT_WORKERS);
+        1 extracts pages in the current process. persist_text makes iter_pages() also
+        write the numbered TXT files (defaults to PERSIST_PAGE_TEXT). text_cache is the
+        PageTextCache consulted before extracting a page (defaults to the shared cache
+        at PAGE_TEXT_CACHE_PATH; False disables it). ocr is the PageOCR used for pages
+        without a text layer (defaults to one when get_ocr_status() reports OCR as
+        available; False disables it). text_mode is one of TEXT_MODES (defaults to
+        PDF_TEXT_MODE).
+        """
         self.session_dir = session_dir
-        self.poppler_available = False
-        
-        # Check Poppler availability without crashing
-        try:
-            PopplerUtils.check_poppler_installation()
-            self.poppler_available = True
-        except PopplerNotFoundError as e:
-            print(f"⚠️ Poppler not available: {str(e)}")
-            print("📄 PDF processing will use pdfplumber only (text extraction)")
-            self.poppler_available = False
-        except Exception as e:
-            print(f"⚠️ Error checking Poppler: {str(e)}")
-            print("📄 PDF processing will use pdfplumber only (text extraction)")
-            self.poppler_available = False
+        if text_cache is None:
+            text_cache = get_page_text_cache(PAGE_TEXT_CACHE_PATH, PAGE_TEXT_CACHE_MAX_PAGES)
+        self.text_cache = text_cache or None
+        self.text_mode = PDF_TEXT_MODE if text_mode is None else text_mode
+        if self.text_mode not in TEXT_MODES:
+            logger.warning("⚠️ Unknown text mode '%s', extracting full pages", self.text_mode)
+            self.text_mode = TEXT_MODE_FULL
+        self.workers = PDF_EXTRACT_WORKERS if workers is None else workers
+        self.pages_per_task = max(1, PDF_PAGES_PER_TASK)
+        self.persist_text = PERSIST_PAGE_TEXT if persist_text is None else persist_text
+        self.page_count = 0
+        self.extraction_error = None
+        self.document_errors = {}
+        if ocr is None:
+            ocr = PageOCR() if get_ocr_status()['available'] else None
+        self.ocr = ocr or None
+        # OCR timings are kept apart from text extraction: seconds is wall time,
+        # page_seconds the sum over pages (render + recognition); failed counts pages
+        # whose OCR raised (a timeout, a render error) rather than finding no text
+        self.ocr_stats = {'pages': 0, 'recovered': 0, 'failed': 0, 'seconds': 0.0, 'page_seconds': 0.0}
+
+        # Poppler is probed once per process; see PopplerUtils.refresh_poppler_status
+        poppler_status = PopplerUtils.get_poppler_status()
+        self.poppler_available = poppler_status['available']
+        if not self.poppler_available:
+            logger.debug("📄 PDF processing will use pdfplumber only (text extraction): %s", poppler_status['error'])
 
     def process_first_pdf(self):
         """Process the first PDF found in the directory."""
         try:
             pdf_files = [f for f in os.listdir(self.session_dir) if f.lower().endswith('.pdf')]
             if not pdf_files:
-                print("❌ No PDF files found in the session directory")
+                logger.error("❌ No PDF files found in the session directory")
                 return False
 
             pdf_path = os.path.join(self.session_dir, pdf_files[0])
-            print(f"📄 Processing PDF: {pdf_path}")
+            logger.info("📄 Processing PDF: %s", pdf_path)
         
             # Extract text using pdfplumber (always available)
             success = self.extract_text(pdf_path)
             
             if success:
-                print(f"✅ PDF processed successfully: {pdf_files[0]}")
+                logger.info("✅ PDF processed successfully: %s", pdf_files[0])
             
                 # Clean up the PDF file after processing
                 try:
                     os.remove(pdf_path)
-                    print(f"🗑️ Removed processed PDF: {pdf_files[0]}")
+                    logger.info("🗑️ Removed processed PDF: %s", pdf_files[0])
                 except Exception as cleanup_error:
-                    print(f"⚠️ Warning: Could not remove PDF file: {str(cleanup_error)}")
+                    logger.warning("⚠️ Warning: Could not remove PDF file: %s", cleanup_error)
             
                 # Force garbage collection
                 gc.collect()
             
                 return True
             else:
-                print(f"❌ Failed to extract text from PDF: {pdf_files[0]}")
+                logger.error("❌ Failed to extract text from PDF: %s", pdf_files[0])
                 return False
             
         except Exception as e:
-            print(f"❌ Error processing PDF: {str(e)}")
+            logger.error("❌ Error processing PDF: %s", e)
             return False
 
     def extract_text(self, pdf_path):
         """Extract text from PDF and save as numbered TXT files."""
         try:
-            print(f"📄 Extracting text from PDF: {os.path.basename(pdf_path)}")
-            
-            with pdfplumber.open(pdf_path) as pdf:
-                if not pdf.pages:
-                    print("❌ PDF has no pages")
-                    return False
-                
-                page_count = len(pdf.pages)
-                print(f"📄 Processing {page_count} pages")
-                
-                for i, page in enumerate(pdf.pages):
-                    try:
-                        # Process one page at a time
-                        text = page.extract_text()
-                        
-                        if not text or text.strip() == "":
-                            print(f"⚠️ Page {i+1} has no extractable text")
-                            text = f"[Page {i+1} - No text content found]"
-                        
-                        text_path = os.path.join(self.session_dir, f"{i+1}.txt")
-                    
-                        with open(text_path, 'w', encoding='utf-8') as text_file:
-                            text_file.write(text)
-                        
-                        print(f"✅ Saved text from page {i+1} to {os.path.basename(text_path)}")
-                    
-                        # Clear page from memory
-                        if hasattr(page, 'flush_cache'):
-                            page.flush_cache()
-                    
-                        # Force garbage collection every few pages
-                        if i % 5 == 0:
-                            gc.collect()
-                        
-                    except Exception as page_error:
-                        print(f"⚠️ Error processing page {i+1}: {str(page_error)}")
-                        # Continue with other pages
-                        continue
-                        
-            print(f"✅ Text extraction completed for {page_count} pages")
+            logger.info("📄 Extracting text from PDF: %s", os.path.basename(pdf_path))
+
+            for page_number, text in self._iter_page_texts(pdf_path):
+                self._save_page_text(page_number, text)
+
+            if not self.page_count:
+                logger.error("❌ PDF has no pages")
+                return False
+
+            logger.info("✅ Text extraction completed for %d pages", self.page_count)
             return True
                     
         except pdfplumber.pdfminer.pdfparser.PDFSyntaxError as err:
-            print(f"PDF syntax error → {err}")
+            logger.error("PDF syntax error → %s", err)
             return False
         except Exception as e:
-            print(f"❌ Error extracting text from PDF: {str(e)}")
+            logger.error("❌ Error extracting text from PDF: %s", e)
             return False
 
-    def extract_images(self, pdf_path):
-        """Convert PDF pages to images and save as numbered JPGs."""
+    def iter_session_pages(self):
+        """Yield (page_id, text) for the pages of every PDF in the session, without writing TXT files.
+
+        Documents come in file name order and page_id is "<pdf name>_<page number>", so
+        pages of different documents never collide. With workers > 1 the page ranges of
+        all documents share the extraction pool, so documents are extracted concurrently;
+        results still arrive in document and page order.
+
+        A PDF that cannot be read, in the serial and the parallel path alike, is recorded
+        in self.document_errors ({pdf name: error}); when it fails part way, the error says
+        how many of its pages were already yielded. self.extraction_error is only set when
+        no page at all could be read. Each PDF is removed once all of its pages have been
+        read or it has failed. Sets self.page_count to the total.
+        """
+        self.extraction_error = None
+        self.document_errors = {}
+        self.page_count = 0
+        pdf_files = sorted(FileUtils.get_pdf_files(self.session_dir))
+        if not pdf_files:
+            self.extraction_error = "No PDF files found in the session directory"
+            logger.error("❌ %s", self.extraction_error)
+            return
+
+        documents = []
+        for pdf_file in pdf_files:
+            pdf_path = os.path.join(self.session_dir, pdf_file)
+            try:
+                with pdfplumber.open(pdf_path) as pdf:
+                    page_count = len(pdf.pages)
+            except Exception as e:
+                self._document_failed(pdf_file, pdf_path, e)
+                continue
+            if not page_count:
+                self._document_failed(pdf_file, pdf_path, "PDF has no pages")
+                continue
+            documents.append((pdf_file, pdf_path, page_count))
+
+        self.page_count = sum(page_count for _, _, page_count in documents)
+        logger.info("📄 Streaming %d pages from %d PDFs", self.page_count, len(documents))
+
+        if self.workers > 1 and (len(documents) > 1 or self._use_worker_pool(self.page_count)):
+            document_pages = self._iter_documents_parallel(documents)
+        else:
+            document_pages = self._iter_documents_serial(documents)
+
+        pages_read = 0
+        try:
+            for pdf_file, page_number, text in document_pages:
+                page_id = f"{os.path.splitext(pdf_file)[0]}_{page_number}"
+                if self.persist_text:
+                    self._save_page_text(page_id, text)
+                pages_read += 1
+                yield page_id, text
+        except Exception as e:
+            self.extraction_error = f"Error extracting text from PDFs: {str(e)}"
+            logger.error("❌ %s", self.extraction_error)
+            return
+
+        if not pages_read:
+            self.extraction_error = "; ".join(
+                f"{pdf_file}: {error}" for pdf_file, error in self.document_errors.items()
+            ) or "PDFs have no readable pages"
+            logger.error("❌ %s", self.extraction_error)
+            return
+
+        logger.info("✅ Text extraction completed for %d pages from %d PDFs", pages_read, len(documents))
+        gc.collect()
+
+    def _iter_documents_serial(self, documents):
+        """Yield (pdf_file, page_number, text) document after document in this process."""
+        for pdf_file, pdf_path, _ in documents:
+            pages_read = 0
+            try:
+                with pdfplumber.open(pdf_path) as pdf:
+                    for page_number, text in self._with_ocr(pdf_path, self._iter_open_pdf_pages(pdf)):
+                        pages_read += 1
+                        yield pdf_file, page_number, text
+            except Exception as e:
+                self._document_failed(pdf_file, pdf_path, e, pages_read)
+                continue
+            self._remove_pdf(pdf_path)
+
+    def _iter_documents_parallel(self, documents):
+        """Yield (pdf_file, page_number, text) with every document's page ranges on the shared pool.
+
+        A task that raises fails its document only: the document's remaining results are
+        drained, so the next document still starts at its own first task.
+        """
+        tasks, task_counts = [], []
+        for pdf_file, pdf_path, page_count in documents:
+            document_tasks = self._page_range_tasks(pdf_path, page_count)
+            tasks.extend(document_tasks)
+            task_counts.append(len(document_tasks))
+
+        workers = min(self.workers, len(tasks))
+        logger.info("🧵 Extracting %d PDFs in %d tasks across %d workers", len(documents), len(tasks), workers)
+
+        pool = _get_extraction_pool(self.workers)
+        # imap preserves task order, so pages come back in document order
+        results = pool.imap(_extract_page_range, tasks)
+        for (pdf_file, pdf_path, _), task_count in zip(documents, task_counts):
+            pending = [task_count]  # Tasks of this document not yet taken from results
+            pages_read = 0
+            try:
+                pages = self._iter_task_results(results, pending)
+                for page_number, text in self._with_ocr(pdf_path, pages):
+                    pages_read += 1
+                    yield pdf_file, page_number, text
+            except Exception as e:
+                self._document_failed(pdf_file, pdf_path, e, pages_read)
+                self._drain_task_results(results, pending[0])
+                continue
+            self._remove_pdf(pdf_path)
+
+    @staticmethod
+    def _iter_task_results(results, pending):
+        """Yield the (page_number, text) pages of the next pending[0] page range results.
+
+        pending[0] counts down as results are taken, so a caller can drain the rest.
+        """
+        while pending[0]:
+            pending[0] -= 1
+            for page_number, text in next(results):
+                if text is not None:
+                    yield page_number, text
+
+    @staticmethod
+    def _drain_task_results(results, task_count):
+        """Discard the next task_count page range results, failed ones included."""
+        for _ in range(task_count):
+            try:
+                next(results)
+            except Exception:
+                continue
+
+    def _with_ocr(self, pdf_path, pages):
+        """Pass (page_number, text) pages through, replacing pages without text by their OCR text.
+
+        Pages stream through until the first one without text. From there on the rest of
+        the document is held back (text only) so its empty pages can be recognised together
+        on the OCR thread pool; then everything is yielded, still in page order.
+        """
+        if self.ocr is None:
+            yield from pages
+            return
+
+        held = []
+        for page_number, text in pages:
+            if held or text == _empty_page_text(page_number):
+                held.append((page_number, text))
+            else:
+                yield page_number, text
+        if not held:
+            return
+
+        empty_pages = [page_number for page_number, text in held if text == _empty_page_text(page_number)]
+        logger.info("🔍 Running OCR on %d pages without text", len(empty_pages))
+        started = time.perf_counter()
+        ocr_texts = {}
+        for result in self.ocr.ocr_pages(pdf_path, empty_pages):
+            self.ocr_stats['page_seconds'] += result.seconds
+            if result.error:
+                self.ocr_stats['failed'] += 1
+            elif result.text.strip():
+                ocr_texts[result.page_number] = result.text
+        seconds = time.perf_counter() - started
+
+        self.ocr_stats['pages'] += len(empty_pages)
+        self.ocr_stats['recovered'] += len(ocr_texts)
+        self.ocr_stats['seconds'] += seconds
+        logger.info("🔍 OCR recovered text on %d of %d pages in %.2fs", len(ocr_texts), len(empty_pages), seconds)
+
+        for page_number, text in held:
+            yield page_number, ocr_texts.get(page_number, text)
+
+    def _document_failed(self, pdf_file, pdf_path, error, pages_read=0):
+        """Record a PDF that could not be read in self.document_errors and remove it.
+
+        pages_read is how many of its pages were yielded before it failed; their rows
+        stay in the output, which the recorded error says.
+        """
+        if isinstance(error, pdfplumber.pdfminer.pdfparser.PDFSyntaxError):
+            error = f"PDF syntax error → {error}"
+        if pages_read:
+            self.document_errors[pdf_file] = f"{error} (failed after {pages_read} pages; those pages were kept)"
+            logger.error("❌ %s failed after %d pages: %s", pdf_file, pages_read, error)
+        else:
+            self.document_errors[pdf_file] = str(error)
+            logger.error("❌ Skipping %s: %s", pdf_file, error)
+        # A failed PDF would otherwise be read again by every later upload to the session
+        self._remove_pdf(pdf_path)
+
+    def _remove_pdf(self, pdf_path):
+        try:
+            os.remove(pdf_path)
+            logger.info("🗑️ Removed processed PDF: %s", os.path.basename(pdf_path))
+        except Exception as cleanup_error:
+            logger.warning("⚠️ Warning: Could not remove PDF file: %s", cleanup_error)
+
+    def iter_pages(self, pdf_path):
+        """Yield (page_number, text) for every page of the PDF, in page order.
+
+        Text stays in memory; TXT files are only written when persist_text is set.
+        """
+        for page_number, text in self._iter_page_texts(pdf_path):
+            if self.persist_text:
+                self._save_page_text(page_number, text)
+            yield page_number, text
+
+    def _save_page_text(self, page_id, text):
+        """Write a page's text to <session>/<page_id>.txt."""
+        text_path = os.path.join(self.session_dir, f"{page_id}.txt")
+
+        with open(text_path, 'w', encoding='utf-8') as text_file:
+            text_file.write(text)
+
+        logger.debug("✅ Saved text from page %s to %s", page_id, os.path.basename(text_path))
+
+    def _use_worker_pool(self, page_count):
+        """Only fan out when there is more than one task's worth of pages."""
+        return self.workers > 1 and page_count > self.pages_per_task
+
+    def _iter_page_texts(self, pdf_path):
+        """Yield (page_number, text) for every page of the PDF, in page order.
+
+        Pages that fail to extract are skipped. Sets self.page_count.
+        """
+        self.page_count = 0
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+            self.page_count = page_count
+            if not page_count:
+                return
+
+            logger.info("📄 Processing %d pages", page_count)
+
+            if not self._use_worker_pool(page_count):
+                yield from self._with_ocr(pdf_path, self._iter_open_pdf_pages(pdf))
+                return
+
+        # Parallel mode: each worker opens the PDF itself and extracts a page range
+        yield from self._with_ocr(pdf_path, self._iter_page_texts_parallel(pdf_path, page_count))
+
+    def _iter_open_pdf_pages(self, pdf):
+        """Extract an open pdfplumber PDF page by page in this process.
+
+        Pages that fail to extract are skipped.
+        """
+        extracted_pages = 0
+        for i, page in enumerate(pdf.pages):
+            try:
+                # Process one page at a time
+                text, extracted = _extract_page_text(page, i + 1, self.text_cache, self.text_mode)
+            except Exception as page_error:
+                logger.warning("⚠️ Error processing page %d: %s", i + 1, page_error)
+                # Continue with other pages
+                continue
+
+            yield i + 1, text
+
+            # Force garbage collection every few extracted pages (cache hits allocate little)
+            if extracted:
+                if extracted_pages % 5 == 0:
+                    gc.collect()
+                extracted_pages += 1
+
+    def _page_range_tasks(self, pdf_path, page_count):
+        """Split a PDF into pages_per_task page ranges for _extract_page_range."""
+        # Workers open the same page cache file themselves
+        cache_path = self.text_cache.path if self.text_cache else None
+        return [
+            (pdf_path, first_page, min(first_page + self.pages_per_task - 1, page_count), cache_path, self.text_mode)
+            for first_page in range(1, page_count + 1, self.pages_per_task)
+        ]
+
+    def _iter_page_texts_parallel(self, pdf_path, page_count):
+        """Extract page ranges on the shared process pool, yielding results in page order."""
+        tasks = self._page_range_tasks(pdf_path, page_count)
+        workers = min(self.workers, len(tasks))
+        logger.info("🧵 Extracting %d pages in %d tasks across %d workers", page_count, len(tasks), workers)
+
+        pool = _get_extraction_pool(self.workers)
+        # imap preserves task order, so pages come back in document order
+        for results in pool.imap(_extract_page_range, tasks):
+            for page_number, text in results:
+                if text is None:
+                    continue
+                yield page_number, text
+
+    def extract_images(self, pdf_path, dpi=None, fmt=None, thread_count=None):
+        """Convert PDF pages to images and save them as page_<n>.jpg (or .png).
+
+        Pages are rendered in batches straight to disk, so memory use does not grow
+        with the page count. dpi, fmt and thread_count default to PDF_IMAGE_DPI,
+        PDF_IMAGE_FORMAT and PDF_IMAGE_THREADS.
+        """
         if not self.poppler_available:
-            print("⚠️ Poppler not available - image extraction skipped")
+            logger.warning("⚠️ Poppler not available - image extraction skipped")
             return False
             
         try:
-            print(f"🖼️ Extracting images from PDF: {os.path.basename(pdf_path)}")
+            logger.info("🖼️ Extracting images from PDF: %s", os.path.basename(pdf_path))
             
-            images = pdf2image.convert_from_path(
-                pdf_path,
-                poppler_path=POPPLER_PATH
-            )
-            
-            for i, image in enumerate(images):
-                image_path = os.path.join(self.session_dir, f"page_{i+1}.jpg")
-                image.save(image_path, "JPEG")
-                print(f"✅ Saved image for page {i+1} to {os.path.basename(image_path)}")
+            page_count = 0
+            for page_number, image_path in self.iter_page_images(pdf_path, dpi, fmt, thread_count):
+                page_count += 1
+                logger.debug("✅ Saved image for page %d to %s", page_number, os.path.basename(image_path))
                 
-            print(f"✅ Image extraction completed for {len(images)} pages")
+            logger.info("✅ Image extraction completed for %d pages", page_count)
             return True
                 
         except Exception as e:
-            print(f"❌ Error converting PDF to images: {str(e)}")
+            logger.error("❌ Error converting PDF to images: %s", e)
             return False
 
+    def iter_page_images(self, pdf_path, dpi=None, fmt=None, thread_count=None):
+        """Render pages batch by batch and yield (page_number, image_path) in page order.
+
+        pdftoppm writes each batch into a scratch folder (paths_only, so no PIL image
+        is ever loaded here); the files are then moved to <session>/page_<n>.<ext>.
+        """
+        dpi = dpi or PDF_IMAGE_DPI
+        fmt = (fmt or PDF_IMAGE_FORMAT).lower()
+        thread_count = max(1, thread_count or PDF_IMAGE_THREADS)
+        if fmt not in IMAGE_EXTENSIONS:
+            raise ValueError(f"Unsupported image format: {fmt}")
+        extension = IMAGE_EXTENSIONS[fmt]
+
+        page_count = pdf2image.pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)["Pages"]
+        # Each pdftoppm thread needs at least one page of the batch
+        batch_pages = max(PDF_IMAGE_BATCH_PAGES, thread_count)
+
+        for first_page in range(1, page_count + 1, batch_pages):
+            last_page = min(first_page + batch_pages - 1, page_count)
+            scratch_dir = tempfile.mkdtemp(prefix=".render_", dir=self.session_dir)
+            try:
+                rendered = pdf2image.convert_from_path(
+                    pdf_path,
+                    dpi=dpi,
+                    fmt=fmt,
+                    first_page=first_page,
+                    last_page=last_page,
+                    thread_count=thread_count,
+                    output_folder=scratch_dir,
+                    output_file="page",
+                    paths_only=True,
+                    poppler_path=POPPLER_PATH
+                )
+                pages = sorted(
+                    (int(_RENDERED_PAGE_PATTERN.search(path).group(1)), path) for path in rendered
+                )
+                for page_number, rendered_path in pages:
+                    image_path = os.path.join(self.session_dir, f"page_{page_number}.{extension}")
+                    os.replace(rendered_path, image_path)
+                    yield page_number, image_path
+            finally:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
 if __name__ == "__main__":
+    from utils import configure_logging
+    configure_logging()
     processor = PDFProcessor(".")  # Use current directory for CLI usage
     processor.process_first_pdf()
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Content-addressed cache of combined CSVs for PDFs that were already processed.
+
+The key is the SHA-256 of the session's PDF bytes salted with every setting that changes
+the combined CSV (see result_cache_salt), so a parser or settings change never serves
+stale output. Entries are plain files on disk; reading an
+entry refreshes its mtime and the oldest entries are evicted once the directory
+grows past its size bound.
+"""
+
+import os
+import shutil
+import hashlib
+import logging
+import threading
+from config import RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB, PDF_TEXT_MODE, SINGLE_WRITER_EXPORT
+from config import OCR_DPI, OCR_LANG, OCR_TESSERACT_CONFIG
+from bol_parser import PARSER_VERSION
+from ocr import get_ocr_status
+from output_schema import get_output_schema
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def result_cache_salt(parser_version=PARSER_VERSION, text_mode=PDF_TEXT_MODE, single_writer=SINGLE_WRITER_EXPORT,
+                      ocr=None, schema=None):
+    """Salt for ResultCache keys, built from every setting that changes the combined CSV.
+
+    A setting that changes the output belongs here, not at the call site, so results
+    produced under other settings are never served. single_writer is the export mode:
+    the single writer emits rows in page order with CRLF line endings, CSVExporter in
+    per-invoice file order. ocr describes what scanned pages go through: "off" when the
+    OCR fallback is unavailable (their rows are missing), else its resolution, language
+    and Tesseract options. schema is the output schema's fingerprint (header and column
+    definitions). None uses this process's.
+    """
+    if ocr is None:
+        ocr = f"{OCR_DPI}/{OCR_LANG}/{OCR_TESSERACT_CONFIG}" if get_ocr_status()['available'] else "off"
+    if schema is None:
+        schema = get_output_schema().fingerprint
+    export = "single" if single_writer else "exporter"
+    return ":".join((parser_version, text_mode, "export=" + export, "ocr=" + ocr, "schema=" + schema))
+
+
+class ResultCache:
+    def __init__(self, cache_dir=RESULT_CACHE_DIR, max_mb=RESULT_CACHE_MAX_MB, salt=None):
+        """Cache combined CSVs under cache_dir, using at most max_mb megabytes (0 disables it).
+
+        salt defaults to result_cache_salt() for the current settings.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max(0, max_mb) * 1024 * 1024
+        self.salt = result_cache_salt() if salt is None else salt
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def key_for(self, *pdf_paths):
+        """SHA-256 of the salt and the bytes of the PDFs, in the given order.
+
+        With several PDFs each one is prefixed by its size, so the split between
+        documents is part of the key; a single PDF keys on its bytes alone.
+        """
+        digest = hashlib.sha256(f"bol-parser:{self.salt}\n".encode('utf-8'))
+        for pdf_path in pdf_paths:
+            if len(pdf_paths) > 1:
+                digest.update(b"%d\n" % os.path.getsize(pdf_path))
+            with open(pdf_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    def fetch(self, key, dest_path):
+        """Copy the cached CSV for key to dest_path. Returns True on a hit."""
+        entry = self._entry_path(key)
+        try:
+            shutil.copyfile(entry, dest_path)
+            os.utime(entry)  # Mark as recently used
+        except FileNotFoundError:
+            self._count(hit=False)
+            return False
+        except OSError as e:
+            logger.warning("⚠️ Could not read cached result %s: %s", key[:12], e)
+            self._count(hit=False)
+            return False
+        self._count(hit=True)
+        logger.info("♻️ Result cache hit for %s", key[:12])
+        return True
+
+    def store(self, key, src_path):
+        """Add the CSV at src_path under key, then evict down to the size bound."""
+        if not self.enabled:
+            return False
+        entry = self._entry_path(key)
+        tmp_path = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, entry)
+        except OSError as e:
+            logger.warning("⚠️ Could not cache result %s: %s", key[:12], e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        self.evict()
+        return True
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.debug("Evicted cached result %s", os.path.basename(path))
+            except OSError:
+                continue
+
+    def stats(self):
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'entries': len(entries),
+            'size_bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'parser_version': PARSER_VERSION,
+            'salt': self.salt,
+        }
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.csv")
+
+    def _entries(self):
+        """(path, size, mtime) of every cached CSV."""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.csv'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
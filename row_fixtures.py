@@ -0,0 +1,80 @@
+"""
+Reference row parsing and synthetic BOL table lines for tests and benchmarks.
+
+legacy_is_valid_table_row and legacy_parse_row are the original per-call regex logic
+the precompiled TableRowClassifier replaced; the equivalence tests compare against them.
+"""
+
+import re
+import random
+from bol_parser import ROW_CLASSIFIER, ROW
+
+
+def legacy_is_valid_table_row(line):
+    """The original DataProcessor._is_valid_table_row, kept as the baseline."""
+    line = ' '.join(line.split())
+    if not line:
+        return False
+    skip_patterns = [
+        r'^CARTONS.*STYLE.*PIECES',
+        r'^SHIPPING INSTRUCTIONS',
+        r'^TOTAL CARTONS',
+        r'^Page \d+',
+        r'^BILL OF LADING',
+        r'^[A-Z\s]+:',
+    ]
+    for pattern in skip_patterns:
+        if re.match(pattern, line, re.IGNORECASE):
+            return False
+    if re.match(r'^\d+', line):
+        return True
+    numbers = re.findall(r'\d+', line)
+    if len(numbers) >= 3:
+        return True
+    if re.search(r'\b[A-Z]+\d+\b', line) or re.search(r'\b\d+[A-Z]+\b', line):
+        tokens = line.split()
+        if len(tokens) >= 3 and any(re.match(r'^\d+', token) for token in tokens):
+            return True
+    return False
+
+
+def legacy_parse_row(line_stripped):
+    """The original row split from DataProcessor._extract_table_data, as a tuple; None when skipped."""
+    if not legacy_is_valid_table_row(line_stripped):
+        return None
+    tokens = line_stripped.split()
+    if len(tokens) < 3:
+        return None
+    cartons = tokens[0].replace(',', '')
+    style = tokens[1]
+    individual_pieces = tokens[2].replace(',', '')
+    individual_weight = ""
+    for token in reversed(tokens):
+        if re.match(r'^\d+\.?\d*$', token.replace(',', '')):
+            individual_weight = token.replace(',', '')
+            break
+    if not individual_weight:
+        return None
+    return (cartons, individual_pieces, individual_weight, style)
+
+
+def compiled_parse_row(line_stripped):
+    """TableRowClassifier's answer in the same form as legacy_parse_row."""
+    kind, row = ROW_CLASSIFIER.classify(line_stripped)
+    return row if kind is ROW else None
+
+
+def synthetic_table(line_count, seed=42):
+    """BOL-like table lines: mostly data rows with some labels, page markers and noise."""
+    rng = random.Random(seed)
+    templates = [
+        lambda: f"{rng.randint(1, 99)} ST{rng.randint(100, 9999)} {rng.randint(1, 2000):,} APPAREL {rng.uniform(1, 999):.1f}",
+        lambda: f"{rng.randint(1, 99)} {rng.randint(10, 99)}AB {rng.randint(1, 500)} KNIT TOPS {rng.randint(1, 99)}",
+        lambda: f"  {rng.randint(1, 9)}   X{rng.randint(1, 9)}   {rng.randint(1, 9)}   n/a  ",
+        lambda: f"Page {rng.randint(1, 60)}",
+        lambda: "SHIP TO: RETAIL STORE",
+        lambda: f"STYLE AB{rng.randint(1, 99)} CARRIES {rng.randint(1, 9)} ITEMS",
+        lambda: "CONTINUED ON NEXT PAGE",
+    ]
+    weights = [70, 10, 5, 4, 4, 4, 3]
+    return [rng.choices(templates, weights)[0]() for _ in range(line_count)]
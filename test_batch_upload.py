@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Tests for /upload-batch: many PDFs in one request, combined or zipped output and the manifest.
+"""
+
+import io
+import os
+import csv
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+import uuid
+from unittest import mock
+from batch_processor import BatchProcessor, BatchError, MANIFEST_NAME, BATCH_DIR
+from pdf_fixtures import build_text_pdf, bol_page_lines
+
+FIRST_PDF = build_text_pdf([
+    bol_page_lines("A1001", [(10, "ST100", 120, "45.5"), (5, "ST200", 60, "20.0")]),
+])
+SECOND_PDF = build_text_pdf([
+    bol_page_lines("B2002", [(1, "XY9", 12, "1.5")], bol_cube="9.50"),
+])
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _session(app):
+    sid = f"test_batch_{uuid.uuid4().hex[:8]}"
+    return sid, os.path.join(app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+
+
+def test_multipart_batch_builds_one_combined_csv():
+    from app import app
+
+    client = app.test_client()
+    sid, session_dir = _session(app)
+    try:
+        response = client.post(f'/upload-batch?_sid={sid}', data={'files': [
+            (io.BytesIO(FIRST_PDF), 'first.pdf'),
+            (io.BytesIO(SECOND_PDF), 'second.pdf'),
+        ]}, content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_json()
+        result = response.get_json()
+        manifest = result['manifest']
+        assert manifest['succeeded'] == 2 and manifest['failed'] == 0
+        assert [doc['filename'] for doc in manifest['documents']] == ['first.pdf', 'second.pdf']
+        assert [doc['rows'] for doc in manifest['documents']] == [2, 1]
+        assert all(doc['seconds'] >= 0 for doc in manifest['documents'])
+        # Work directories are gone once the batch is assembled
+        assert not os.path.exists(os.path.join(session_dir, BATCH_DIR))
+
+        download = client.get(result['download_url'])
+        assert download.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(download.data.decode('utf-8'))))
+        assert [row['Invoice No.'] for row in rows] == ['A1001', 'A1001', 'B2002']
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_zip_batch_returns_per_document_csvs_and_manifest():
+    from app import app
+
+    client = app.test_client()
+    sid, session_dir = _session(app)
+    try:
+        archive = _zip({
+            'docs/first.pdf': FIRST_PDF,
+            'second.pdf': SECOND_PDF,
+            'broken.pdf': b"not a pdf",
+            'notes.txt': b"ignored",
+        })
+        response = client.post(f'/upload-batch?_sid={sid}&output=zip',
+                               data={'files': [(io.BytesIO(archive), 'batch.zip')]},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_json()
+        manifest = response.get_json()['manifest']
+        statuses = {doc['filename']: doc['status'] for doc in manifest['documents']}
+        assert statuses == {'first.pdf': 'succeeded', 'second.pdf': 'succeeded', 'broken.pdf': 'failed'}
+        assert manifest['failed'] == 1
+
+        download = client.get(response.get_json()['download_url'])
+        assert download.status_code == 200
+        with zipfile.ZipFile(io.BytesIO(download.data)) as result_zip:
+            assert sorted(result_zip.namelist()) == ['first.csv', MANIFEST_NAME, 'second.csv']
+            assert b"B2002" in result_zip.read('second.csv')
+            assert json.loads(result_zip.read(MANIFEST_NAME))['succeeded'] == 2
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_batch_rejects_bad_input():
+    from app import app
+
+    client = app.test_client()
+    sid, session_dir = _session(app)
+    try:
+        response = client.post(f'/upload-batch?_sid={sid}', data={'files': [(io.BytesIO(b"x"), 'data.csv')]},
+                               content_type='multipart/form-data')
+        assert response.status_code == 400
+        assert client.post(f'/upload-batch?_sid={sid}').status_code == 400
+        assert client.post(f'/upload-batch?_sid={sid}&output=tar').status_code == 400
+
+        # A zip request body works without multipart
+        response = client.post(f'/upload-batch?_sid={sid}', data=_zip({'only.pdf': SECOND_PDF}),
+                               content_type='application/zip')
+        assert response.status_code == 200, response.get_json()
+        assert response.get_json()['manifest']['documents'][0]['filename'] == 'only.pdf'
+        # It is streamed to a temp file, never read into memory, and the temp file is gone
+        with mock.patch('flask.Request.get_data', side_effect=AssertionError("body read into memory")):
+            response = client.post(f'/upload-batch?_sid={sid}', data=_zip({'only.pdf': SECOND_PDF}),
+                                   content_type='application/zip')
+        assert response.status_code == 200, response.get_json()
+        assert not os.path.exists(os.path.join(session_dir, BATCH_DIR))
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_async_zip_batch_job_links_to_the_zip():
+    from app import app
+
+    client = app.test_client()
+    sid, session_dir = _session(app)
+    try:
+        response = client.post(f'/upload-batch?_sid={sid}&output=zip&_async=1',
+                               data=_zip({'only.pdf': SECOND_PDF}), content_type='application/zip')
+        assert response.status_code == 202, response.get_json()
+        status_url = response.get_json()['status_url']
+        deadline = time.time() + 30
+        job = client.get(status_url).get_json()
+        while job['active'] and time.time() < deadline:
+            time.sleep(0.05)
+            job = client.get(status_url).get_json()
+
+        assert job['status'] == 'succeeded', job
+        assert job['download_url'] == f'/download-bol/bol_batch.zip?_sid={sid}'
+        assert client.get(job['download_url']).status_code == 200
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_batch_limits_and_name_collisions():
+    session_dir = tempfile.mkdtemp(prefix="test_batch_")
+    try:
+        batch = BatchProcessor(session_dir, 'test', process_document=None, max_files=3, max_unzipped_mb=1)
+        assert batch.add_pdf('bol.pdf', io.BytesIO(b"1")) == 'bol.pdf'
+        assert batch.add_pdf('../bol.pdf', io.BytesIO(b"2")) == 'bol_2.pdf'
+        assert batch.add_zip(io.BytesIO(_zip({'x/bol.pdf': b"3"}))) == ['bol_3.pdf']
+        try:
+            batch.add_pdf('more.pdf', io.BytesIO(b"4"))
+            assert False, "file limit not enforced"
+        except BatchError:
+            pass
+
+        batch = BatchProcessor(session_dir, 'test', process_document=None, max_unzipped_mb=1)
+        for data in (b"not a zip", _zip({'big.pdf': b"0" * (2 * 1024 * 1024)})):
+            try:
+                batch.add_zip(io.BytesIO(data))
+                assert False, "bad zip accepted"
+            except BatchError:
+                pass
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_multipart_batch_builds_one_combined_csv()
+    test_zip_batch_returns_per_document_csvs_and_manifest()
+    test_batch_rejects_bad_input()
+    test_async_zip_batch_job_links_to_the_zip()
+    test_batch_limits_and_name_collisions()
+    print("✅ Batch upload tests passed")
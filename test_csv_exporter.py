@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for building the session's combined CSV: combining per-invoice CSVs, and the
+single-writer export that skips them.
+"""
+
+import io
+import os
+import csv
+import shutil
+import tempfile
+from unittest import mock
+import pandas as pd
+from csv_exporter import CSVExporter
+from data_processor import DataProcessor
+from output_schema import BOL_SCHEMA, RowEmitter
+from bol_parser import TableRow
+from config import OUTPUT_CSV_NAME
+from pdf_fixtures import bol_page_lines
+
+INVOICES = {
+    "A1001": ("45.50", [TableRow("10", "120", "45.5", "ST100"), TableRow("5", "60", "20.0", "ST 200")]),
+    "B2002": ("9.50", [TableRow("1", "12", "1.5", "N/A")]),
+    "C3003": ("14.20", [TableRow("3", "36", "12.0", 'QQ "7"')]),
+}
+
+
+def _write_invoice_csvs(session_dir):
+    formatter = DataProcessor(session_dir=session_dir)
+    for invoice_no, (bol_cube, rows) in INVOICES.items():
+        with open(os.path.join(session_dir, f"{invoice_no}.csv"), 'w', encoding='utf-8', newline='') as f:
+            formatter._format_csv(f, invoice_no, bol_cube, rows, "999", "888")
+
+
+def _read_rows(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_invoice_csv_layout():
+    output = io.StringIO()
+    formatter = DataProcessor.__new__(DataProcessor)
+    formatter.schema = BOL_SCHEMA
+    formatter._format_csv(
+        output, "A1001", "45.50", iter(INVOICES["A1001"][1]), "999", "888")
+    header, first, second = list(csv.reader(io.StringIO(output.getvalue())))
+
+    assert tuple(header) == BOL_SCHEMA.header and len(header) == 28
+    assert (first[13], first[16], first[20], first[22], first[24], first[25]) == \
+        ("10", "45.50", "120", "45.5", "A1001", "ST100")
+    assert (second[13], second[20], second[22], second[25]) == ("5", "60", "20.0", "ST 200")
+    # Totals only on the first row of the invoice
+    assert (first[21], first[23]) == ("999", "888") and (second[21], second[23]) == ("", "")
+    assert not any(first[index] for index in range(28) if index not in (13, 16, 20, 21, 22, 23, 24, 25))
+
+
+def test_same_headers_are_concatenated_as_bytes():
+    session_dir = tempfile.mkdtemp(prefix="test_csv_exporter_")
+    try:
+        _write_invoice_csvs(session_dir)
+        sources = sorted(name for name in os.listdir(session_dir) if name.endswith('.csv'))
+        expected = [_read_rows(os.path.join(session_dir, name)) for name in sources]
+
+        with mock.patch('csv_exporter.pd.read_csv') as read_csv, \
+                mock.patch('csv_exporter.glob.glob', return_value=[os.path.join(session_dir, name) for name in sources]):
+            assert CSVExporter(session_dir).combine_to_csv()
+        read_csv.assert_not_called()
+
+        combined = _read_rows(os.path.join(session_dir, OUTPUT_CSV_NAME))
+        assert combined[0] == expected[0][0] and len(combined[0]) == 28
+        assert combined[1:] == [row for rows in expected for row in rows[1:]]
+        # Values pandas would have read as missing survive the byte copy
+        assert any(row[25] == "N/A" for row in combined)
+        assert os.listdir(session_dir) == [OUTPUT_CSV_NAME]
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_missing_trailing_newline_does_not_join_rows():
+    session_dir = tempfile.mkdtemp(prefix="test_csv_exporter_")
+    try:
+        for name, body in (("a.csv", "X,Y\r\n1,2"), ("b.csv", "X,Y\r\n3,4\r\n")):
+            with open(os.path.join(session_dir, name), 'w', encoding='utf-8', newline='') as f:
+                f.write(body)
+        with mock.patch('csv_exporter.glob.glob',
+                        return_value=[os.path.join(session_dir, name) for name in ("a.csv", "b.csv")]):
+            assert CSVExporter(session_dir).combine_to_csv()
+        assert _read_rows(os.path.join(session_dir, OUTPUT_CSV_NAME)) == [["X", "Y"], ["1", "2"], ["3", "4"]]
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_differing_headers_fall_back_to_pandas():
+    session_dir = tempfile.mkdtemp(prefix="test_csv_exporter_")
+    try:
+        for name, body in (("a.csv", "X,Y\n1,2\n"), ("b.csv", "Y,Z\n3,4\n")):
+            with open(os.path.join(session_dir, name), 'w', encoding='utf-8') as f:
+                f.write(body)
+        assert CSVExporter(session_dir).combine_to_csv()
+
+        combined = pd.read_csv(os.path.join(session_dir, OUTPUT_CSV_NAME), dtype=str).fillna("")
+        assert list(combined.columns) == ["X", "Y", "Z"]
+        assert sorted(combined.values.tolist()) == [["", "3", "4"], ["1", "2", ""]]
+        assert os.listdir(session_dir) == [OUTPUT_CSV_NAME]
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+PAGES = [
+    ("1", "\n".join(bol_page_lines("A1001", [(10, "ST100", 120, "45.5")], totals=False))),
+    ("2", "\n".join(bol_page_lines("B2002", [(1, "XY9", 12, "1.5"), (2, "XY8", 24, "3.0")], bol_cube="9.50"))),
+    ("3", "\n".join(bol_page_lines("A1001", [(2, "ST300", 24, "8.25")], bol_cube="88.10"))),
+]
+
+
+def test_single_writer_matches_the_combined_per_invoice_csvs():
+    per_invoice = DataProcessor(session_dir=tempfile.mkdtemp(prefix="test_csv_exporter_"))
+    single = DataProcessor(session_dir=tempfile.mkdtemp(prefix="test_csv_exporter_"))
+    try:
+        assert per_invoice.process_pages(PAGES)
+        invoice_csvs = sorted(name for name in os.listdir(per_invoice.session_dir) if name.endswith('.csv'))
+        with mock.patch('csv_exporter.glob.glob',
+                        return_value=[os.path.join(per_invoice.session_dir, name) for name in invoice_csvs]):
+            assert CSVExporter(per_invoice.session_dir).combine_to_csv()
+
+        assert single.process_pages(PAGES, combined=True)
+        # One file, written in place of the temp file, and no per-invoice CSVs
+        assert os.listdir(single.session_dir) == [OUTPUT_CSV_NAME]
+        assert _read_rows(os.path.join(single.session_dir, OUTPUT_CSV_NAME)) == \
+            _read_rows(os.path.join(per_invoice.session_dir, OUTPUT_CSV_NAME))
+    finally:
+        shutil.rmtree(per_invoice.session_dir, ignore_errors=True)
+        shutil.rmtree(single.session_dir, ignore_errors=True)
+
+
+def test_single_writer_keeps_the_previous_file_on_failure():
+    processor = DataProcessor(session_dir=tempfile.mkdtemp(prefix="test_csv_exporter_"))
+    output_path = os.path.join(processor.session_dir, OUTPUT_CSV_NAME)
+    try:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write("previous\n")
+        with mock.patch.object(RowEmitter, 'rows', side_effect=OSError("disk full")):
+            processor.process_pages(PAGES, combined=True)
+        with open(output_path, encoding='utf-8') as f:
+            assert f.read() == "previous\n"
+        assert os.listdir(processor.session_dir) == [OUTPUT_CSV_NAME]
+
+        # No invoice at all writes nothing
+        empty = DataProcessor(session_dir=os.path.join(processor.session_dir, "empty"))
+        assert empty.process_pages([("1", "NO BOL HERE")], combined=True)
+        assert os.listdir(empty.session_dir) == []
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_invoice_csv_layout()
+    test_same_headers_are_concatenated_as_bytes()
+    test_missing_trailing_newline_does_not_join_rows()
+    test_differing_headers_fall_back_to_pandas()
+    test_single_writer_matches_the_combined_per_invoice_csvs()
+    test_single_writer_keeps_the_previous_file_on_failure()
+    print("✅ CSV exporter tests passed")
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests for the keyed CSV merge used by /upload-csv.
+The join must update exactly the rows the original iterrows() scan updated.
+"""
+
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from csv_merger import (build_match_key, merge_additional_fields, derive_cube_columns, parse_cancel_dates,
+                        sort_by_cancel_date)
+from bench_csv_merge import (ADDITIONAL_MAPPING, KEY_COLUMNS, legacy_match_key, legacy_merge,
+                             legacy_derive_cube_columns, synthetic_frames, synthetic_key_frame,
+                             synthetic_pdf_rows, legacy_parse_cancel_date, legacy_sort_by_cancel_date,
+                             synthetic_cancel_dates)
+
+
+def _assert_same_as_legacy(existing, incoming, mapping=ADDITIONAL_MAPPING):
+    legacy_df = existing.copy()
+    legacy_merge(legacy_df, incoming, mapping)
+    joined_df = existing.copy()
+    merge_additional_fields(joined_df, incoming, mapping)
+    pd.testing.assert_frame_equal(joined_df, legacy_df)
+
+
+def test_merge_matches_legacy_on_synthetic_frames():
+    for seed in range(5):
+        existing, incoming = synthetic_frames(400, seed=seed)
+        _assert_same_as_legacy(existing, incoming)
+
+
+def test_merge_first_pdf_row_and_last_incoming_row_win():
+    existing = pd.DataFrame({"match_key": ["a", "a", "b", "c"], "Order Date": ["", "", "", "keep"]}, dtype=str)
+    incoming = pd.DataFrame({"match_key": ["a", "b", "a", "z"], "Invoice Date": ["1", np.nan, "3", "4"]}, dtype=str)
+    mapping = {"Invoice Date": "Order Date"}
+    _assert_same_as_legacy(existing, incoming, mapping)
+
+    assert merge_additional_fields(existing, incoming, mapping) == 2
+    assert existing["Order Date"].tolist()[0] == "3"
+    assert existing["Order Date"].tolist()[1] == ""
+    assert pd.isna(existing["Order Date"].tolist()[2])
+    assert existing["Order Date"].tolist()[3] == "keep"
+
+
+def test_merge_without_matches_leaves_frame_untouched():
+    existing, incoming = synthetic_frames(50)
+    incoming["match_key"] = "nothing" + incoming["match_key"]
+    before = existing.copy()
+    assert merge_additional_fields(existing, incoming, ADDITIONAL_MAPPING) == 0
+    pd.testing.assert_frame_equal(existing, before)
+
+
+def test_match_key_matches_legacy():
+    frame = synthetic_key_frame(2000, seed=3)
+    assert build_match_key(frame, KEY_COLUMNS).tolist() == legacy_match_key(frame, KEY_COLUMNS).tolist()
+
+    edge = pd.DataFrame({
+        "Invoice No.": ["  A1,001 ", np.nan, "ÄB1", "", "x\t"],
+        "Style": ["St,1", "ST", "ß", np.nan, "\u00a0y"],
+        "Cartons": ["1,0,0", "", " 2", "3", np.nan],
+        "Individual Pieces": ["1,120", "x", ",", np.nan, "İ"],
+    }, dtype=str)
+    assert build_match_key(edge, KEY_COLUMNS).tolist() == legacy_match_key(edge, KEY_COLUMNS).tolist()
+    assert build_match_key(edge, ["Style"]).tolist() == legacy_match_key(edge, ["Style"]).tolist()
+
+
+def _assert_cubes_match_legacy(frame):
+    legacy_df = frame.copy()
+    legacy_derive_cube_columns(legacy_df)
+    columnar_df = frame.copy()
+    derive_cube_columns(columnar_df)
+    pd.testing.assert_frame_equal(columnar_df, legacy_df)
+    # Written out, the two must be byte-for-byte identical too
+    assert columnar_df.to_csv(index=False) == legacy_df.to_csv(index=False)
+
+
+def test_cube_columns_match_legacy():
+    for seed in range(5):
+        _assert_cubes_match_legacy(synthetic_pdf_rows(500, seed=seed))
+
+    edge = pd.DataFrame({
+        "Invoice No.": ["A1", "A1", np.nan, np.nan, "A2", "A1"],
+        "BOL Cube": ["1e30", "1e30", "inf", "nan", " 160 ", "1_600"],
+        "Ship To Name": ["BURLİNGTON", "x", "burlington", np.nan, "", "Burlington"],
+        "Pallet": ["9", "9", "9", "9", "9", "9"],
+    }, dtype=str)
+    _assert_cubes_match_legacy(edge)
+    _assert_cubes_match_legacy(edge.drop(columns=["Ship To Name"]).assign(**{"Burlington Cube": "x", "Final Cube": "y"}))
+    _assert_cubes_match_legacy(edge.drop(columns=["BOL Cube"]))
+    _assert_cubes_match_legacy(edge.iloc[:0])
+
+
+def test_cancel_dates_match_legacy():
+    values = pd.Series([
+        "3152025", "03152025", " 3152025 ", "12312025", "2202025", "02302025", "13012025", "00012025",
+        "3150001", "1019999", "3 15202", "-152025", "+152025", "٣١٥٢٠٢٥", "3/12025", "1,12025",
+        "315202", "031520255", "", "nan", np.nan,
+    ], dtype=str)
+    parsed = parse_cancel_dates(values)
+    expected = values.apply(legacy_parse_cancel_date)
+    assert parsed.isna().tolist() == expected.isna().tolist()
+    assert parsed.dropna().tolist() == expected.dropna().tolist()
+    assert parsed.isna().sum() > 0
+
+
+def test_cancel_date_sort_matches_legacy():
+    for seed in range(5):
+        frame = synthetic_cancel_dates(500, seed=seed)
+        legacy_df = frame.copy()
+        legacy_sort_by_cancel_date(legacy_df)
+        sorted_df = frame.copy()
+        sort_by_cancel_date(sorted_df)
+        pd.testing.assert_frame_equal(sorted_df, legacy_df)
+
+
+def test_process_csv_file_merges_into_combined_csv():
+    from app import process_csv_file
+    from config import OUTPUT_CSV_NAME
+
+    session_dir = tempfile.mkdtemp(prefix="test_csv_merge_")
+    try:
+        pd.DataFrame({
+            "Order Date": ["", "", ""], "Ship To Name": ["", "", ""], "Purchase Order No.": ["", "", ""],
+            "Start Date": ["", "", ""], "Cancel Date": ["", "", ""], "Cartons": ["10", "5", "1"],
+            "BOL Cube": ["123.45", "123.45", "9.50"], "Individual Pieces": ["1,120", "60", "12"],
+            "Invoice No.": ["A1001", "A1001", "B2002"], "Style": ["ST100", "ST200", "XY9"],
+        }).to_csv(os.path.join(session_dir, OUTPUT_CSV_NAME), index=False)
+        incoming_path = os.path.join(session_dir, "incoming.csv")
+        pd.DataFrame({
+            "Invoice No.": ["a1001", "B2002"], "Style": ["st100", "XY9"], "Cartons*": ["10", "1"],
+            "Pieces*": ["1120", "12"], "Invoice Date": ["1/2/2025", "1/3/2025"],
+            "Ship-to Name": ["BURLINGTON 12", "ROSS 7"], "Order No.": ["PO1", "PO2"],
+            "Delivery Date": ["2/1/2025", "2/2/2025"], "Cancel Date": ["3152025", "02202025"],
+        }).to_csv(incoming_path, index=False)
+
+        success, message = process_csv_file(incoming_path, session_dir)
+        assert success, message
+
+        merged = pd.read_csv(os.path.join(session_dir, OUTPUT_CSV_NAME), dtype=str).fillna("")
+        rows = {row["Style"]: row for _, row in merged.iterrows()}
+        assert rows["ST100"]["Purchase Order No."] == "PO1"
+        assert rows["XY9"]["Ship To Name"] == "ROSS 7"
+        assert rows["ST200"]["Purchase Order No."] == ""
+        assert rows["ST100"]["Pallet"] == "2" and rows["ST100"]["Burlington Cube"] == "186"
+        assert rows["XY9"]["Final Cube"] == "130"
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_merge_matches_legacy_on_synthetic_frames()
+    test_merge_first_pdf_row_and_last_incoming_row_win()
+    test_merge_without_matches_leaves_frame_untouched()
+    test_match_key_matches_legacy()
+    test_cube_columns_match_legacy()
+    test_cancel_dates_match_legacy()
+    test_cancel_date_sort_matches_legacy()
+    test_process_csv_file_merges_into_combined_csv()
+    print("✅ CSV merge tests passed")
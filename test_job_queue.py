@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Tests for queued PDF uploads: 202 + job polling, per-session job isolation and
+/download-bol once the job has finished.
+"""
+
+import io
+import os
+import time
+import shutil
+import tempfile
+import threading
+import multiprocessing
+import uuid
+from job_queue import JobQueue, read_job, is_active, SUCCEEDED, FAILED, QUEUED, OWNER, JOB_FILE
+from job_queue import CLAIM_FILE, CLAIM_STALE_SECONDS
+from pdf_fixtures import build_text_pdf, bol_page_lines
+
+PDF = build_text_pdf([
+    bol_page_lines("A1001", [(10, "ST100", 120, "45.5")]),
+    bol_page_lines("B2002", [(1, "XY9", 12, "1.5")], bol_cube="9.50"),
+])
+
+
+def _wait_for(session_dir, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = read_job(session_dir)
+        if job and not is_active(job):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_queue_runs_one_job_per_session():
+    session_dir = tempfile.mkdtemp(prefix="test_job_queue_")
+    queue = JobQueue(workers=2)
+    release = threading.Event()
+    try:
+        def slow(job):
+            job.stage('pdf')
+            job.page(1, 1)
+            release.wait(10)
+            return {'rows': 1}
+
+        job = queue.submit(session_dir, 'test', slow)
+        assert job is not None
+        assert queue.submit(session_dir, 'test', slow) is None
+        assert is_active(read_job(session_dir))
+
+        release.set()
+        finished = _wait_for(session_dir)
+        assert finished['job_id'] == job.job_id
+        assert finished['status'] == SUCCEEDED and finished['result'] == {'rows': 1}
+        assert finished['pages_done'] == finished['page_count'] == 1
+
+        def broken(job):
+            raise RuntimeError("boom")
+
+        assert queue.submit(session_dir, 'test', broken) is not None
+        failed = _wait_for(session_dir)
+        assert failed['status'] == FAILED and failed['details'] == 'boom'
+    finally:
+        release.set()
+        queue.shutdown()
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def _hold_session(job):
+    time.sleep(3)
+    return {}
+
+
+def _submit_from_process(session_dir, barrier, submitted):
+    """Web worker stand-in: its own JobQueue, submitting as soon as every worker is ready."""
+    queue = JobQueue(workers=1)
+    barrier.wait()
+    submitted.put(queue.submit(session_dir, 'test', _hold_session) is not None)
+    queue.shutdown()
+
+
+def test_one_job_per_session_across_processes():
+    session_dir = tempfile.mkdtemp(prefix="test_job_queue_")
+    context = multiprocessing.get_context('spawn')
+    barrier, submitted = context.Barrier(4), context.Queue()
+    try:
+        workers = [context.Process(target=_submit_from_process, args=(session_dir, barrier, submitted))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        results = [submitted.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join(60)
+        assert sorted(results) == [False, False, False, True]
+        assert not os.path.exists(os.path.join(session_dir, CLAIM_FILE))
+
+        # A claim held by another process turns the submit away; a stale one is taken over
+        claim_path = os.path.join(session_dir, CLAIM_FILE)
+        open(claim_path, 'w').close()
+        queue = JobQueue(workers=1)
+        try:
+            assert queue.submit(session_dir, 'test', lambda job: {}) is None
+            stale = time.time() - CLAIM_STALE_SECONDS - 1
+            os.utime(claim_path, (stale, stale))
+            assert queue.submit(session_dir, 'test', lambda job: {}) is not None
+            assert not os.path.exists(claim_path)
+        finally:
+            queue.shutdown()
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_stale_jobs_are_not_active():
+    job = {'status': 'running', 'updated_at': time.time() - 60}
+    assert is_active(job, stale_seconds=120)
+    assert not is_active(job, stale_seconds=30)
+    assert not is_active({'status': SUCCEEDED, 'updated_at': time.time()})
+
+    # A queued job waits without updates; it lives as long as the process that queued it
+    queued = {'status': QUEUED, 'updated_at': time.time() - 3600, 'owner': OWNER}
+    assert is_active(queued, stale_seconds=30)
+    dead = multiprocessing.get_context('spawn').Process(target=time.sleep, args=(0,))
+    dead.start()
+    dead.join()
+    assert not is_active(dict(queued, owner=f"{OWNER.rpartition(':')[0]}:{dead.pid}"), stale_seconds=30)
+    assert not is_active(dict(queued, owner="other-host:1"), stale_seconds=30)
+
+
+def test_async_upload_reports_progress_and_serves_result():
+    import app as app_module
+    from app import app
+    from result_cache import ResultCache
+
+    # Extract for real: a cached result would skip the page progress checked below
+    previous_cache = app_module.result_cache
+    app_module.result_cache = ResultCache(max_mb=0)
+    client = app.test_client()
+    sid = f"test_jobs_{uuid.uuid4().hex[:8]}"
+    other_sid = f"test_jobs_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    try:
+        response = client.post(f'/upload?_sid={sid}&_async=1', data={'file': (io.BytesIO(PDF), 'bol.pdf')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 202, response.get_json()
+        accepted = response.get_json()
+        assert accepted['status_url'] == f"/jobs/{accepted['job_id']}?_sid={sid}"
+
+        job = _wait_for(session_dir)
+        status = client.get(accepted['status_url']).get_json()
+        assert status['status'] == SUCCEEDED, status
+        assert status['pages_done'] == status['page_count'] == 2
+        assert status['result']['ready_for_csv'] is True
+
+        # The job is invisible from another session
+        assert client.get(f"/jobs/{job['job_id']}?_sid={other_sid}").status_code == 404
+
+        download = client.get(accepted['download_url'])
+        assert download.status_code == 200
+        assert b"A1001" in download.data and b"B2002" in download.data
+    finally:
+        app_module.result_cache = previous_cache
+        shutil.rmtree(session_dir, ignore_errors=True)
+        shutil.rmtree(os.path.join(app.config['UPLOAD_FOLDER'], 'processing_sessions', other_sid), ignore_errors=True)
+
+
+def test_upload_is_rejected_while_a_job_is_running():
+    from app import app
+
+    client = app.test_client()
+    sid = f"test_jobs_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    try:
+        client.get(f'/status?_sid={sid}')
+        from job_queue import Job
+        job = Job(session_dir, sid)
+        job.stage('pdf')
+
+        response = client.post(f'/upload?_sid={sid}', data={'file': (io.BytesIO(PDF), 'bol.pdf')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 409
+        assert response.get_json()['job_id'] == job.job_id
+        assert client.get(f'/download-bol?_sid={sid}').status_code == 202
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_upload_reserves_the_session_before_touching_it():
+    import app as app_module
+    from app import app
+
+    client = app.test_client()
+    sid = f"test_jobs_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    try:
+        client.get(f'/status?_sid={sid}')
+        # Another request has reserved the session and saved its PDF
+        held = app_module.job_queue.reserve(session_dir, sid)
+        with open(os.path.join(session_dir, "theirs.pdf"), 'wb') as f:
+            f.write(PDF)
+        for path, data in ((f'/upload?_sid={sid}', {'file': (io.BytesIO(PDF), 'mine.pdf')}),
+                           (f'/upload-batch?_sid={sid}', {'files': (io.BytesIO(PDF), 'mine.pdf')})):
+            response = client.post(path, data=data, content_type='multipart/form-data')
+            assert response.status_code == 409, response.get_json()
+            assert response.get_json()['job_id'] == held.job_id
+        assert sorted(name for name in os.listdir(session_dir) if not name.startswith('.')) == ["theirs.pdf"]
+
+        # Released, the next upload runs and leaves no reservation behind
+        app_module.job_queue.release(held)
+        response = client.post(f'/upload?_sid={sid}', data={'file': (io.BytesIO(PDF), 'mine.pdf')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_json()
+        assert not os.path.exists(os.path.join(session_dir, JOB_FILE))
+        response = client.post(f'/upload-base64?_sid={sid}', json={'file_data': "not base64!"})
+        assert response.status_code == 400
+        assert not os.path.exists(os.path.join(session_dir, JOB_FILE))
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_queue_runs_one_job_per_session()
+    test_one_job_per_session_across_processes()
+    test_stale_jobs_are_not_active()
+    test_async_upload_reports_progress_and_serves_result()
+    test_upload_is_rejected_while_a_job_is_running()
+    test_upload_reserves_the_session_before_touching_it()
+    print("✅ Job queue tests passed")
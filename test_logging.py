@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for leveled parser logging: no per-row records at INFO, full detail when a
+session asks for DEBUG.
+"""
+
+import logging
+import shutil
+import uuid
+from data_processor import DataProcessor
+from pdf_fixtures import bol_page_lines
+
+PAGE = "\n".join(bol_page_lines("A1001", [(10, "ST100", 120, "45.5"), (5, "ST200", 60, "20.0")]))
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _run_page(debug):
+    """Process one page and return the messages logged by data_processor."""
+    logger = logging.getLogger('data_processor')
+    handler = _ListHandler()
+    previous_level = logger.level
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    processor = DataProcessor(session_id=f"test_logging_{uuid.uuid4().hex[:8]}", debug=debug)
+    try:
+        assert processor.process_pages([(1, PAGE)])
+        return [record.getMessage() for record in handler.records]
+    finally:
+        logger.removeHandler(handler)
+        logger.setLevel(previous_level)
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_info_level_skips_row_messages():
+    messages = _run_page(debug=False)
+    assert messages
+    assert not any("Added row" in message for message in messages)
+
+
+def test_session_debug_logs_rows_with_session_prefix():
+    messages = _run_page(debug=True)
+    rows = [message for message in messages if "Added row" in message]
+    assert len(rows) == 2
+    assert all(message.startswith("[test_logging_") for message in rows)
+
+
+if __name__ == "__main__":
+    test_info_level_skips_row_messages()
+    test_session_debug_logs_rows_with_session_prefix()
+    print("✅ Logging tests passed")
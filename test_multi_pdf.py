@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Tests for processing every PDF of a session in one pass (PDFProcessor.iter_session_pages).
+"""
+
+import os
+import base64
+import shutil
+import tempfile
+import uuid
+from unittest import mock
+import pdf_processor
+from pdf_processor import PDFProcessor, shutdown_extraction_pools
+from result_cache import ResultCache
+from data_processor import DataProcessor
+from pdf_fixtures import build_text_pdf, write_text_pdf, bol_page_lines
+
+DOCUMENTS = {
+    "a_first.pdf": [
+        bol_page_lines("A1001", [(10, "ST100", 120, "45.5"), (5, "ST200", 60, "20.0")], totals=False),
+        bol_page_lines("A1001", [(2, "ST300", 24, "8.25")], bol_cube="88.10"),
+    ],
+    "b_second.pdf": [
+        bol_page_lines("B2002", [(1, "XY9", 12, "1,200.5")], bol_cube="9.50"),
+    ],
+    "c_third.pdf": [
+        bol_page_lines("C3003", [(3, "QQ7", 36, "12.0")], bol_cube="14.20"),
+        bol_page_lines("C3003", [(4, "QQ8", 48, "16.0")], bol_cube="14.20"),
+    ],
+}
+
+
+def _new_processor():
+    return DataProcessor(session_id=f"test_multi_{uuid.uuid4().hex[:8]}")
+
+
+def _write_documents(session_dir, documents=DOCUMENTS):
+    for name, pages in documents.items():
+        write_text_pdf(os.path.join(session_dir, name), pages)
+
+
+def _read_csvs(session_dir):
+    outputs = {}
+    for name in sorted(os.listdir(session_dir)):
+        if name.endswith('.csv'):
+            with open(os.path.join(session_dir, name), encoding='utf-8') as f:
+                outputs[name] = f.read()
+    return outputs
+
+
+def test_all_pdfs_feed_one_pass():
+    """Every PDF is read, in name order, and gives the CSVs of its pages fed as TXT files."""
+    session_processor = _new_processor()
+    file_processor = _new_processor()
+    try:
+        _write_documents(session_processor.session_dir)
+        pdf_processor = PDFProcessor(session_processor.session_dir, persist_text=False, text_cache=False)
+        page_ids = []
+
+        def pages():
+            for page_id, text in pdf_processor.iter_session_pages():
+                page_ids.append(page_id)
+                yield page_id, text
+
+        assert session_processor.process_pages(pages())
+        assert pdf_processor.extraction_error is None
+        assert pdf_processor.page_count == 5
+        assert page_ids == ["a_first_1", "a_first_2", "b_second_1", "c_third_1", "c_third_2"]
+        # Every PDF is removed once read
+        assert not [name for name in os.listdir(session_processor.session_dir) if name.endswith('.pdf')]
+
+        number = 0
+        for pages_lines in DOCUMENTS.values():
+            for lines in pages_lines:
+                number += 1
+                with open(os.path.join(file_processor.session_dir, f"{number}.txt"), 'w', encoding='utf-8') as f:
+                    f.write("\n".join(lines))
+        assert file_processor.process_all_files()
+
+        outputs = _read_csvs(session_processor.session_dir)
+        assert sorted(outputs) == ["A1001.csv", "B2002.csv", "C3003.csv"]
+        assert outputs == _read_csvs(file_processor.session_dir)
+    finally:
+        shutil.rmtree(session_processor.session_dir, ignore_errors=True)
+        shutil.rmtree(file_processor.session_dir, ignore_errors=True)
+
+
+def test_persisted_page_text_is_namespaced():
+    """Page 1 of each document gets its own TXT file."""
+    processor = _new_processor()
+    try:
+        _write_documents(processor.session_dir)
+        pdf_processor = PDFProcessor(processor.session_dir, persist_text=True, text_cache=False)
+        list(pdf_processor.iter_session_pages())
+
+        txt_files = sorted(name for name in os.listdir(processor.session_dir) if name.endswith('.txt'))
+        assert txt_files == ["a_first_1.txt", "a_first_2.txt", "b_second_1.txt", "c_third_1.txt", "c_third_2.txt"]
+        with open(os.path.join(processor.session_dir, "b_second_1.txt"), encoding='utf-8') as f:
+            assert "B2002" in f.read()
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_parallel_documents_match_serial():
+    """Documents extracted concurrently on the pool come back in the serial order."""
+    serial_dir = _new_processor().session_dir
+    parallel_dir = _new_processor().session_dir
+    try:
+        _write_documents(serial_dir)
+        _write_documents(parallel_dir)
+
+        serial = list(PDFProcessor(serial_dir, workers=1, text_cache=False).iter_session_pages())
+        parallel_processor = PDFProcessor(parallel_dir, workers=2, text_cache=False)
+        parallel_processor.pages_per_task = 1
+        parallel = list(parallel_processor.iter_session_pages())
+
+        assert parallel == serial
+        assert not [name for name in os.listdir(parallel_dir) if name.endswith('.pdf')]
+    finally:
+        shutdown_extraction_pools()
+        shutil.rmtree(serial_dir, ignore_errors=True)
+        shutil.rmtree(parallel_dir, ignore_errors=True)
+
+
+def test_unreadable_pdf_is_skipped():
+    """A broken PDF is reported per document without failing the others, and removed."""
+    processor = _new_processor()
+    broken_path = os.path.join(processor.session_dir, "b_broken.pdf")
+    try:
+        _write_documents(processor.session_dir, {"a_good.pdf": DOCUMENTS["b_second.pdf"]})
+        with open(broken_path, 'wb') as f:
+            f.write(b"not a pdf")
+
+        pdf_processor = PDFProcessor(processor.session_dir, persist_text=False, text_cache=False)
+        pages = list(pdf_processor.iter_session_pages())
+
+        assert [page_id for page_id, _ in pages] == ["a_good_1"]
+        assert pdf_processor.extraction_error is None
+        assert list(pdf_processor.document_errors) == ["b_broken.pdf"]
+        assert os.listdir(processor.session_dir) == []
+
+        # With nothing readable the whole extraction fails
+        with open(broken_path, 'wb') as f:
+            f.write(b"not a pdf")
+        only_broken = PDFProcessor(processor.session_dir, persist_text=False, text_cache=False)
+        assert list(only_broken.iter_session_pages()) == []
+        assert only_broken.extraction_error and "b_broken.pdf" in only_broken.extraction_error
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_document_failing_part_way_is_reported_with_its_kept_pages():
+    processor = _new_processor()
+    real_pages = PDFProcessor._iter_open_pdf_pages
+
+    def fail_after_first_page(self, pdf):
+        for number, page in enumerate(real_pages(self, pdf)):
+            if number and pdf.stream.name.endswith("c_third.pdf"):
+                raise RuntimeError("truncated stream")
+            yield page
+
+    try:
+        _write_documents(processor.session_dir)
+        extractor = PDFProcessor(processor.session_dir, workers=1, persist_text=False, text_cache=False)
+        with mock.patch.object(PDFProcessor, '_iter_open_pdf_pages', fail_after_first_page):
+            page_ids = [page_id for page_id, _ in extractor.iter_session_pages()]
+
+        assert page_ids == ["a_first_1", "a_first_2", "b_second_1", "c_third_1"]
+        assert list(extractor.document_errors) == ["c_third.pdf"]
+        assert "after 1 pages" in extractor.document_errors["c_third.pdf"]
+        assert os.listdir(processor.session_dir) == []
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def _fail_second_document(task):
+    """Extraction worker stand-in whose tasks for b_second.pdf raise."""
+    if os.path.basename(task[0]) == "b_second.pdf":
+        raise RuntimeError("worker failed")
+    return pdf_processor._extract_page_range(task)
+
+
+def test_parallel_failure_only_fails_its_document():
+    processor = _new_processor()
+    documents = dict(DOCUMENTS, **{"b_second.pdf": DOCUMENTS["a_first.pdf"]})
+    try:
+        _write_documents(processor.session_dir, documents)
+        extractor = PDFProcessor(processor.session_dir, workers=2, persist_text=False, text_cache=False)
+        extractor.pages_per_task = 1
+        with mock.patch('pdf_processor._extract_page_range', _fail_second_document):
+            page_ids = [page_id for page_id, _ in extractor.iter_session_pages()]
+
+        # b_second has two tasks; both are drained, so c_third starts at its own first page
+        assert page_ids == ["a_first_1", "a_first_2", "c_third_1", "c_third_2"]
+        assert extractor.document_errors == {"b_second.pdf": "worker failed"}
+        assert extractor.extraction_error is None
+        assert os.listdir(processor.session_dir) == []
+    finally:
+        shutdown_extraction_pools()
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_upload_with_a_failed_document_reports_it_and_is_not_cached():
+    import app as app_module
+
+    processor = _new_processor()
+    cache_dir = tempfile.mkdtemp(prefix="test_multi_cache_")
+    previous_cache = app_module.result_cache
+    app_module.result_cache = ResultCache(cache_dir=cache_dir, max_mb=16)
+    try:
+        _write_documents(processor.session_dir, {"a_good.pdf": DOCUMENTS["b_second.pdf"]})
+        with open(os.path.join(processor.session_dir, "b_broken.pdf"), 'wb') as f:
+            f.write(b"not a pdf")
+
+        result = {}
+        assert app_module.process_pdf(processor, result=result) == (True, None)
+        assert list(result['document_errors']) == ["b_broken.pdf"]
+        assert app_module.result_cache.stats()['entries'] == 0
+        # Neither PDF is left behind for the next upload to the session
+        assert sorted(os.listdir(processor.session_dir)) == ["combined_data.csv"]
+    finally:
+        app_module.result_cache = previous_cache
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def test_upload_without_invoices_does_not_serve_the_previous_csv():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    sid = f"test_multi_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app_module.app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    cache_dir = tempfile.mkdtemp(prefix="test_multi_cache_")
+    previous_cache = app_module.result_cache
+    app_module.result_cache = ResultCache(cache_dir=cache_dir, max_mb=16)
+    uploads = [build_text_pdf(DOCUMENTS["a_first.pdf"]), build_text_pdf([["NOTICE TO CUSTOMERS", "NO BOL HERE"]])]
+    try:
+        for single_writer in (True, False):
+            with mock.patch('app.SINGLE_WRITER_EXPORT', single_writer):
+                # The second time round the first upload is served from the cache
+                for pdf, status in zip(uploads, (200, 500)):
+                    response = client.post(f'/upload-base64?_sid={sid}',
+                                           json={'file_data': base64.b64encode(pdf).decode('ascii')})
+                    assert response.status_code == status, (single_writer, response.get_json())
+                assert response.get_json()['error'] == 'CSV creation failed'
+                assert b"A1001" not in client.get(f'/download-bol?_sid={sid}').data
+        assert app_module.result_cache.stats()['entries'] == 1
+    finally:
+        app_module.result_cache = previous_cache
+        shutil.rmtree(session_dir, ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_all_pdfs_feed_one_pass()
+    test_persisted_page_text_is_namespaced()
+    test_parallel_documents_match_serial()
+    test_unreadable_pdf_is_skipped()
+    test_document_failing_part_way_is_reported_with_its_kept_pages()
+    test_parallel_failure_only_fails_its_document()
+    test_upload_with_a_failed_document_reports_it_and_is_not_cached()
+    test_upload_without_invoices_does_not_serve_the_previous_csv()
+    print("✅ Multi-PDF session tests passed")
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for the OCR fallback on pages without a text layer.
+Tesseract and Poppler are mocked, so these run without either installed.
+"""
+
+import io
+import os
+import time
+import shutil
+import uuid
+from unittest import mock
+import ocr
+from ocr import PageOCR, OcrResult
+from pdf_processor import PDFProcessor, shutdown_extraction_pools
+from data_processor import DataProcessor
+from pdf_fixtures import build_text_pdf, write_text_pdf, bol_page_lines
+
+SCANNED_PAGE = bol_page_lines("S5005", [(7, "SC100", 84, "30.0")], bol_cube="21.00")
+
+# Page 2 has no text layer, as if it were a scan
+PAGES = [
+    bol_page_lines("A1001", [(10, "ST100", 120, "45.5")]),
+    [],
+    bol_page_lines("B2002", [(1, "XY9", 12, "1.5")], bol_cube="9.50"),
+]
+
+
+class _FakeOCR:
+    """Stands in for PageOCR: 'recognises' SCANNED_PAGE on every page it is given."""
+
+    def __init__(self):
+        self.calls = []
+
+    def ocr_pages(self, pdf_path, page_numbers):
+        page_numbers = list(page_numbers)
+        self.calls.append((os.path.basename(pdf_path), page_numbers))
+        for page_number in page_numbers:
+            yield OcrResult(page_number, "\n".join(SCANNED_PAGE), 0.25, None)
+
+
+def _new_processor():
+    return DataProcessor(session_id=f"test_ocr_{uuid.uuid4().hex[:8]}")
+
+
+def test_empty_pages_are_ocrd_and_parsed_in_order():
+    processor = _new_processor()
+    try:
+        write_text_pdf(os.path.join(processor.session_dir, "scan.pdf"), PAGES)
+        fake_ocr = _FakeOCR()
+        pdf_processor = PDFProcessor(processor.session_dir, persist_text=False, text_cache=False, ocr=fake_ocr)
+
+        pages = list(pdf_processor.iter_session_pages())
+        assert [page_id for page_id, _ in pages] == ["scan_1", "scan_2", "scan_3"]
+        assert "S5005" in pages[1][1]
+        assert fake_ocr.calls == [("scan.pdf", [2])]
+        assert pdf_processor.ocr_stats['pages'] == pdf_processor.ocr_stats['recovered'] == 1
+        assert pdf_processor.ocr_stats['page_seconds'] == 0.25
+
+        assert processor.process_pages(pages)
+        assert os.path.exists(os.path.join(processor.session_dir, "S5005.csv"))
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_parallel_extraction_ocrs_per_document():
+    processor = _new_processor()
+    try:
+        write_text_pdf(os.path.join(processor.session_dir, "a.pdf"), PAGES)
+        write_text_pdf(os.path.join(processor.session_dir, "b.pdf"), PAGES[:1])
+        fake_ocr = _FakeOCR()
+        pdf_processor = PDFProcessor(processor.session_dir, workers=2, text_cache=False, ocr=fake_ocr)
+        pdf_processor.pages_per_task = 1
+
+        pages = list(pdf_processor.iter_session_pages())
+        assert [page_id for page_id, _ in pages] == ["a_1", "a_2", "a_3", "b_1"]
+        assert "S5005" in pages[1][1]
+        assert fake_ocr.calls == [("a.pdf", [2])]
+    finally:
+        shutdown_extraction_pools()
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_without_ocr_the_placeholder_is_kept():
+    processor = _new_processor()
+    try:
+        write_text_pdf(os.path.join(processor.session_dir, "scan.pdf"), PAGES)
+        pdf_processor = PDFProcessor(processor.session_dir, text_cache=False, ocr=False)
+        pages = list(pdf_processor.iter_session_pages())
+        assert pages[1][1] == "[Page 2 - No text content found]"
+        assert pdf_processor.ocr_stats['pages'] == 0
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_failed_ocr_is_counted_and_not_cached():
+    import app as app_module
+    from result_cache import ResultCache
+
+    class _FailingOCR(_FakeOCR):
+        def ocr_pages(self, pdf_path, page_numbers):
+            for page_number in page_numbers:
+                yield OcrResult(page_number, "", 60.0, "Tesseract process timeout")
+
+    processor = _new_processor()
+    cache_dir = os.path.join(processor.session_dir, "cache")
+    previous_cache = app_module.result_cache
+    app_module.result_cache = ResultCache(cache_dir=cache_dir, max_mb=16)
+    created = []
+
+    def processor_with_ocr(*args, **kwargs):
+        created.append(PDFProcessor(*args, ocr=_FailingOCR(), **kwargs))
+        return created[-1]
+
+    try:
+        write_text_pdf(os.path.join(processor.session_dir, "scan.pdf"), PAGES)
+        result = {}
+        with mock.patch('app.PDFProcessor', processor_with_ocr):
+            assert app_module.process_pdf(processor, result=result) == (True, None)
+        assert created[0].ocr_stats['failed'] == 1 and created[0].ocr_stats['recovered'] == 0
+        assert result['ocr'] == {'pages': 1, 'recovered': 0, 'failed': 1, 'seconds': result['ocr']['seconds'],
+                                 'page_seconds': 60.0}
+        assert app_module.result_cache.stats()['entries'] == 0
+    finally:
+        app_module.result_cache = previous_cache
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_ocr_stats_are_reported_with_the_job():
+    import app as app_module
+    from result_cache import ResultCache
+
+    client = app_module.app.test_client()
+    sid = f"test_ocr_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app_module.app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    previous_cache = app_module.result_cache
+    app_module.result_cache = ResultCache(max_mb=0)
+    try:
+        with mock.patch('app.PDFProcessor', lambda *args, **kwargs: PDFProcessor(*args, ocr=_FakeOCR(), **kwargs)):
+            response = client.post(f'/upload?_sid={sid}&_async=1', content_type='multipart/form-data',
+                                   data={'file': (io.BytesIO(build_text_pdf(PAGES)), 'scan.pdf')})
+            assert response.status_code == 202, response.get_json()
+            deadline = time.time() + 30
+            while True:
+                status = client.get(response.get_json()['status_url']).get_json()
+                if not status['active'] or time.time() > deadline:
+                    break
+                time.sleep(0.05)
+        assert status['status'] == 'succeeded', status
+        assert status['ocr'] == status['result']['ocr']
+        assert (status['ocr']['pages'], status['ocr']['recovered'], status['ocr']['page_seconds']) == (1, 1, 0.25)
+    finally:
+        app_module.result_cache = previous_cache
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_page_ocr_renders_and_recognises_each_page():
+    image = mock.Mock()
+    fake_tesseract = mock.Mock()
+    fake_tesseract.image_to_string.side_effect = lambda image, lang, config, timeout: f"text ({lang}, {config})"
+    with mock.patch('ocr.pdf2image.convert_from_path', return_value=[image]) as render, \
+            mock.patch('ocr.pytesseract', fake_tesseract):
+        results = list(PageOCR(dpi=200, threads=2, lang="eng", tesseract_config="--psm 6").ocr_pages("doc.pdf", [3, 1]))
+
+    assert [result.page_number for result in results] == [3, 1]
+    assert all(result.text == "text (eng, --psm 6)" and result.error is None for result in results)
+    assert sorted(call.kwargs['first_page'] for call in render.call_args_list) == [1, 3]
+    assert all(call.kwargs['dpi'] == 200 for call in render.call_args_list)
+    assert image.close.call_count == 2
+
+    # A failing page yields empty text and the error instead of raising
+    with mock.patch('ocr.pdf2image.convert_from_path', side_effect=RuntimeError("no poppler")):
+        result = PageOCR().ocr_page("doc.pdf", 1)
+    assert result.text == "" and result.error == "no poppler"
+
+
+def test_status_reports_missing_engine():
+    with mock.patch('ocr.pytesseract', None), mock.patch('ocr.OCR_ENABLED', True):
+        status = ocr.get_ocr_status(refresh=True)
+    assert status['available'] is False
+    assert "pytesseract" in status['error']
+    ocr.get_ocr_status(refresh=True)
+
+
+if __name__ == "__main__":
+    test_empty_pages_are_ocrd_and_parsed_in_order()
+    test_parallel_extraction_ocrs_per_document()
+    test_without_ocr_the_placeholder_is_kept()
+    test_failed_ocr_is_counted_and_not_cached()
+    test_ocr_stats_are_reported_with_the_job()
+    test_page_ocr_renders_and_recognises_each_page()
+    test_status_reports_missing_engine()
+    print("✅ OCR fallback tests passed")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests for the declarative output schema shared by the CSV writer and the merge.
+"""
+
+import io
+import os
+import csv
+import json
+import shutil
+import tempfile
+from unittest import mock
+import pandas as pd
+import output_schema
+from output_schema import OutputSchema, Column, RowEmitter, BOL_SCHEMA, get_output_schema
+from bol_parser import TableRow
+from data_processor import DataProcessor
+from config import OUTPUT_CSV_NAME
+from pdf_fixtures import bol_page_lines
+
+# The header _format_csv and _format_data wrote before the schema
+LEGACY_HEADER = [
+    "RTS ID", "RTS Status", "Load #", "Wave #", "Routed Date", "Ready Date", "Date of Pickup",
+    "Time of Pickup", "Outbound BOL", "Order Date", "Customer", "Ship To Name", "Purchase Order No.",
+    "Cartons", "Start Date", "Cancel Date", "BOL Cube", "Final Cube", "Burlington Cube", "Pallet",
+    "Individual Pieces", "Total Pieces", "Individual Weight", "Total Weight", "Invoice No.", "Style",
+    "Release", "Assigned Trucking Co.",
+]
+
+# A customer layout: fewer columns, in another order, plus columns of its own
+CUSTOMER_COLUMNS = [
+    {"name": "PO", "incoming": ["Order No."]},
+    {"name": "Invoice", "source": "invoice_no", "match": True},
+    {"name": "Style", "source": "style", "match": True},
+    {"name": "Cartons", "source": "cartons", "match": True, "incoming": ["Cartons*"]},
+    {"name": "Pieces", "source": "pieces", "match": True, "incoming": ["Pieces*"]},
+    {"name": "Cube", "source": "bol_cube"},
+    {"name": "Store", "incoming": ["Ship-to Name"], "role": "ship_to"},
+    {"name": "Pallets", "derived": "pallet"},
+    {"name": "Final Cube", "derived": "final_cube"},
+    {"name": "Total Pieces", "source": "total_pieces", "first_row_only": True},
+    {"name": "Dept", "incoming": ["Department"]},
+    {"name": "Carrier", "default": "UPS"},
+]
+
+PAGES = [
+    ("1", "\n".join(bol_page_lines("A1001", [(10, "ST100", 120, "45.5"), (5, "ST200", 60, "20.0")],
+                                   bol_cube="123.45"))),
+    ("2", "\n".join(bol_page_lines("B2002", [(1, "XY9", 12, "1.5")], bol_cube="9.50"))),
+]
+
+
+def test_bol_schema_keeps_the_legacy_layout():
+    assert list(BOL_SCHEMA.header) == LEGACY_HEADER
+    assert BOL_SCHEMA.match_columns == ["Cartons", "Individual Pieces", "Invoice No.", "Style"]
+    assert BOL_SCHEMA.incoming_renames == {"Cartons*": "Cartons", "Pieces*": "Individual Pieces"}
+    assert BOL_SCHEMA.incoming_mapping == {
+        "Invoice Date": "Order Date", "Ship-to Name": "Ship To Name", "Order No.": "Purchase Order No.",
+        "Delivery Date": "Start Date", "Cancel Date": "Cancel Date",
+    }
+    assert [BOL_SCHEMA.name_for(field) for field in ('ship_to', 'cancel_date', 'pallet', 'weight')] == \
+        ["Ship To Name", "Cancel Date", "Pallet", "Individual Weight"]
+
+    # The legacy text formatter repeats the summary totals on every row
+    content = "\n".join(bol_page_lines("A1001", [(10, "ST100", "1,120", "45.5"), (5, "ST200", 60, "20.0")]))
+    formatter = DataProcessor.__new__(DataProcessor)
+    formatter.schema = BOL_SCHEMA
+    header, *rows = list(csv.reader(io.StringIO(formatter._format_data(content))))
+    assert header == LEGACY_HEADER
+    assert [(row[13], row[20], row[22], row[24], row[25]) for row in rows] == \
+        [("10", "1120", "45.5", "A1001", "ST100"), ("5", "60", "20.0", "A1001", "ST200")]
+    assert rows[0][21] == rows[1][21] != "" and rows[0][23] == rows[1][23] != ""
+
+
+def test_emitter_fills_sources_defaults_and_first_row_totals():
+    schema = OutputSchema(CUSTOMER_COLUMNS)
+    invoice = {'invoice_no': "A1001", 'bol_cube': "45.50", 'total_pieces': "180", 'total_weight': "65"}
+    rows = [TableRow("10", "120", "45.5", "ST100"), TableRow("5", "60", "20.0", "ST200")]
+
+    assert list(schema.emitter.rows(invoice, iter(rows))) == [
+        ("", "A1001", "ST100", "10", "120", "45.50", "", "", "", "180", "", "UPS"),
+        ("", "A1001", "ST200", "5", "60", "45.50", "", "", "", "", "", "UPS"),
+    ]
+    assert [row[9] for row in schema.emitter.rows(invoice, rows, first_row_only=False)] == ["180", "180"]
+    assert list(schema.emitter.rows(invoice, [])) == []
+
+    single = RowEmitter([Column("Style", source='style')])
+    assert list(single.rows(invoice, rows)) == [("ST100",), ("ST200",)]
+
+
+def test_invalid_schemas_are_rejected():
+    valid = [Column("Invoice", source='invoice_no', match=True), Column("Store", role='ship_to')]
+    assert OutputSchema(valid).header == ("Invoice", "Store")
+    for columns in ([], valid + [Column("A"), Column("A")], valid + [Column("A", source='colour')],
+                    valid + [Column("A", derived='volume')],
+                    # process_csv_file merges on the invoice, ship-to and match columns
+                    valid[:1], valid[1:] + [Column("Style", source='style', match=True)],
+                    [valid[0]._replace(match=False), valid[1]],
+                    [column for column in CUSTOMER_COLUMNS if column.get('role') != 'ship_to']):
+        try:
+            OutputSchema(columns)
+        except ValueError:
+            continue
+        raise AssertionError(f"{columns} accepted")
+
+    # So a schema file lacking them falls back to the BOL layout instead of failing the merge
+    work_dir = tempfile.mkdtemp(prefix="test_output_schema_")
+    schema_path = os.path.join(work_dir, "schema.json")
+    try:
+        with open(schema_path, 'w', encoding='utf-8') as f:
+            json.dump([column for column in CUSTOMER_COLUMNS if column.get('source') != 'invoice_no'], f)
+        with mock.patch('output_schema.OUTPUT_SCHEMA_PATH', schema_path):
+            assert get_output_schema(refresh=True) is BOL_SCHEMA
+    finally:
+        output_schema._output_schema = None
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_fingerprint_follows_the_column_definitions():
+    schema = OutputSchema(CUSTOMER_COLUMNS)
+    assert schema.fingerprint == OutputSchema(CUSTOMER_COLUMNS).fingerprint != BOL_SCHEMA.fingerprint
+    changed = [dict(CUSTOMER_COLUMNS[0], name="PO #")] + CUSTOMER_COLUMNS[1:]
+    assert OutputSchema(changed).fingerprint != schema.fingerprint
+    changed = CUSTOMER_COLUMNS[:-1] + [dict(CUSTOMER_COLUMNS[-1], default="FedEx")]
+    assert OutputSchema(changed).fingerprint != schema.fingerprint
+
+
+def test_customer_schema_is_written_and_merged():
+    work_dir = tempfile.mkdtemp(prefix="test_output_schema_")
+    schema_path = os.path.join(work_dir, "schema.json")
+    with open(schema_path, 'w', encoding='utf-8') as f:
+        json.dump(CUSTOMER_COLUMNS, f)
+    session_dir = os.path.join(work_dir, "session")
+    try:
+        with mock.patch('output_schema.OUTPUT_SCHEMA_PATH', schema_path):
+            schema = get_output_schema(refresh=True)
+            assert get_output_schema() is schema
+            assert schema.header[-2:] == ("Dept", "Carrier")
+
+            processor = DataProcessor(session_dir=session_dir)
+            assert processor.schema is schema
+            assert processor.process_pages(PAGES, combined=True)
+            output_path = os.path.join(session_dir, OUTPUT_CSV_NAME)
+            written = pd.read_csv(output_path, dtype=str).fillna("")
+            assert tuple(written.columns) == schema.header
+            assert written["Style"].tolist() == ["ST100", "ST200", "XY9"]
+            assert written["Carrier"].tolist() == ["UPS"] * 3
+
+            from app import process_csv_file
+            incoming_path = os.path.join(work_dir, "incoming.csv")
+            pd.DataFrame({
+                "Invoice": ["A1001", "B2002"], "Style": ["ST100", "XY9"], "Cartons*": ["10", "1"],
+                "Pieces*": ["120", "12"], "Ship-to Name": ["BURLINGTON 12", "ROSS 7"],
+                "Order No.": ["PO1", "PO2"], "Department": ["D4", "D9"],
+            }).to_csv(incoming_path, index=False)
+            success, message = process_csv_file(incoming_path, session_dir)
+            assert success, message
+
+        merged = pd.read_csv(output_path, dtype=str).fillna("")
+        rows = {row["Style"]: row for _, row in merged.iterrows()}
+        assert tuple(merged.columns) == schema.header
+        assert (rows["ST100"]["PO"], rows["ST100"]["Dept"]) == ("PO1", "D4")
+        assert (rows["XY9"]["Store"], rows["XY9"]["Dept"]) == ("ROSS 7", "D9")
+        assert rows["ST200"]["Dept"] == ""
+        assert rows["ST100"]["Pallets"] == "2" and rows["XY9"]["Final Cube"] == "130"
+    finally:
+        get_output_schema(refresh=True)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_unreadable_schema_falls_back_to_the_bol_layout():
+    try:
+        with mock.patch('output_schema.OUTPUT_SCHEMA_PATH', os.path.join(tempfile.gettempdir(), "missing.json")):
+            assert get_output_schema(refresh=True) is BOL_SCHEMA
+    finally:
+        output_schema._output_schema = None
+
+
+if __name__ == "__main__":
+    test_bol_schema_keeps_the_legacy_layout()
+    test_emitter_fills_sources_defaults_and_first_row_totals()
+    test_invalid_schemas_are_rejected()
+    test_fingerprint_follows_the_column_definitions()
+    test_customer_schema_is_written_and_merged()
+    test_unreadable_schema_falls_back_to_the_bol_layout()
+    print("✅ Output schema tests passed")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-page text cache: unchanged pages of a re-issued PDF are served
+from the cache and only changed pages are extracted.
+"""
+
+import os
+import time
+import tempfile
+import pdfplumber
+from page_cache import PageTextCache, page_fingerprint
+from pdf_processor import PDFProcessor
+from pdf_fixtures import write_text_pdf, bol_page_lines
+
+
+def _pages(page_count, changed_page=None):
+    pages = []
+    for page in range(1, page_count + 1):
+        cartons = 99 if page == changed_page else page
+        pages.append(bol_page_lines(f"A{1000 + page}", [(cartons, f"ST{page:03d}", page * 12, "1.5")]))
+    return pages
+
+
+def _extract(pdf_path, text_cache, workers=1):
+    processor = PDFProcessor(os.path.dirname(pdf_path), workers=workers, text_cache=text_cache)
+    processor.pages_per_task = 2
+    return list(processor.iter_pages(pdf_path))
+
+
+def test_fingerprint_follows_page_content():
+    with tempfile.TemporaryDirectory() as work_dir:
+        first = write_text_pdf(os.path.join(work_dir, "first.pdf"), _pages(3))
+        reissue = write_text_pdf(os.path.join(work_dir, "reissue.pdf"), _pages(3, changed_page=2))
+        with pdfplumber.open(first) as a, pdfplumber.open(reissue) as b:
+            fingerprints_a = [page_fingerprint(page) for page in a.pages]
+            fingerprints_b = [page_fingerprint(page) for page in b.pages]
+        assert None not in fingerprints_a and len(set(fingerprints_a)) == 3
+        assert fingerprints_a[0] == fingerprints_b[0] and fingerprints_a[2] == fingerprints_b[2]
+        assert fingerprints_a[1] != fingerprints_b[1]
+
+
+def test_reissued_pdf_only_extracts_changed_pages():
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = PageTextCache(os.path.join(work_dir, "pages.sqlite3"), max_pages=100)
+        first = write_text_pdf(os.path.join(work_dir, "first.pdf"), _pages(6))
+        reissue = write_text_pdf(os.path.join(work_dir, "reissue.pdf"), _pages(6, changed_page=4))
+
+        assert _extract(first, cache) == _extract(first, False)
+        assert (cache.hits, cache.misses) == (0, 6)
+
+        assert _extract(reissue, cache) == _extract(reissue, False)
+        assert (cache.hits, cache.misses) == (5, 7)
+        cache.close()
+
+
+def test_parallel_workers_share_the_cache_file():
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache_path = os.path.join(work_dir, "pages.sqlite3")
+        pdf_path = write_text_pdf(os.path.join(work_dir, "multi.pdf"), _pages(7))
+        expected = _extract(pdf_path, False)
+
+        assert _extract(pdf_path, PageTextCache(cache_path), workers=2) == expected
+        # Workers filled the file, so a fresh serial reader only hits
+        reader = PageTextCache(cache_path)
+        assert _extract(pdf_path, reader) == expected
+        assert (reader.hits, reader.misses) == (7, 0)
+        reader.close()
+
+
+def test_prune_keeps_most_recently_used_pages():
+    with tempfile.TemporaryDirectory() as work_dir:
+        cache = PageTextCache(os.path.join(work_dir, "pages.sqlite3"), max_pages=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, key.upper())
+            time.sleep(0.01)
+        assert cache.get("a") == "A"
+        cache.prune()
+        assert cache.get("b") is None
+        assert cache.get("a") == "A" and cache.get("c") == "C"
+        cache.close()
+
+
+if __name__ == "__main__":
+    test_fingerprint_follows_page_content()
+    test_reissued_pdf_only_extracts_changed_pages()
+    test_parallel_workers_share_the_cache_file()
+    test_prune_keeps_most_recently_used_pages()
+    print("✅ Page cache tests passed")
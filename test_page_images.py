@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for batched page rendering in PDFProcessor.extract_images.
+pdf2image is mocked, so these run without Poppler installed.
+"""
+
+import os
+import tempfile
+from unittest import mock
+from pdf_processor import PDFProcessor
+
+
+class _FakeRenderer:
+    """Stands in for pdf2image.convert_from_path(paths_only=True): writes one file per page."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, pdf_path, dpi, fmt, first_page, last_page, thread_count, output_folder,
+                 output_file, paths_only, poppler_path):
+        assert paths_only
+        self.calls.append((first_page, last_page, dpi, fmt, thread_count))
+        extension = 'jpg' if fmt == 'jpeg' else fmt
+        paths = []
+        for page in range(first_page, last_page + 1):
+            path = os.path.join(output_folder, f"{output_file}0001-{page:02d}.{extension}")
+            with open(path, 'w') as f:
+                f.write(f"page {page} at {dpi} dpi")
+            paths.append(path)
+        return paths
+
+
+def _processor(session_dir):
+    processor = PDFProcessor(session_dir, text_cache=False)
+    processor.poppler_available = True
+    return processor
+
+
+def test_pages_are_rendered_in_batches():
+    renderer = _FakeRenderer()
+    with tempfile.TemporaryDirectory() as session_dir, \
+            mock.patch('pdf_processor.pdf2image.pdfinfo_from_path', return_value={"Pages": 10}), \
+            mock.patch('pdf_processor.pdf2image.convert_from_path', side_effect=renderer), \
+            mock.patch('pdf_processor.PDF_IMAGE_BATCH_PAGES', 4):
+        assert _processor(session_dir).extract_images("doc.pdf", dpi=150, thread_count=2)
+
+        assert [call[:2] for call in renderer.calls] == [(1, 4), (5, 8), (9, 10)]
+        assert all(call[2:] == (150, 'jpeg', 2) for call in renderer.calls)
+        assert sorted(os.listdir(session_dir)) == sorted(f"page_{n}.jpg" for n in range(1, 11))
+        with open(os.path.join(session_dir, "page_10.jpg")) as f:
+            assert f.read() == "page 10 at 150 dpi"
+
+
+def test_pages_are_yielded_in_order_and_scratch_is_removed():
+    renderer = _FakeRenderer()
+    with tempfile.TemporaryDirectory() as session_dir, \
+            mock.patch('pdf_processor.pdf2image.pdfinfo_from_path', return_value={"Pages": 5}), \
+            mock.patch('pdf_processor.pdf2image.convert_from_path', side_effect=renderer):
+        pages = []
+        for page_number, image_path in _processor(session_dir).iter_page_images("doc.pdf", fmt="png"):
+            # Earlier batches are already cleaned up while later ones render
+            assert len([name for name in os.listdir(session_dir) if name.startswith('.render_')]) == 1
+            pages.append((page_number, os.path.basename(image_path)))
+
+        assert pages == [(n, f"page_{n}.png") for n in range(1, 6)]
+        assert not [name for name in os.listdir(session_dir) if name.startswith('.render_')]
+
+
+def test_extract_images_rejects_unknown_format():
+    with tempfile.TemporaryDirectory() as session_dir, \
+            mock.patch('pdf_processor.pdf2image.pdfinfo_from_path', return_value={"Pages": 1}):
+        assert not _processor(session_dir).extract_images("doc.pdf", fmt="bmp")
+
+
+if __name__ == "__main__":
+    test_pages_are_rendered_in_batches()
+    test_pages_are_yielded_in_order_and_scratch_is_removed()
+    test_extract_images_rejects_unknown_format()
+    print("✅ Page image tests passed")
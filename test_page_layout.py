@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for the table-region and word text modes (page_layout), on both the public
+pdfplumber path and the fast path that reads pdfminer's layout objects.
+"""
+
+import os
+import shutil
+import tempfile
+import uuid
+from unittest import mock
+import pdfplumber
+from bol_parser import parse_page
+import page_layout
+from page_layout import extract_table_region_text, extract_word_table_text, page_words, layout_chars, char_dicts
+from pdf_processor import PDFProcessor, TEXT_MODE_FULL, TEXT_MODE_TABLE, TEXT_MODE_WORDS, shutdown_extraction_pools
+from data_processor import DataProcessor
+from pdf_fixtures import write_text_pdf, build_text_pdf, bol_page_lines, bol_column_page_lines
+
+PAGES = [
+    bol_page_lines("A1001", [(10, "ST100", 120, "45.5"), (5, "ST200", 60, "20.0")], totals=False),
+    bol_page_lines("A1001", [(2, "ST300", 24, "8.25")], bol_cube="88.10", page_label="Page 2"),
+    ["TERMS AND CONDITIONS APPLY"] + bol_page_lines("B2002", [(1, "XY9", 12, "1,200.5")], bol_cube="9.50")
+    + ["CARRIER SIGNATURE 12.50"],
+]
+
+# Columned tables: a multi-word style, and a style and description wrapped onto a second line
+COLUMN_ROWS = [
+    (10, "ST100", 120, "APPAREL", "45.5"),
+    (5, "ST 200 B", "1,060", "KIDS WEAR", "20.0"),
+    (3, "ST300", 36, "MENS", "12.0"),
+    ("", "NAVY", "", "SHIRTS", ""),
+]
+COLUMN_PAGES = [
+    bol_column_page_lines("C3003", COLUMN_ROWS),
+    bol_column_page_lines("C3003", [(7, "ST 400", 84, "HATS", "30.0")], bol_cube="21.00"),
+]
+
+
+def _open(tmp_dir, pages):
+    path = os.path.join(tmp_dir, "layout.pdf")
+    write_text_pdf(path, pages)
+    return pdfplumber.open(path)
+
+
+def test_table_region_parses_like_the_whole_page():
+    tmp_dir = tempfile.mkdtemp(prefix="test_page_layout_")
+    try:
+        with _open(tmp_dir, PAGES) as pdf:
+            for page in pdf.pages:
+                full = page.extract_text()
+                assert pdfplumber.utils.extract_text(char_dicts(page, layout_chars(page))) == full
+
+                text, cropped = extract_table_region_text(page)
+                assert cropped
+                assert "SHIP FROM" not in text and "HANDLE WITH CARE" not in text
+                assert parse_page(text) == parse_page(full)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def test_unexpected_layouts_fall_back_to_the_whole_page():
+    no_instructions = [line for line in PAGES[0] if line != "SHIPPING INSTRUCTIONS:"]
+    late_invoice = [f"NOTE {n}" for n in range(10)] + PAGES[0]
+    no_cube = [line for line in PAGES[0] if not line.startswith("CUBE")]
+    tmp_dir = tempfile.mkdtemp(prefix="test_page_layout_")
+    try:
+        with _open(tmp_dir, [no_instructions, late_invoice, no_cube]) as pdf:
+            for page in pdf.pages:
+                text, cropped = extract_table_region_text(page)
+                assert not cropped
+                assert text == page.extract_text()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def test_fast_path_matches_the_public_api():
+    no_cube = [line for line in PAGES[0] if not line.startswith("CUBE")]
+    tmp_dir = tempfile.mkdtemp(prefix="test_page_layout_")
+    try:
+        with _open(tmp_dir, PAGES + COLUMN_PAGES + [no_cube]) as pdf:
+            assert page_layout.FAST_PATH and page_layout.fast_path(pdf.pages[0])
+            fast = [(extract_table_region_text(page), extract_word_table_text(page), page_words(page))
+                    for page in pdf.pages]
+            with mock.patch('page_layout.FAST_PATH', False):
+                assert not page_layout.fast_path(pdf.pages[0])
+                public = [(extract_table_region_text(page), extract_word_table_text(page), page.extract_words())
+                          for page in pdf.pages]
+        assert fast == public
+        assert [cropped for (_, cropped), _, _ in public] == [True] * 5 + [False]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # Releases the fast path was not checked against use the public API
+    assert page_layout._version("0.11.10") in page_layout.FAST_PATH_PDFPLUMBER
+    assert page_layout._version("0.12.0") not in page_layout.FAST_PATH_PDFPLUMBER
+    assert page_layout._version("1.0.0b1") not in page_layout.FAST_PATH_PDFPLUMBER
+
+
+def test_word_mode_splits_rows_by_column():
+    tmp_dir = tempfile.mkdtemp(prefix="test_page_layout_")
+    try:
+        with _open(tmp_dir, COLUMN_PAGES + PAGES[:1]) as pdf:
+            assert page_words(pdf.pages[0]) == pdf.pages[0].extract_words()
+
+            text, columns_found = extract_word_table_text(pdf.pages[0])
+            assert columns_found
+            assert parse_page(text).rows == [
+                ("10", "120", "45.5", "ST100"),
+                ("5", "1060", "20.0", "ST 200 B"),
+                ("3", "36", "12.0", "ST300 NAVY"),
+            ]
+
+            # Rows that do not fit the columns stay plain text, so parsing is unchanged
+            text, columns_found = extract_word_table_text(pdf.pages[2])
+            assert columns_found and "\t" not in text
+            assert text == pdf.pages[2].extract_text()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def test_column_layout_is_computed_once_per_header():
+    page_layout._column_layouts.clear()
+    tmp_dir = tempfile.mkdtemp(prefix="test_page_layout_")
+    try:
+        with _open(tmp_dir, COLUMN_PAGES) as pdf:
+            with mock.patch('page_layout.ColumnLayout', side_effect=page_layout.ColumnLayout) as new_layout:
+                for page in pdf.pages:
+                    extract_word_table_text(page)
+            assert new_layout.call_count == 1
+            assert len(page_layout._column_layouts) == 1
+            layout = next(iter(page_layout._column_layouts.values()))
+            assert layout.names == ("CARTONS", "STYLE", "PIECES", "DESCRIPTION", "WEIGHT")
+            assert len(layout.boundaries) == 4
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _csvs_for_mode(text_mode, workers, pages=PAGES):
+    processor = DataProcessor(session_id=f"test_layout_{uuid.uuid4().hex[:8]}")
+    try:
+        with open(os.path.join(processor.session_dir, "bol.pdf"), 'wb') as f:
+            f.write(build_text_pdf(pages))
+        pdf_processor = PDFProcessor(processor.session_dir, workers=workers, persist_text=False,
+                                     text_cache=False, ocr=False, text_mode=text_mode)
+        pdf_processor.pages_per_task = 1
+        assert processor.process_pages(pdf_processor.iter_session_pages())
+
+        outputs = {}
+        for name in sorted(os.listdir(processor.session_dir)):
+            if name.endswith('.csv'):
+                with open(os.path.join(processor.session_dir, name), encoding='utf-8') as f:
+                    outputs[name] = f.read()
+        return outputs
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_table_mode_gives_the_same_csvs():
+    try:
+        expected = _csvs_for_mode(TEXT_MODE_FULL, workers=1)
+        assert sorted(expected) == ["A1001.csv", "B2002.csv"]
+        assert _csvs_for_mode(TEXT_MODE_TABLE, workers=1) == expected
+        assert _csvs_for_mode(TEXT_MODE_TABLE, workers=2) == expected
+        assert _csvs_for_mode(TEXT_MODE_WORDS, workers=2) == expected
+
+        outputs = _csvs_for_mode(TEXT_MODE_WORDS, workers=2, pages=COLUMN_PAGES)
+        assert "ST300 NAVY" in outputs["C3003.csv"] and "ST 400" in outputs["C3003.csv"]
+    finally:
+        shutdown_extraction_pools()
+
+
+if __name__ == "__main__":
+    test_table_region_parses_like_the_whole_page()
+    test_unexpected_layouts_fall_back_to_the_whole_page()
+    test_fast_path_matches_the_public_api()
+    test_word_mode_splits_rows_by_column()
+    test_column_layout_is_computed_once_per_header()
+    test_table_mode_gives_the_same_csvs()
+    print("✅ Page layout tests passed")
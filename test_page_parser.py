@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Equivalence tests for the single-pass BOL page parser.
+parse_page() must return exactly what the three per-page scans it replaced (formerly
+DataProcessor's _get_invoice_no, _extract_table_data and _extract_bol_cube, kept below
+as the reference) produce for the same page text.
+"""
+
+import re
+import random
+from bol_parser import parse_page
+from row_fixtures import legacy_parse_row
+from pdf_fixtures import bol_page_lines
+
+
+def legacy_get_invoice_no(content):
+    """The original invoice number scan over the first ten lines."""
+    for line in content.splitlines()[:10]:
+        if "BILL OF LADING" in line.upper():
+            match = re.search(r'BILL OF LADING\s+([A-Z]\d+)', line, re.IGNORECASE)
+            if match:
+                return match.group(1)
+    return ""
+
+
+def legacy_extract_table_data(content):
+    """The original table scan: (rows, has_totals, totals), or None without a table header."""
+    lines = content.splitlines()
+    table_start = None
+    for i, line in enumerate(lines):
+        if "CARTONS" in line.upper() and "STYLE" in line.upper() and "PIECES" in line.upper():
+            table_start = i
+            break
+    if table_start is None:
+        return None
+
+    rows = []
+    has_totals = False
+    totals = {'pieces': '', 'weight': ''}
+    for line in lines[table_start + 1:]:
+        if "TOTAL CARTONS" in line.upper():
+            has_totals = True
+            tokens = line.split()
+            if len(tokens) >= 11:
+                totals['pieces'] = tokens[3].replace(',', '')
+                totals['weight'] = tokens[-1].replace(',', '')
+            break
+        if "SHIPPING INSTRUCTIONS:" in line.upper():
+            break
+        line_stripped = line.strip()
+        if not line_stripped:
+            continue
+        row = legacy_parse_row(line_stripped)
+        if row is not None:
+            rows.append(row)
+    return rows, has_totals, totals
+
+
+def legacy_extract_bol_cube(content):
+    """The original BOL cube scan upwards from the first SHIPPING INSTRUCTIONS line."""
+    lines = content.splitlines()
+    for i, line in enumerate(lines):
+        if "SHIPPING INSTRUCTIONS:" in line.upper():
+            for candidate in reversed(lines[:i]):
+                match = re.search(r'\b\d{1,3}\.\d{2}\b', candidate.strip())
+                if match:
+                    return match.group(0)
+            break
+    return ""
+
+
+def _legacy_parse(content):
+    return legacy_get_invoice_no(content), legacy_extract_table_data(content), legacy_extract_bol_cube(content)
+
+
+def _assert_equivalent(content):
+    invoice_no, table_data, bol_cube = _legacy_parse(content)
+    page = parse_page(content)
+
+    assert page.invoice_no == invoice_no
+    assert page.bol_cube == bol_cube
+    assert page.table_found == (table_data is not None)
+    if table_data is not None:
+        rows, has_totals, totals = table_data
+        assert page.rows == rows
+        assert page.has_totals == has_totals
+        assert page.totals == totals
+
+
+PAGES = {
+    'standard': "\n".join(bol_page_lines("A1001", [(10, "ST100", "1,120", "45.5"), (5, "ST200", 60, "20")])),
+    'no_totals': "\n".join(bol_page_lines("A1001", [(2, "ST300", 24, "8.25")], totals=False)),
+    'no_header': "BILL OF LADING A1\nSOME TEXT 12.50\nSHIPPING INSTRUCTIONS:\n",
+    'no_invoice': "ACME\nCARTONS STYLE PIECES\n1 X1 2 3.0\nSHIPPING INSTRUCTIONS:\n",
+    'invoice_past_line_ten': "\n".join(["FILLER"] * 10 + ["BILL OF LADING Z999"]),
+    'second_heading_matches': "BILL OF LADING\nBILL OF LADING Q42\nCARTONS STYLE PIECES\n3 AB1 4 5\n",
+    'shipping_before_header': "BILL OF LADING A2\nCUBE 45.67\nSHIPPING INSTRUCTIONS:\n"
+                              "CARTONS STYLE PIECES WEIGHT\n1 X1 2 3.5\n99.99\nSHIPPING INSTRUCTIONS:\n",
+    'cube_far_above': "BILL OF LADING A3\n12.34 FIRST\n56.78 SECOND\nNO NUMBERS\n\nSHIPPING INSTRUCTIONS:\n",
+    'short_totals': "BILL OF LADING A4\nCARTONS STYLE PIECES\n1 X1 2 3\n5 TOTAL CARTONS 10\n",
+    'skipped_rows': "BILL OF LADING A5\nCARTONS STYLE PIECES WEIGHT\nPage 1\nNOTE: fragile\n"
+                    "STYLE AB12 CARRIES 3 ITEMS\n1 X1\n4 X2 5 n/a\nXY 12 34 56\n   \n7 X3 8 9.5\n",
+}
+
+
+def test_parser_matches_legacy_scans():
+    """Hand-picked pages covering the edge cases of each legacy scan."""
+    for name, content in PAGES.items():
+        try:
+            _assert_equivalent(content)
+        except AssertionError:
+            raise AssertionError(f"Parser mismatch for page '{name}'")
+
+
+def test_parser_matches_legacy_scans_on_random_pages():
+    """Random mixes of BOL-like lines, including repeated headers and terminators."""
+    vocabulary = [
+        "BILL OF LADING A{n}", "BILL OF LADING", "CARTONS STYLE PIECES WEIGHT", "cartons style pieces",
+        "{n} ST{n} {n} APPAREL {n}.5", "{n} ST{n} {n},{n}0 APPAREL 1,{n}.25", "{n} ST{n}", "AB{n} {n} {n}",
+        "{n} TOTAL CARTONS {n},000 TOTAL PIECES TOTAL VOL / WGT {n}.2", "{n} TOTAL CARTONS",
+        "CUBE {n}.{n}{n}", "{n}.{n}{n}", "SHIPPING INSTRUCTIONS:", "Shipping Instructions: none",
+        "Page {n}", "SHIP TO: STORE", "", "   ", "NOTES ONLY",
+    ]
+    rng = random.Random(20240601)
+    for _ in range(2000):
+        lines = [
+            rng.choice(vocabulary).format(n=rng.randint(1, 9))
+            for _ in range(rng.randint(0, 25))
+        ]
+        _assert_equivalent("\n".join(lines))
+
+
+if __name__ == "__main__":
+    test_parser_matches_legacy_scans()
+    test_parser_matches_legacy_scans_on_random_pages()
+    print("✅ Page parser equivalence tests passed")
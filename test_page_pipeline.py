@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory page pipeline (PDFProcessor.iter_session_pages -> DataProcessor.process_pages).
+"""
+
+import os
+import shutil
+import uuid
+from pdf_processor import PDFProcessor
+from data_processor import DataProcessor
+from pdf_fixtures import write_text_pdf, bol_page_lines
+
+PAGES = [
+    bol_page_lines("A1001", [(10, "ST100", 120, "45.5"), (5, "ST200", 60, "20.0")], totals=False),
+    bol_page_lines("A1001", [(2, "ST300", 24, "8.25")], bol_cube="88.10"),
+    bol_page_lines("B2002", [(1, "XY9", 12, "1,200.5")], bol_cube="9.50"),
+]
+
+
+def _new_processor():
+    return DataProcessor(session_id=f"test_pipeline_{uuid.uuid4().hex[:8]}")
+
+
+def _read_csvs(session_dir):
+    outputs = {}
+    for name in sorted(os.listdir(session_dir)):
+        if name.endswith('.csv'):
+            with open(os.path.join(session_dir, name), encoding='utf-8') as f:
+                outputs[name] = f.read()
+    return outputs
+
+
+def test_process_pages_matches_txt_file_processing():
+    """Streaming page text gives the same invoice CSVs as the numbered TXT files."""
+    file_processor = _new_processor()
+    page_processor = _new_processor()
+    try:
+        for number, lines in enumerate(PAGES, 1):
+            with open(os.path.join(file_processor.session_dir, f"{number}.txt"), 'w', encoding='utf-8') as f:
+                f.write("\n".join(lines))
+        assert file_processor.process_all_files()
+
+        pages = ((number, "\n".join(lines)) for number, lines in enumerate(PAGES, 1))
+        assert page_processor.process_pages(pages)
+
+        file_outputs = _read_csvs(file_processor.session_dir)
+        assert sorted(file_outputs) == ["A1001.csv", "B2002.csv"]
+        assert _read_csvs(page_processor.session_dir) == file_outputs
+    finally:
+        shutil.rmtree(file_processor.session_dir, ignore_errors=True)
+        shutil.rmtree(page_processor.session_dir, ignore_errors=True)
+
+
+def test_pipeline_writes_no_txt_files():
+    """Pages go straight from the PDF into the collector without touching disk."""
+    processor = _new_processor()
+    try:
+        write_text_pdf(os.path.join(processor.session_dir, "bol.pdf"), PAGES)
+
+        pdf_processor = PDFProcessor(processor.session_dir, persist_text=False)
+        assert processor.process_pages(pdf_processor.iter_session_pages())
+        assert pdf_processor.extraction_error is None
+
+        remaining = sorted(os.listdir(processor.session_dir))
+        assert remaining == ["A1001.csv", "B2002.csv"]
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+def test_pipeline_reports_missing_pdf():
+    """An empty session is reported as an extraction error, not a parsing error."""
+    processor = _new_processor()
+    try:
+        pdf_processor = PDFProcessor(processor.session_dir)
+        assert not processor.process_pages(pdf_processor.iter_session_pages())
+        assert pdf_processor.extraction_error
+    finally:
+        shutil.rmtree(processor.session_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_process_pages_matches_txt_file_processing()
+    test_pipeline_writes_no_txt_files()
+    test_pipeline_reports_missing_pdf()
+    print("✅ Page pipeline tests passed")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for PDFProcessor text extraction.
+Checks that the process-pool mode produces the same numbered TXT files as serial extraction.
+"""
+
+import os
+import tempfile
+from pdf_processor import PDFProcessor
+from pdf_fixtures import write_text_pdf, bol_page_lines
+
+
+def _make_pdf(directory, page_count):
+    pages = []
+    for page in range(1, page_count + 1):
+        rows = [(page, f"ST{page:03d}", page * 12, f"{page * 1.5:.1f}")]
+        pages.append(bol_page_lines(f"A{1000 + page}", rows, page_label=f"Page {page}"))
+    return write_text_pdf(os.path.join(directory, "multi.pdf"), pages)
+
+
+def _read_txt_files(directory):
+    outputs = {}
+    for name in os.listdir(directory):
+        if name.endswith('.txt'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                outputs[name] = f.read()
+    return outputs
+
+
+def test_parallel_extraction_matches_serial():
+    """Parallel extraction writes the same N.txt files as the serial path."""
+    with tempfile.TemporaryDirectory() as serial_dir, tempfile.TemporaryDirectory() as parallel_dir:
+        pdf_path = _make_pdf(serial_dir, 7)
+
+        serial = PDFProcessor(serial_dir, workers=1, text_cache=False)
+        assert serial.extract_text(pdf_path)
+
+        parallel = PDFProcessor(parallel_dir, workers=2, text_cache=False)
+        parallel.pages_per_task = 2
+        assert parallel.extract_text(pdf_path)
+
+        serial_outputs = _read_txt_files(serial_dir)
+        assert set(serial_outputs) == {f"{n}.txt" for n in range(1, 8)}
+        assert _read_txt_files(parallel_dir) == serial_outputs
+
+
+def test_parallel_extraction_yields_pages_in_order():
+    """Page texts come back in document order regardless of task split."""
+    with tempfile.TemporaryDirectory() as session_dir:
+        pdf_path = _make_pdf(session_dir, 5)
+
+        processor = PDFProcessor(session_dir, workers=2, text_cache=False)
+        processor.pages_per_task = 1
+        pages = list(processor._iter_page_texts(pdf_path))
+
+        assert [number for number, _ in pages] == [1, 2, 3, 4, 5]
+        assert all(f"BILL OF LADING A{1000 + number}" in text for number, text in pages)
+        assert processor.page_count == 5
+
+
+if __name__ == "__main__":
+    test_parallel_extraction_matches_serial()
+    test_parallel_extraction_yields_pages_in_order()
+    print("✅ PDF extraction tests passed")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide Poppler probe: one probe per process, refreshed on request.
+"""
+
+from unittest import mock
+from utils import PopplerUtils, PopplerNotFoundError
+from pdf_processor import PDFProcessor
+
+
+def test_probe_runs_once_until_refreshed():
+    with mock.patch.object(PopplerUtils, 'check_poppler_installation',
+                           side_effect=PopplerNotFoundError("Poppler not found in PATH")) as probe:
+        status = PopplerUtils.refresh_poppler_status()
+        assert status['available'] is False and status['error'] == "Poppler not found in PATH"
+
+        for _ in range(3):
+            assert PDFProcessor('.', text_cache=False).poppler_available is False
+        assert probe.call_count == 1
+
+    with mock.patch.object(PopplerUtils, 'check_poppler_installation', return_value=True) as probe:
+        assert PopplerUtils.get_poppler_status()['available'] is False
+        assert PopplerUtils.refresh_poppler_status()['available'] is True
+        assert PDFProcessor('.', text_cache=False).poppler_available is True
+        assert probe.call_count == 1
+
+    PopplerUtils.refresh_poppler_status()
+
+
+def test_health_reports_cached_probe():
+    from app import app
+
+    client = app.test_client()
+    with mock.patch.object(PopplerUtils, 'check_poppler_installation', return_value=True) as probe:
+        assert client.get('/health?refresh_poppler=1').get_json()['poppler_status'] == "working"
+        health = client.get('/health').get_json()
+        assert health['poppler_status'] == "working" and health['poppler']['available'] is True
+        assert probe.call_count == 1
+
+    PopplerUtils.refresh_poppler_status()
+
+
+if __name__ == "__main__":
+    test_probe_runs_once_until_refreshed()
+    test_health_reports_cached_probe()
+    print("✅ Poppler status tests passed")
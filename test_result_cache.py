@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed result cache used by PDF uploads.
+"""
+
+import io
+import os
+import time
+import shutil
+import tempfile
+import uuid
+from unittest import mock
+from config import OCR_DPI, OCR_LANG, OCR_TESSERACT_CONFIG
+from result_cache import ResultCache, result_cache_salt
+from output_schema import BOL_SCHEMA, get_output_schema
+from pdf_fixtures import build_text_pdf, bol_page_lines
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_keys_depend_on_bytes_and_parser_version():
+    work_dir = tempfile.mkdtemp(prefix="test_result_cache_")
+    try:
+        first, second = os.path.join(work_dir, "a.pdf"), os.path.join(work_dir, "b.pdf")
+        _write(first, b"%PDF-1.4 same bytes")
+        _write(second, b"%PDF-1.4 same bytes")
+        cache = ResultCache(cache_dir=work_dir, salt="1")
+        assert cache.key_for(first) == cache.key_for(second)
+        assert ResultCache(cache_dir=work_dir, salt="2").key_for(first) != cache.key_for(first)
+        _write(second, b"%PDF-1.4 other bytes")
+        assert cache.key_for(first) != cache.key_for(second)
+
+        # Several PDFs key on their order and on where one document ends
+        assert cache.key_for(first, second) != cache.key_for(second, first)
+        _write(first, b"%PDF-1.4 a")
+        _write(second, b"b")
+        split_first, split_second = os.path.join(work_dir, "c.pdf"), os.path.join(work_dir, "d.pdf")
+        _write(split_first, b"%PDF-1.4 ")
+        _write(split_second, b"ab")
+        assert cache.key_for(first, second) != cache.key_for(split_first, split_second)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_every_output_setting_changes_the_key():
+    work_dir = tempfile.mkdtemp(prefix="test_result_cache_")
+    try:
+        pdf_path = os.path.join(work_dir, "a.pdf")
+        _write(pdf_path, b"%PDF-1.4 same bytes")
+        base = dict(parser_version="1", text_mode="full", single_writer=True, ocr="300/eng/--psm 6",
+                    schema=BOL_SCHEMA.fingerprint)
+        variants = [dict(base, parser_version="2"), dict(base, text_mode="table"), dict(base, text_mode="words"),
+                    dict(base, single_writer=False),
+                    dict(base, ocr="off"), dict(base, ocr="200/eng/--psm 6"), dict(base, ocr="300/deu/--psm 6"),
+                    dict(base, ocr="300/eng/--psm 4"), dict(base, schema="0123456789abcdef")]
+
+        key = ResultCache(cache_dir=work_dir, salt=result_cache_salt(**base)).key_for(pdf_path)
+        keys = {ResultCache(cache_dir=work_dir, salt=result_cache_salt(**settings)).key_for(pdf_path)
+                for settings in variants}
+        assert key not in keys and len(keys) == len(variants)
+        # The default salt is the current settings'
+        assert ResultCache(cache_dir=work_dir).salt == result_cache_salt()
+        # Scanned pages lose their rows when OCR is unavailable, so that is part of the key
+        with mock.patch('result_cache.get_ocr_status', return_value={'available': False}):
+            assert ":ocr=off:" in result_cache_salt()
+        with mock.patch('result_cache.get_ocr_status', return_value={'available': True}):
+            assert f":ocr={OCR_DPI}/{OCR_LANG}/{OCR_TESSERACT_CONFIG}:" in result_cache_salt()
+        # As does the output schema
+        assert result_cache_salt().endswith(":schema=" + get_output_schema().fingerprint)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_least_recently_used_entries_are_evicted():
+    work_dir = tempfile.mkdtemp(prefix="test_result_cache_")
+    try:
+        cache = ResultCache(cache_dir=os.path.join(work_dir, "cache"), max_mb=1)
+        source = os.path.join(work_dir, "combined.csv")
+        _write(source, b"x" * 400 * 1024)
+
+        assert cache.store("aa" + "0" * 62, source)
+        time.sleep(0.01)
+        assert cache.store("bb" + "0" * 62, source)
+        time.sleep(0.01)
+        # Reading the first entry makes the second one the least recently used
+        assert cache.fetch("aa" + "0" * 62, os.path.join(work_dir, "out.csv"))
+        time.sleep(0.01)
+        assert cache.store("cc" + "0" * 62, source)
+
+        assert not cache.fetch("bb" + "0" * 62, os.path.join(work_dir, "out.csv"))
+        assert cache.fetch("cc" + "0" * 62, os.path.join(work_dir, "out.csv"))
+        stats = cache.stats()
+        assert stats['entries'] == 2 and stats['size_bytes'] <= stats['max_bytes']
+        assert (stats['hits'], stats['misses']) == (2, 1)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_repeated_upload_is_served_from_cache():
+    import app as app_module
+
+    client = app_module.app.test_client()
+    cache_dir = tempfile.mkdtemp(prefix="test_result_cache_")
+    previous_cache = app_module.result_cache
+    app_module.result_cache = ResultCache(cache_dir=cache_dir, max_mb=16)
+    sid = f"test_cache_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app_module.app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    pdf = build_text_pdf([bol_page_lines("A1001", [(10, "ST100", 120, "45.5")])])
+    try:
+        outputs = []
+        for _ in range(2):
+            response = client.post(f'/upload?_sid={sid}', data={'file': (io.BytesIO(pdf), 'bol.pdf')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 200, response.get_json()
+            assert sorted(os.listdir(session_dir)) == ["combined_data.csv"]
+            outputs.append(client.get(f'/download-bol?_sid={sid}').data)
+
+        assert outputs[0] == outputs[1] and b"A1001" in outputs[0]
+        stats = client.get('/health').get_json()['result_cache']
+        assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    finally:
+        app_module.result_cache = previous_cache
+        shutil.rmtree(session_dir, ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_keys_depend_on_bytes_and_parser_version()
+    test_every_output_setting_changes_the_key()
+    test_least_recently_used_entries_are_evicted()
+    test_repeated_upload_is_served_from_cache()
+    print("✅ Result cache tests passed")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the precompiled TableRowClassifier.
+The classifier must accept, skip and split lines exactly like the original regex logic.
+"""
+
+import random
+from bol_parser import TableRow, ROW_CLASSIFIER, ROW, NOT_A_ROW, INSUFFICIENT_TOKENS, NO_WEIGHT, is_table_row
+from row_fixtures import legacy_is_valid_table_row, legacy_parse_row, compiled_parse_row, synthetic_table
+
+EDGE_LINES = [
+    "", "   ", "10 ST100 1,120 APPAREL 45.5", "CARTONS STYLE PIECES", "cartons and style and pieces",
+    "SHIPPING INSTRUCTIONS: none", "TOTAL CARTONS 5", "Page 3", "page 3 of 4", "BILL OF LADING A1",
+    "SHIP TO: STORE 12", "NOTE:", "AB12 X Y", "AB12 3X 4", "XY 12 34 56", "STYLE 12AB 7 X",
+    "1 X1", "4 X2 5 n/a", "7 X3 8 9.", "7 X3 8 .5", "7 X3 8 1,2,3", "١٢ X 3 4", "ab12 3 4",
+    "  12   AB  3   4.50  ", "A B C: 1 2 3",
+]
+
+
+def test_classifier_matches_legacy_on_edge_cases():
+    for line in EDGE_LINES:
+        assert is_table_row(line) == legacy_is_valid_table_row(line), line
+        assert compiled_parse_row(line.strip()) == legacy_parse_row(line.strip()), line
+
+
+def test_classifier_matches_legacy_on_synthetic_table():
+    lines = synthetic_table(3000, seed=7)
+    assert [compiled_parse_row(line) for line in lines] == [legacy_parse_row(line) for line in lines]
+
+
+def test_classifier_matches_legacy_on_random_tokens():
+    rng = random.Random(99)
+    tokens = ["12", "1,200", "3.5", "4.", "AB12", "12AB", "ab", "X", "Page", "TOTAL", "CARTONS",
+              "STYLE", "PIECES", "INFO:", ":", "n/a", "SHIPPING", "INSTRUCTIONS", "BILL", "OF", "LADING"]
+    for _ in range(5000):
+        line = "  ".join(rng.choice(tokens) for _ in range(rng.randint(0, 7)))
+        assert is_table_row(line) == legacy_is_valid_table_row(line), line
+        assert compiled_parse_row(line.strip()) == legacy_parse_row(line.strip()), line
+
+
+def test_classifier_reports_skip_reason():
+    assert ROW_CLASSIFIER.classify("10 ST100 120 APPAREL 45.5") == (ROW, TableRow("10", "120", "45.5", "ST100"))
+    assert ROW_CLASSIFIER.classify("SHIP TO: STORE") == (NOT_A_ROW, None)
+    assert ROW_CLASSIFIER.classify("1 X1") == (INSUFFICIENT_TOKENS, None)
+    assert ROW_CLASSIFIER.classify("AB12 3X 4a") == (NO_WEIGHT, None)
+
+
+def test_classifier_reads_tab_separated_cells():
+    assert ROW_CLASSIFIER.classify("5\tST 200 B\t1,060\tKIDS WEAR\t20.0") == (ROW, TableRow("5", "1060", "20.0", "ST 200 B"))
+    assert ROW_CLASSIFIER.classify("5\tST 200 B\t\tKIDS WEAR\t20.0") == (INSUFFICIENT_TOKENS, None)
+
+
+if __name__ == "__main__":
+    test_classifier_matches_legacy_on_edge_cases()
+    test_classifier_matches_legacy_on_synthetic_table()
+    test_classifier_matches_legacy_on_random_tokens()
+    test_classifier_reports_skip_reason()
+    test_classifier_reads_tab_separated_cells()
+    print("✅ Row classifier tests passed")
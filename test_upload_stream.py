@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Tests for chunked upload writing and incremental base64 decoding.
+"""
+
+import io
+import os
+import base64
+import random
+import shutil
+import tempfile
+import uuid
+from urllib.parse import urlencode
+from upload_stream import Base64StreamDecoder, save_base64, save_stream, save_form_base64, UploadTooLarge
+from upload_stream import FormFieldTooLarge, MAX_FORM_FIELD_BYTES
+from pdf_fixtures import build_text_pdf, bol_page_lines
+
+PDF = build_text_pdf([bol_page_lines("A1001", [(10, "ST100", 120, "45.5")])])
+
+
+def _decode_in_pieces(text, piece_size):
+    decoder = Base64StreamDecoder()
+    out = b''.join(decoder.feed(text[i:i + piece_size]) for i in range(0, len(text), piece_size))
+    return out + decoder.finish()
+
+
+def test_incremental_decoding_matches_b64decode():
+    rng = random.Random(7)
+    for size in (0, 1, 2, 3, 100, 4097):
+        data = bytes(rng.randrange(256) for _ in range(size))
+        encoded = base64.b64encode(data).decode('ascii')
+        wrapped = "\r\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76))
+        for text in (encoded, wrapped, "data:application/pdf;base64," + encoded):
+            for piece_size in (1, 3, 7, 64, 1 << 20):
+                assert _decode_in_pieces(text, piece_size) == data, (size, piece_size)
+
+    # Bad padding fails like base64.b64decode does
+    try:
+        _decode_in_pieces("QUJDR", 2)
+        assert False, "incomplete base64 accepted"
+    except ValueError:
+        pass
+
+
+def test_writers_enforce_the_limit_and_clean_up():
+    work_dir = tempfile.mkdtemp(prefix="test_upload_stream_")
+    try:
+        path = os.path.join(work_dir, "upload.pdf")
+        assert save_stream(io.BytesIO(PDF), path, chunk_size=100) == len(PDF)
+        with open(path, 'rb') as f:
+            assert f.read() == PDF
+
+        encoded = base64.b64encode(PDF)
+        assert save_base64(io.BytesIO(encoded), path, chunk_size=10) == len(PDF)
+        assert save_base64(encoded.decode('ascii'), path, chunk_size=10) == len(PDF)
+
+        for write in (lambda: save_stream(io.BytesIO(PDF), path, max_bytes=100, chunk_size=64),
+                      lambda: save_base64(encoded, path, max_bytes=100, chunk_size=64)):
+            try:
+                write()
+                assert False, "limit not enforced"
+            except UploadTooLarge:
+                pass
+            assert not os.path.exists(path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_form_bodies_are_decoded_from_the_stream():
+    work_dir = tempfile.mkdtemp(prefix="test_upload_stream_")
+    path = os.path.join(work_dir, "upload.pdf")
+    encoded = "data:application/pdf;base64," + base64.b64encode(PDF).decode('ascii')
+    fields = ('attachmentData', 'data')
+    try:
+        # urlencoded: "+", "/" and "=" are %-escaped, and escapes are split across chunks
+        body = urlencode({'filename': "a b.pdf", 'attachmentData': encoded, 'note': "x&y"}).encode('ascii')
+        for chunk_size in (1, 2, 5, 1 << 20):
+            assert save_form_base64(io.BytesIO(body), 'application/x-www-form-urlencoded', None, path, fields,
+                                    chunk_size=chunk_size) == ({'filename': "a b.pdf", 'note': "x&y"}, len(PDF))
+            with open(path, 'rb') as f:
+                assert f.read() == PDF
+
+        boundary = "b0undary"
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"data\"\r\n\r\n{encoded}\r\n"
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"other\"; filename=\"x.txt\"\r\n\r\n"
+                f"ignored\r\n--{boundary}\r\nContent-Disposition: form-data; name=\"filename\"\r\n\r\nm.pdf\r\n"
+                f"--{boundary}--\r\n").encode('ascii')
+        for chunk_size in (64, 1 << 20):
+            assert save_form_base64(io.BytesIO(body), 'multipart/form-data', boundary, path, fields,
+                                    chunk_size=chunk_size) == ({'filename': "m.pdf"}, len(PDF))
+
+        assert save_form_base64(io.BytesIO(b"filename=x.pdf"), 'application/x-www-form-urlencoded', None,
+                                path, fields) == ({'filename': "x.pdf"}, None)
+
+        # Only the data field may be large; the partial file is removed
+        body = urlencode({'attachmentData': encoded, 'note': "n" * (MAX_FORM_FIELD_BYTES + 1)}).encode('ascii')
+        os.remove(path)
+        try:
+            save_form_base64(io.BytesIO(body), 'application/x-www-form-urlencoded', None, path, fields)
+            assert False, "oversized field accepted"
+        except FormFieldTooLarge:
+            pass
+        assert not os.path.exists(path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_upload_endpoints_stream_bodies_to_disk():
+    from app import app
+
+    client = app.test_client()
+    sid = f"test_stream_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    encoded = base64.b64encode(PDF).decode('ascii')
+    try:
+        response = client.post(f'/upload-base64?_sid={sid}',
+                               json={'file_data': "data:application/pdf;base64," + encoded, 'filename': 'bol'})
+        assert response.status_code == 200, response.get_json()
+        assert response.get_json()['file_size'] == len(PDF)
+
+        # The base64 text itself as the body
+        response = client.post(f'/upload-base64?_sid={sid}&filename=raw.pdf', data=encoded, content_type='text/plain')
+        assert response.status_code == 200, response.get_json()
+        assert response.get_json()['filename'] == 'raw.pdf'
+
+        # Raw PDF bytes
+        response = client.post(f'/upload-attachment?_sid={sid}&filename=mail.pdf', data=PDF,
+                               content_type='application/pdf')
+        assert response.status_code == 200, response.get_json()
+        assert response.get_json()['file_size'] == len(PDF)
+        assert b"A1001" in client.get(f'/download-bol?_sid={sid}').data
+
+        # Base64 form fields far past the form memory limit
+        assert app.config['MAX_FORM_MEMORY_SIZE'] == MAX_FORM_FIELD_BYTES
+        padded = encoded + "\r\n" * MAX_FORM_FIELD_BYTES
+        response = client.post(f'/upload-attachment?_sid={sid}',
+                               data={'attachmentData': padded, 'filename': 'form'})
+        assert response.status_code == 200, response.get_json()
+        assert (response.get_json()['filename'], response.get_json()['file_size']) == ('form.pdf', len(PDF))
+        response = client.post(f'/upload-attachment?_sid={sid}', data=urlencode({'file_data': encoded}),
+                               content_type='application/x-www-form-urlencoded')
+        assert response.status_code == 200, response.get_json()
+        assert response.get_json()['file_size'] == len(PDF)
+        assert not [name for name in os.listdir(session_dir) if name.startswith('.upload_')]
+    finally:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def test_oversized_requests_get_413():
+    from app import app
+
+    client = app.test_client()
+    sid = f"test_stream_{uuid.uuid4().hex[:8]}"
+    session_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'processing_sessions', sid)
+    previous = app.config['MAX_CONTENT_LENGTH']
+    app.config['MAX_CONTENT_LENGTH'] = 1024
+    try:
+        response = client.post(f'/upload?_sid={sid}', data={'file': (io.BytesIO(b"0" * 4096), 'big.pdf')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 413
+        assert 'max_upload_mb' in response.get_json()
+    finally:
+        app.config['MAX_CONTENT_LENGTH'] = previous
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_incremental_decoding_matches_b64decode()
+    test_writers_enforce_the_limit_and_clean_up()
+    test_form_bodies_are_decoded_from_the_stream()
+    test_upload_endpoints_stream_bodies_to_disk()
+    test_oversized_requests_get_413()
+    print("✅ Upload streaming tests passed")
@@ -0,0 +1,274 @@
+"""
+Chunked writing of uploads to disk.
+
+Uploaded files are copied into the session directory a chunk at a time and
+base64 payloads are decoded slice by slice, so a request never holds the decoded
+PDF in memory next to its encoded form. Every writer stops at MAX_UPLOAD_MB.
+Form bodies are read from the stream too: the base64 field goes straight to the
+decoder, and only the small fields around it (at most MAX_FORM_FIELD_KB each) are kept.
+"""
+
+import os
+import re
+import binascii
+import logging
+from urllib.parse import unquote_to_bytes
+from werkzeug.sansio.multipart import MultipartDecoder, NEED_DATA, Field, File, Data, Epilogue
+from config import MAX_UPLOAD_MB, UPLOAD_CHUNK_SIZE, MAX_FORM_FIELD_KB
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+MAX_FORM_FIELD_BYTES = MAX_FORM_FIELD_KB * 1024
+
+FORM_MIMETYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+# Like base64.b64decode, characters outside the alphabet (whitespace, line breaks) are dropped
+_NON_BASE64 = re.compile(rb'[^A-Za-z0-9+/=]')
+
+# A data URL prefix ("data:application/pdf;base64,") is only looked for at the start
+DATA_URL_SEARCH_CHARS = 256
+
+
+class UploadTooLarge(ValueError):
+    """The upload is bigger than the configured limit."""
+
+    def __init__(self, max_bytes):
+        super().__init__(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+        self.max_bytes = max_bytes
+
+
+class FormFieldTooLarge(UploadTooLarge):
+    """A form field other than the streamed base64 field is bigger than MAX_FORM_FIELD_KB."""
+
+    def __init__(self, name, max_bytes):
+        ValueError.__init__(self, f"Form field '{name}' exceeds the {max_bytes // 1024} KB form field limit")
+        self.max_bytes = max_bytes
+
+
+class Base64StreamDecoder:
+    """Decode base64 fed in arbitrary pieces (str or bytes).
+
+    Only whole 4-character groups are decoded per feed(); the remainder waits for the
+    next piece. A leading data URL prefix is skipped.
+    """
+
+    def __init__(self):
+        self._pending = b''
+        self._head = b''
+        self._in_body = False
+
+    def feed(self, data):
+        """Decode what can be decoded of data and return the bytes."""
+        if isinstance(data, str):
+            data = data.encode('ascii')
+        if not self._in_body:
+            data = self._skip_prefix(data)
+            if not self._in_body:
+                return b''
+
+        data = self._pending + _NON_BASE64.sub(b'', data)
+        cut = len(data) - len(data) % 4
+        self._pending = data[cut:]
+        return binascii.a2b_base64(data[:cut]) if cut else b''
+
+    def finish(self):
+        """Decode the final, possibly incomplete group (raises on bad padding, like b64decode)."""
+        if not self._in_body:
+            self._in_body = True
+            data, self._head = self._head, b''
+            return self.feed(data) + self.finish()
+        data, self._pending = self._pending, b''
+        return binascii.a2b_base64(data) if data else b''
+
+    def _skip_prefix(self, data):
+        # Hold back the first characters until the prefix (if any) can be recognised
+        self._head += data
+        comma = self._head.find(b',', 0, DATA_URL_SEARCH_CHARS)
+        if comma >= 0:
+            data, self._head = self._head[comma + 1:], b''
+        elif len(self._head) >= DATA_URL_SEARCH_CHARS:
+            data, self._head = self._head, b''
+        else:
+            return b''
+        self._in_body = True
+        return data
+
+
+def iter_chunks(text, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Slice a str or bytes value into chunk_size pieces without copying it whole."""
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
+
+
+def iter_stream(stream, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Read a binary file-like object chunk by chunk."""
+    return iter(lambda: stream.read(chunk_size), b'')
+
+
+def write_chunks(chunks, dest_path, max_bytes=MAX_UPLOAD_BYTES, decoder=None):
+    """Write chunks to dest_path, decoding each with decoder when given.
+
+    Returns the number of bytes written. Raises UploadTooLarge past max_bytes;
+    the partial file is removed on any error.
+    """
+    written = 0
+    try:
+        with open(dest_path, 'wb') as f:
+            for chunk in chunks:
+                data = decoder.feed(chunk) if decoder else chunk
+                written += len(data)
+                if written > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                f.write(data)
+            if decoder:
+                data = decoder.finish()
+                written += len(data)
+                if written > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                f.write(data)
+    except Exception:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    logger.debug("Wrote %d bytes to %s", written, os.path.basename(dest_path))
+    return written
+
+
+def save_stream(stream, dest_path, max_bytes=MAX_UPLOAD_BYTES, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Copy a binary stream (an uploaded file, a request body) to dest_path in chunks."""
+    return write_chunks(iter_stream(stream, chunk_size), dest_path, max_bytes)
+
+
+def save_base64(data, dest_path, max_bytes=MAX_UPLOAD_BYTES, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Decode base64 to dest_path a slice at a time.
+
+    data is a str/bytes value (e.g. a JSON field) or a binary stream (a request body).
+    """
+    chunks = iter_stream(data, chunk_size) if hasattr(data, 'read') else iter_chunks(data, chunk_size)
+    return write_chunks(chunks, dest_path, max_bytes, decoder=Base64StreamDecoder())
+
+
+def _unquote_chunks(chunks):
+    """URL-decode (+ and %XX) chunks of a form value; an escape split across chunks is held back."""
+    tail = b''
+    for chunk in chunks:
+        chunk = tail + chunk
+        cut = chunk.rfind(b'%', max(len(chunk) - 2, 0))
+        chunk, tail = (chunk[:cut], chunk[cut:]) if cut >= 0 else (chunk, b'')
+        yield unquote_to_bytes(chunk.replace(b'+', b' '))
+    if tail:
+        yield unquote_to_bytes(tail)
+
+
+class _UrlencodedFields:
+    """Iterate (name, value chunks) over an application/x-www-form-urlencoded body.
+
+    Each value's chunks must be read (or abandoned) before the next field is taken.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self._eof = False
+        self._stop = b''
+
+    def _raw(self, stops):
+        # Raw bytes up to the next stop byte; the stop byte found (b'' at the end) is kept in _stop
+        while True:
+            ends = [index for index in map(self._buffer.find, stops) if index >= 0]
+            if ends:
+                end = min(ends)
+                data, self._stop, self._buffer = self._buffer[:end], self._buffer[end:end + 1], self._buffer[end + 1:]
+                if data:
+                    yield data
+                return
+            data, self._buffer = self._buffer, b''
+            if data:
+                yield data
+            if self._eof:
+                self._stop = b''
+                return
+            self._buffer = next(self._chunks, b'')
+            self._eof = not self._buffer
+
+    def __iter__(self):
+        while self._buffer or not self._eof:
+            name = b''
+            for data in self._raw((b'&', b'=')):
+                name += data
+                if len(name) > MAX_FORM_FIELD_BYTES:
+                    raise FormFieldTooLarge(name[:64].decode('utf-8', 'replace'), MAX_FORM_FIELD_BYTES)
+            value = self._raw((b'&',)) if self._stop == b'=' else iter(())
+            if name:
+                yield b''.join(_unquote_chunks([name])).decode('utf-8', 'replace'), _unquote_chunks(value)
+            for _ in value:
+                pass
+
+
+def _iter_multipart_fields(chunks, boundary):
+    """Iterate (name, value chunks) over the text fields of a multipart/form-data body (file parts are skipped)."""
+    decoder = MultipartDecoder(boundary.encode('latin-1'))
+    chunks = iter(chunks)
+
+    def events():
+        while True:
+            event = decoder.next_event()
+            if event is NEED_DATA:
+                decoder.receive_data(next(chunks, None))
+            elif isinstance(event, Epilogue):
+                return
+            else:
+                yield event
+
+    def part_data(events):
+        for event in events:
+            if isinstance(event, Data):
+                yield event.data
+                if not event.more_data:
+                    return
+
+    events = events()
+    for event in events:
+        if isinstance(event, (Field, File)):
+            data = part_data(events)
+            if isinstance(event, Field):
+                yield event.name, data
+            for _ in data:
+                pass
+
+
+def save_form_base64(stream, mimetype, boundary, dest_path, data_fields, max_bytes=MAX_UPLOAD_BYTES,
+                     chunk_size=UPLOAD_CHUNK_SIZE):
+    """Read a urlencoded or multipart form body, decoding its base64 field to dest_path as it arrives.
+
+    The first field named in data_fields is decoded to dest_path; the other fields are
+    returned as {name: str}, each at most MAX_FORM_FIELD_KB (FormFieldTooLarge past it).
+    Returns (fields, decoded bytes); the byte count is None when no data field was sent.
+    """
+    chunks = iter_stream(stream, chunk_size)
+    if mimetype == 'multipart/form-data':
+        if not boundary:
+            raise ValueError("Multipart body without a boundary")
+        form = _iter_multipart_fields(chunks, boundary)
+    else:
+        form = _UrlencodedFields(chunks)
+
+    fields, file_size = {}, None
+    try:
+        for name, value in form:
+            if name in data_fields:
+                if file_size is None:
+                    file_size = write_chunks(value, dest_path, max_bytes, decoder=Base64StreamDecoder())
+                continue
+            data = b''
+            for chunk in value:
+                data += chunk
+                if len(data) > MAX_FORM_FIELD_BYTES:
+                    raise FormFieldTooLarge(name, MAX_FORM_FIELD_BYTES)
+            fields.setdefault(name, data.decode('utf-8', 'replace'))
+    except Exception:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+    return fields, file_size
@@ -1,11 +1,14 @@
 import os
+import logging
 import platform
 import shutil
 import sys
 import time
+import threading
 from subprocess import Popen, PIPE
 import openai
-from config import OPENAI_API_KEY, POPPLER_PATH, TYPING_DELAY, LOADING_ANIMATION_CHARS
+from config import (OPENAI_API_KEY, POPPLER_PATH, TYPING_DELAY, LOADING_ANIMATION_CHARS,
+                    LOG_LEVEL, DEBUG_SESSIONS)
 
 # OpenAI setup - gracefully handle missing API key
 openai.api_key = OPENAI_API_KEY
@@ -20,11 +23,76 @@ except Exception as e:
     print(f"⚠️ Error initializing OpenAI client: {str(e)} - OpenAI features will be disabled")
     client = None
 
+def configure_logging(level=LOG_LEVEL):
+    """Configure the root logger once for the web app and CLI scripts."""
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(format="%(asctime)s %(levelname)s [%(name)s] %(message)s")
+    root.setLevel(level)
+
+
+class SessionLogger(logging.LoggerAdapter):
+    """Logger adapter for one processing session.
+
+    Messages are prefixed with the session ID. DEBUG records are emitted when the
+    underlying logger allows DEBUG, or when debugging is enabled for this session
+    (debug=True, or the ID is listed in DEBUG_SESSIONS). Check isEnabledFor(logging.DEBUG)
+    before building row-level messages so the hot path costs nothing otherwise.
+    """
+
+    def __init__(self, logger, session_id, debug=False):
+        super().__init__(logger, {'session_id': session_id})
+        self.session_debug = debug or session_id in DEBUG_SESSIONS
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['session_id']}] {msg}", kwargs
+
+    def isEnabledFor(self, level):
+        if self.session_debug and level >= logging.DEBUG and not self.logger.disabled:
+            return True
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        msg, kwargs = self.process(msg, kwargs)
+        # Bypass the logger's own level check for session-enabled DEBUG records;
+        # handlers and filters still apply.
+        self.logger._log(level, msg, args, **kwargs)
+
+
 class PopplerNotFoundError(Exception):
     """Exception raised when Poppler is not found or not working properly."""
     pass
 
+# Process-wide result of the Poppler probe (see PopplerUtils.get_poppler_status)
+_poppler_status = None
+_poppler_status_lock = threading.Lock()
+
 class PopplerUtils:
+    @staticmethod
+    def get_poppler_status(refresh=False):
+        """Return the memoised Poppler probe result for this process.
+
+        The probe (which spawns pdfinfo) runs on first use and again only when
+        refresh=True. Returns {'available': bool, 'error': str or None, 'checked_at': float}.
+        """
+        global _poppler_status
+        with _poppler_status_lock:
+            if _poppler_status is None or refresh:
+                try:
+                    PopplerUtils.check_poppler_installation()
+                    _poppler_status = {'available': True, 'error': None, 'checked_at': time.time()}
+                except PopplerNotFoundError as e:
+                    logging.getLogger(__name__).warning("⚠️ Poppler not available: %s", e)
+                    _poppler_status = {'available': False, 'error': str(e), 'checked_at': time.time()}
+            return dict(_poppler_status)
+
+    @staticmethod
+    def refresh_poppler_status():
+        """Re-run the Poppler probe, e.g. after poppler-utils was installed."""
+        return PopplerUtils.get_poppler_status(refresh=True)
+
     @staticmethod
     def check_poppler_installation():
         """Check if Poppler is properly installed and accessible."""